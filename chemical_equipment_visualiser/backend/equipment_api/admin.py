@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import EquipmentDataset, Equipment
+from .models import DatasetTypeAggregate, EquipmentDataset, Equipment, IngestJob
 
 class EquipmentInline(admin.TabularInline):
     model = Equipment
@@ -13,4 +13,14 @@ class EquipmentDatasetAdmin(admin.ModelAdmin):
 @admin.register(Equipment)
 class EquipmentAdmin(admin.ModelAdmin):
     list_display = ['equipment_name', 'equipment_type', 'flowrate', 'pressure', 'temperature', 'dataset']
-    list_filter = ['equipment_type', 'dataset']
\ No newline at end of file
+    list_filter = ['equipment_type', 'dataset']
+
+@admin.register(IngestJob)
+class IngestJobAdmin(admin.ModelAdmin):
+    list_display = ['file_name', 'dataset_name', 'state', 'rows_processed', 'created_at', 'finished_at']
+    list_filter = ['state']
+
+@admin.register(DatasetTypeAggregate)
+class DatasetTypeAggregateAdmin(admin.ModelAdmin):
+    list_display = ['dataset', 'equipment_type', 'parameter', 'count', 'mean', 'min', 'max']
+    list_filter = ['equipment_type', 'parameter']
\ No newline at end of file
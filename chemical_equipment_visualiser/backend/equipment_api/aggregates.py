@@ -0,0 +1,88 @@
+"""Per-type parameter statistics stored at ingest.
+
+Ingest already keeps a Welford accumulator (count, mean, M2, min, max) for
+every parameter of every equipment type. Those are saved as
+DatasetTypeAggregate rows next to the dataset, so per-type questions read a
+handful of rows instead of scanning Equipment. The stored state merges
+exactly (RunningStats.merge), which is how several types are combined.
+
+    GET /api/datasets/17/by-type/?types=Reactor,Pump&parameters=pressure
+
+    {"dataset_id": 17,
+     "types": {"Pump": {"count": 412, "pressure": {"count": 412, "mean": 6.1, "std": 1.2, ...}}, ...},
+     "combined": {"count": 530, "pressure": {...}}}
+"""
+from django.db import transaction
+from .models import DatasetTypeAggregate
+from .stats import PARAMETERS, DatasetStats, RunningStats
+
+def aggregate_rows(dataset_id, stats):
+    """DatasetTypeAggregate instances for a DatasetStats accumulator"""
+    return [
+        DatasetTypeAggregate(
+            dataset_id=dataset_id, equipment_type=eq_type, parameter=param, count=running.count,
+            mean=running.mean, m2=running.m2, min=running.min, max=running.max
+        )
+        for eq_type, type_stats in stats.by_type.items()
+        for param, running in type_stats.items()
+    ]
+
+def store_type_aggregates(dataset, stats):
+    """Save the per-type statistics of a dataset being ingested; call it inside the ingest transaction"""
+    DatasetTypeAggregate.objects.bulk_create(aggregate_rows(dataset.id, stats))
+
+def rebuild_type_aggregates(dataset, chunk_size=10000):
+    """Recompute a dataset's aggregates from its Equipment rows (manage.py build_type_aggregates)"""
+    stats = DatasetStats()
+    rows = dataset.equipments.values_list('equipment_type', *PARAMETERS).iterator(chunk_size=chunk_size)
+    for eq_type, flowrate, pressure, temperature in rows:
+        stats.add(eq_type, flowrate, pressure, temperature)
+    with transaction.atomic():
+        DatasetTypeAggregate.objects.filter(dataset=dataset).delete()
+        DatasetTypeAggregate.objects.bulk_create(aggregate_rows(dataset.id, stats))
+    return stats
+
+def parse_names(params, name, allowed=None):
+    """Comma-separated values of ?name=, or None when absent"""
+    if not params.get(name):
+        return None
+    values = [value.strip() for value in params[name].split(',') if value.strip()]
+    if allowed is not None:
+        unknown = [value for value in values if value not in allowed]
+        if unknown:
+            raise ValueError(f"Unknown {name}: {', '.join(unknown)}; expected {', '.join(allowed)}")
+    return values
+
+def stats_data(running):
+    return {
+        'count': running.count,
+        'mean': running.mean,
+        'std': running.variance ** 0.5,
+        'variance': running.variance,
+        'min': running.min if running.count else None,
+        'max': running.max if running.count else None,
+        'm2': running.m2,
+    }
+
+def by_type_data(dataset, params):
+    """Per-type statistics of a dataset, optionally limited to ?types= and ?parameters=, plus their combination"""
+    types = parse_names(params, 'types')
+    parameters = parse_names(params, 'parameters', PARAMETERS) or PARAMETERS
+    rows = DatasetTypeAggregate.objects.filter(dataset=dataset, parameter__in=parameters)
+    if types is not None:
+        rows = rows.filter(equipment_type__in=types)
+
+    by_type = {}
+    combined = {param: RunningStats() for param in parameters}
+    for row in rows.order_by('equipment_type', 'parameter'):
+        running = RunningStats(row.count, row.mean, row.m2, row.min, row.max)
+        by_type.setdefault(row.equipment_type, {'count': row.count})[row.parameter] = stats_data(running)
+        combined[row.parameter].merge(running)
+    return {
+        'dataset_id': dataset.id,
+        'types': by_type,
+        'combined': dict(
+            {'count': combined[parameters[0]].count},
+            **{param: stats_data(running) for param, running in combined.items()}
+        ),
+    }
@@ -0,0 +1,161 @@
+import numpy as np
+from .stats import PARAMETERS, DatasetStats, RunningStats
+
+PERCENTILES = [('p5', 5), ('p25', 25), ('median', 50), ('p75', 75), ('p95', 95)]
+
+# Values a quantile sketch level holds before it is compacted
+SKETCH_CAPACITY = 8192
+
+class EquipmentColumns:
+    """Typed column arrays for a dataset; equipment types are dictionary-encoded as int16"""
+
+    def __init__(self, type_names, type_codes, flowrate, pressure, temperature):
+        self.type_names = list(type_names)
+        self.type_codes = type_codes
+        self.values = {
+            'flowrate': flowrate,
+            'pressure': pressure,
+            'temperature': temperature
+        }
+
+    def __len__(self):
+        return len(self.type_codes)
+
+def encode_rows(rows):
+    """Split (name, type, flowrate, pressure, temperature) tuples into type names, int16 type codes and a (rows, 3) value array"""
+    type_index = {}
+    type_codes = np.fromiter(
+        (type_index.setdefault(row[1], len(type_index)) for row in rows),
+        dtype=np.int16, count=len(rows)
+    )
+    values = np.array([row[2:] for row in rows], dtype=np.float64).reshape(-1, len(PARAMETERS))
+    return list(type_index), type_codes, values
+
+def column_stats(values):
+    """RunningStats of one column, computed with NumPy instead of a Python loop per value"""
+    if not len(values):
+        return RunningStats()
+    mean = values.mean()
+    return RunningStats(len(values), float(mean), float(np.square(values - mean).sum()),
+                        float(values.min()), float(values.max()))
+
+def chunk_stats(type_names, type_codes, values):
+    """DatasetStats of an encoded chunk, overall and per type, to merge into the dataset's running totals"""
+    stats = DatasetStats()
+    stats.count = len(type_codes)
+    for i, param in enumerate(PARAMETERS):
+        stats.parameters[param] = column_stats(values[:, i])
+    # Sort rows by type once so each type's values are a contiguous slice
+    order = np.argsort(type_codes, kind='stable')
+    bounds = np.concatenate(([0], np.cumsum(np.bincount(type_codes, minlength=len(type_names)))))
+    grouped = values[order]
+    for code, name in enumerate(type_names):
+        group = grouped[bounds[code]:bounds[code + 1]]
+        if len(group):
+            stats.by_type[name] = {param: column_stats(group[:, i]) for i, param in enumerate(PARAMETERS)}
+    return stats
+
+class QuantileSketch:
+    """Streaming quantile summary of one column in bounded memory (a KLL-style compactor stack)
+
+    Values are kept as they arrive until a level holds more than `capacity`; that
+    level is then sorted and every other value moves up a level with twice the
+    weight. Memory is O(capacity * log(n / capacity)) and the rank error is
+    around log2(n / capacity) / capacity. Columns that never fill level 0 are
+    answered exactly, as np.percentile would.
+    """
+
+    def __init__(self, capacity=SKETCH_CAPACITY, seed=0):
+        self.capacity = capacity
+        self.levels = [[]]
+        self.sizes = [0]
+        self.count = 0
+        # Fixed seed: the same file gives the same summary
+        self.rng = np.random.default_rng(seed)
+
+    def add(self, values):
+        if not len(values):
+            return
+        self.count += len(values)
+        self._push(0, np.asarray(values, dtype=np.float64))
+
+    def _push(self, level, values):
+        if level == len(self.levels):
+            self.levels.append([])
+            self.sizes.append(0)
+        self.levels[level].append(values)
+        self.sizes[level] += len(values)
+        if self.sizes[level] > self.capacity:
+            self._compact(level)
+
+    def _compact(self, level):
+        items = np.sort(np.concatenate(self.levels[level]))
+        # An odd value out stays behind so the total weight is unchanged
+        kept = items[len(items) - len(items) % 2:]
+        promoted = items[int(self.rng.integers(2)):len(items) - len(kept):2]
+        self.levels[level] = [kept]
+        self.sizes[level] = len(kept)
+        self._push(level + 1, promoted)
+
+    def exact(self):
+        return len(self.levels) == 1
+
+    def quantiles(self, percents):
+        """Values at the given percentiles (0-100); linear interpolation when exact"""
+        if self.exact():
+            return np.percentile(np.concatenate(self.levels[0]), percents)
+        values = np.concatenate([np.concatenate(chunks) for chunks in self.levels])
+        weights = np.concatenate([
+            np.full(size, 2.0 ** level) for level, size in enumerate(self.sizes)
+        ])
+        order = np.argsort(values, kind='stable')
+        values, ranks = values[order], np.cumsum(weights[order])
+        targets = np.asarray(percents, dtype=np.float64) / 100 * (self.count - 1)
+        return values[np.minimum(np.searchsorted(ranks, targets, side='right'), len(values) - 1)]
+
+class QuantileBuilder:
+    """Per-parameter and per-type quantile sketches fed from parsed chunks
+
+    Memory is bounded by the number of types, not rows, so extended stats cost
+    the same for a thousand rows as for ten million.
+    """
+
+    def __init__(self, capacity=SKETCH_CAPACITY):
+        self.capacity = capacity
+        self.overall = {param: QuantileSketch(capacity) for param in PARAMETERS}
+        self.by_type = {}
+
+    def add_columns(self, type_names, type_codes, values):
+        """Add an already-encoded chunk: type names, their int16 codes per row and a (rows, 3) value array"""
+        if not len(type_codes):
+            return
+        for i, param in enumerate(PARAMETERS):
+            self.overall[param].add(values[:, i])
+        for code, name in enumerate(type_names):
+            mask = type_codes == code
+            if not mask.any():
+                continue
+            sketches = self.by_type.get(name)
+            if sketches is None:
+                sketches = self.by_type[name] = {param: QuantileSketch(self.capacity) for param in PARAMETERS}
+            group = values[mask]
+            for i, param in enumerate(PARAMETERS):
+                sketches[param].add(group[:, i])
+
+def sketch_stats(sketch):
+    """Percentiles and IQR from a QuantileSketch"""
+    if not sketch.count:
+        return dict.fromkeys([name for name, _ in PERCENTILES] + ['iqr'], 0.0)
+    points = sketch.quantiles([q for _, q in PERCENTILES])
+    result = {name: float(value) for (name, _), value in zip(PERCENTILES, points)}
+    result['iqr'] = result['p75'] - result['p25']
+    return result
+
+def add_quantiles(summary, quantiles):
+    """Merge percentile and IQR fields from a QuantileBuilder into an existing summary_stats dict"""
+    for param, sketch in quantiles.overall.items():
+        summary['parameter_stats'][param].update(sketch_stats(sketch))
+    for eq_type, sketches in quantiles.by_type.items():
+        for param, sketch in sketches.items():
+            summary['type_parameter_stats'][eq_type][param].update(sketch_stats(sketch))
+    return summary
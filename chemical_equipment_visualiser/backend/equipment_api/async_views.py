@@ -0,0 +1,234 @@
+"""Coroutine versions of the read endpoints and the upload endpoint, for ASGI servers.
+
+DRF 3.14 views are synchronous, so under ASGI Django runs each of them in a
+thread. These views keep the request on the event loop instead: the dataset
+lookup goes through the async ORM, a token found in the token cache is
+accepted without leaving the loop, and only the work that blocks (reading
+rows, rendering, parsing an upload, building a PDF) is handed to a thread
+pool. urls.py serves them in place of views.py when EQUIPMENT_ASYNC_VIEWS is
+on, which asgi.py turns on by default. Responses are the same as the sync
+views', except that the browsable API is not offered.
+"""
+import functools
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.http import HttpResponseNotAllowed
+from rest_framework import status
+from rest_framework.exceptions import APIException, AuthenticationFailed, NotAuthenticated
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.views import exception_handler
+from .authentication import CachedTokenAuthentication, cached_credentials
+from .cache import cached_response
+from .charts import chart_data
+from .columnar import dataset_columns
+from .models import EquipmentDataset
+from .renderers import EventStreamRenderer, NDJSONRenderer, equipment_payload, equipment_renderers, json_renderers
+from .streaming import aiter_in_thread
+from .views import (dataset_refs, event_stream_response, export_response, filtered_equipment_block, handle_upload,
+                    history_data, pdf_response, request_event_stream)
+
+def in_thread(func):
+    """Run a blocking call in the thread pool so the event loop keeps serving other requests"""
+    @functools.wraps(func)
+    def run(*args, **kwargs):
+        # Pool threads outlive requests: apply CONN_MAX_AGE to their connections like request_finished does
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return sync_to_async(run, thread_sensitive=False)
+
+async def authenticate(request):
+    token_auth = next((auth for auth in request.authenticators if isinstance(auth, CachedTokenAuthentication)), None)
+    credentials = cached_credentials(request) if token_auth else None
+    if credentials is not None:
+        request._authenticator = token_auth
+        request.user, request.auth = credentials
+    else:
+        # Database lookup, password hash or session: resolve request.user in a thread
+        await in_thread(lambda: request.user)()
+    if not request.user.is_authenticated:
+        raise NotAuthenticated()
+
+def error_response(request, exc):
+    """DRF's response for an exception raised before or inside the view"""
+    if isinstance(exc, (NotAuthenticated, AuthenticationFailed)):
+        header = request.authenticators[0].authenticate_header(request) if request.authenticators else None
+        if header:
+            exc.auth_header = header
+        else:
+            exc.status_code = status.HTTP_403_FORBIDDEN
+    return exception_handler(exc, {'request': request})
+
+def async_api_view(methods, renderer_classes=None):
+    """Like @api_view with IsAuthenticated, for a coroutine taking a DRF Request"""
+    renderer_classes = [
+        renderer for renderer in (renderer_classes or api_settings.DEFAULT_RENDERER_CLASSES)
+        if renderer.format != 'api'
+    ]
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def view(request, *args, **kwargs):
+            if request.method not in methods:
+                return HttpResponseNotAllowed(methods)
+            request = Request(
+                request,
+                parsers=[parser() for parser in api_settings.DEFAULT_PARSER_CLASSES],
+                authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES],
+            )
+            renderers = [renderer() for renderer in renderer_classes]
+            try:
+                request.accepted_renderer, request.accepted_media_type = (
+                    DefaultContentNegotiation().select_renderer(request, renderers)
+                )
+            except APIException as e:
+                request.accepted_renderer, request.accepted_media_type = renderers[0], renderers[0].media_type
+                response = error_response(request, e)
+            else:
+                try:
+                    await authenticate(request)
+                    response = await func(request, *args, **kwargs)
+                except APIException as e:
+                    response = error_response(request, e)
+
+            if isinstance(response, Response):
+                # Django renders it once the view returns
+                response.accepted_renderer = request.accepted_renderer
+                response.accepted_media_type = request.accepted_media_type
+                response.renderer_context = {'request': request, 'response': response, 'args': args, 'kwargs': kwargs}
+            return response
+
+        # Token and Basic auth carry no cookies; SessionAuthentication still enforces CSRF itself
+        view.csrf_exempt = True
+        return view
+    return decorator
+
+async def latest_dataset_ref():
+    return await dataset_refs().afirst()
+
+@async_api_view(['POST'], json_renderers())
+async def upload_csv(request):
+    """Handle CSV file upload and processing"""
+    # Reading the multipart body, hashing and ingesting all block
+    return await in_thread(handle_upload)(request)
+
+@async_api_view(['GET'])
+async def get_summary(request):
+    """Get summary statistics from the latest dataset"""
+    try:
+        latest_dataset = await latest_dataset_ref()
+        if not latest_dataset:
+            return Response({'error': 'No data available'}, status=status.HTTP_404_NOT_FOUND)
+
+        return await in_thread(cached_response)(
+            request, 'summary', latest_dataset, lambda dataset: dataset.summary_stats
+        )
+
+    except Exception as e:
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@async_api_view(['GET'], equipment_renderers())
+async def get_equipment_data(request):
+    """Get all equipment data from the latest dataset, optionally filtered and sorted"""
+    try:
+        latest_dataset = await latest_dataset_ref()
+        if not latest_dataset:
+            return Response({'error': 'No data available'}, status=status.HTTP_404_NOT_FOUND)
+
+        return await in_thread(cached_response)(
+            request, 'equipment', latest_dataset,
+            lambda dataset: equipment_payload(filtered_equipment_block(dataset, request.query_params), request)
+        )
+
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@async_api_view(['GET'])
+async def get_equipment_types(request):
+    """Get equipment type distribution"""
+    try:
+        latest_dataset = await latest_dataset_ref()
+        if not latest_dataset:
+            return Response({'error': 'No data available'}, status=status.HTTP_404_NOT_FOUND)
+
+        return await in_thread(cached_response)(
+            request, 'equipment-types', latest_dataset,
+            lambda dataset: dataset.summary_stats.get('equipment_type_distribution', {})
+        )
+
+    except Exception as e:
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@async_api_view(['GET'])
+async def get_chart_data(request, kind, dataset_id=None):
+    """Display-sized chart data (histogram, histogram2d or series) for the latest or a given dataset"""
+    try:
+        if dataset_id is None:
+            dataset = await latest_dataset_ref()
+            if not dataset:
+                return Response({'error': 'No data available'}, status=status.HTTP_404_NOT_FOUND)
+        else:
+            dataset = await EquipmentDataset.objects.only('id', 'content_hash').filter(id=dataset_id).afirst()
+            if not dataset:
+                return Response({'error': 'Dataset not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        return await in_thread(cached_response)(
+            request, f'chart-{kind}', dataset,
+            lambda dataset: chart_data(kind, dataset_columns(dataset), request.query_params)
+        )
+
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@async_api_view(['GET'], json_renderers())
+async def get_history(request):
+    """Get upload history (last 5 datasets), summaries only unless ?include=equipments"""
+    try:
+        return Response(await in_thread(history_data)(request, request.query_params))
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+@async_api_view(['GET'], [JSONRenderer, NDJSONRenderer])
+async def export_dataset_equipment(request, dataset_id):
+    """Stream all of a dataset's equipment as one JSON array or as NDJSON (?format=ndjson)"""
+    dataset = await EquipmentDataset.objects.only('id').filter(id=dataset_id).afirst()
+    if not dataset:
+        return Response({'error': 'Dataset not found'}, status=status.HTTP_404_NOT_FOUND)
+    try:
+        # Each chunk is read and encoded in a thread and sent before the next, as under WSGI
+        return export_response(dataset, request, aiter_in_thread)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+@async_api_view(['POST'])
+async def generate_pdf(request):
+    """Generate PDF report for the latest dataset"""
+    try:
+        latest_dataset = await EquipmentDataset.objects.order_by('-uploaded_at').afirst()
+        if not latest_dataset:
+            return Response({'error': 'No data available'}, status=status.HTTP_404_NOT_FOUND)
+
+        return await in_thread(pdf_response)(latest_dataset)
+
+    except Exception as e:
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@async_api_view(['GET'], [EventStreamRenderer, JSONRenderer])
+async def events(request):
+    """Stream dataset-created, dataset-pruned and job-progress events as Server-Sent Events"""
+    try:
+        stream = request_event_stream(request)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    # An idle stream just sleeps on the event loop instead of holding a thread
+    return event_stream_response(stream.amessages(in_thread))
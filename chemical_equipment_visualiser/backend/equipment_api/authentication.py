@@ -0,0 +1,62 @@
+"""Token authentication with recently verified tokens kept in memory.
+
+Basic auth runs the password hasher (PBKDF2) on every request. Clients
+instead log in once at /api/auth/login/ and send "Authorization: Token <key>".
+A token is verified with a primary-key lookup, then remembered in this
+process for EQUIPMENT_TOKEN_CACHE_SECONDS, so most requests skip the
+database as well. Logging out evicts the token in the process that handles
+it; other server processes accept it until their entry expires.
+"""
+import hashlib
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.authentication import TokenAuthentication, get_authorization_header
+from rest_framework.authtoken.models import Token
+
+TOKEN_CACHE = 'equipment_tokens'
+
+def token_cache():
+    return caches[TOKEN_CACHE] if TOKEN_CACHE in settings.CACHES else caches['default']
+
+def get_token_cache_seconds():
+    return getattr(settings, 'EQUIPMENT_TOKEN_CACHE_SECONDS', 60)
+
+def token_cache_key(key):
+    # The key is a credential; don't keep it verbatim in cache keys
+    return f"equipment:token:{hashlib.sha256(key.encode()).hexdigest()}"
+
+def forget_token(key):
+    token_cache().delete(token_cache_key(key))
+
+def issue_token(user):
+    """The user's API token, created on first login"""
+    token, _ = Token.objects.get_or_create(user=user)
+    return token
+
+def revoke_tokens(user):
+    """Delete the user's tokens (post_delete evicts them from the cache)"""
+    Token.objects.filter(user=user).delete()
+
+def cached_credentials(request):
+    """(user, token) for the request's token if it is in the cache, else None; never queries the database"""
+    auth = get_authorization_header(request).split()
+    if len(auth) != 2 or auth[0].lower() != CachedTokenAuthentication.keyword.lower().encode():
+        return None
+    try:
+        key = auth[1].decode()
+    except UnicodeError:
+        return None
+    return token_cache().get(token_cache_key(key))
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication that caches (user, token) for a short time after each database check"""
+
+    def authenticate_credentials(self, key):
+        cache_key = token_cache_key(key)
+        cached = token_cache().get(cache_key)
+        if cached is not None:
+            return cached
+        user, token = super().authenticate_credentials(key)
+        if get_token_cache_seconds() > 0:
+            token_cache().set(cache_key, (user, token), timeout=get_token_cache_seconds())
+        return user, token
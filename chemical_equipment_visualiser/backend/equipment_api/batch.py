@@ -0,0 +1,96 @@
+"""Several read requests answered in one round trip from one snapshot.
+
+A batch lists sub-requests (summary, type distribution, per-type
+statistics, equipment rows or one page of them, dataset details, history). They run in one read
+transaction against one dataset, the latest unless the batch names one, so
+an upload finishing midway can't leave a summary from one dataset next to
+rows from another. A sub-request may name a different dataset_id, e.g. to
+fetch details of several history entries at once.
+
+    POST /api/batch/
+    {"dataset_id": 12,
+     "requests": [{"type": "summary"},
+                  {"id": "rows", "type": "equipment_page", "params": {"page_size": 500}},
+                  {"type": "history", "params": {"fields": "id,name,uploaded_at"}}]}
+
+Each result is keyed by the sub-request's id (its type by default) and
+carries the status and body the standalone endpoint would have returned.
+"""
+import json
+from django.conf import settings
+from django.http import QueryDict
+
+# Sub-request types that read a dataset; history reads the upload list instead
+DATASET_TYPES = ['summary', 'types', 'by_type', 'equipment', 'equipment_page', 'dataset']
+BATCH_TYPES = DATASET_TYPES + ['history']
+
+def get_max_requests():
+    return getattr(settings, 'EQUIPMENT_BATCH_MAX_REQUESTS', 20)
+
+def parse_dataset_id(value, name='dataset_id'):
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ValueError(f"{name} must be an integer")
+    return value
+
+def as_query_dict(params):
+    """A sub-request's params as a QueryDict, so the endpoint helpers read them like a query string"""
+    if not isinstance(params, dict):
+        raise ValueError("params must be an object")
+    query = QueryDict(mutable=True)
+    for name, value in params.items():
+        values = value if isinstance(value, list) else [value]
+        query.setlist(name, [str(item).lower() if isinstance(item, bool) else str(item) for item in values])
+    return query
+
+def parse_batch(data):
+    """(snapshot dataset id or None, [(key, type, dataset id or None, params)]); raises ValueError"""
+    if not isinstance(data, dict):
+        raise ValueError("Send a JSON object with a requests list")
+    dataset_id = parse_dataset_id(data.get('dataset_id'))
+    requests = data.get('requests')
+    if not isinstance(requests, list) or not requests:
+        raise ValueError("requests must be a non-empty list")
+    if len(requests) > get_max_requests():
+        raise ValueError(f"A batch holds at most {get_max_requests()} requests")
+
+    subrequests = []
+    for index, item in enumerate(requests):
+        if not isinstance(item, dict):
+            raise ValueError(f"requests[{index}] must be an object")
+        kind = item.get('type')
+        if kind not in BATCH_TYPES:
+            raise ValueError(f"requests[{index}].type must be one of {', '.join(BATCH_TYPES)}")
+        key = str(item.get('id', kind))
+        if any(key == existing[0] for existing in subrequests):
+            raise ValueError(f"Duplicate request id {key!r}; give repeated types an id")
+        subrequests.append((
+            key, kind, parse_dataset_id(item.get('dataset_id'), f"requests[{index}].dataset_id"),
+            as_query_dict(item.get('params', {}))
+        ))
+    return dataset_id, subrequests
+
+def batch_key(subrequests):
+    """Canonical form of the sub-requests, for the response cache key"""
+    return json.dumps([
+        [key, kind, dataset_id, sorted(params.lists())] for key, kind, dataset_id, params in subrequests
+    ], separators=(',', ':'))
+
+def result(status, data):
+    return {'status': status, 'data': data}
+
+def run_batch(request, subrequests, snapshot, datasets, handlers):
+    """Results of the sub-requests; datasets maps ids to the datasets they may name"""
+    results = {}
+    for key, kind, dataset_id, params in subrequests:
+        dataset = snapshot if dataset_id is None else datasets.get(dataset_id)
+        if kind in DATASET_TYPES and dataset is None:
+            error = 'No data available' if dataset_id is None else 'Dataset not found'
+            results[key] = result(404, {'error': error})
+            continue
+        try:
+            results[key] = result(200, handlers[kind](request, dataset, params))
+        except ValueError as e:
+            results[key] = result(400, {'error': str(e)})
+    return results
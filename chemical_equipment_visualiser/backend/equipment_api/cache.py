@@ -0,0 +1,89 @@
+"""Rendered-response cache for the latest-dataset read endpoints, with strong ETags.
+
+Datasets never change after ingest, so a response is identified by the
+endpoint, the dataset (id and content hash), the negotiated format, the
+query string and a generation: the state of the dataset list, read from the
+database so every server process and job worker agrees on it. Bodies live
+in a bounded in-process LRU and, when EQUIPMENT_SHARED_CACHE is configured,
+in a cache shared by all server processes.
+"""
+import hashlib
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Count, Max
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+from rest_framework.response import Response
+from .models import EquipmentDataset
+
+CACHE_FORMAT = 1
+LOCAL_CACHE = 'equipment_responses'
+SHARED_CACHE = 'equipment_shared'
+
+def local_cache():
+    return caches[LOCAL_CACHE] if LOCAL_CACHE in settings.CACHES else caches['default']
+
+def shared_cache():
+    return caches[SHARED_CACHE] if SHARED_CACHE in settings.CACHES else None
+
+def get_generation():
+    """Version of the dataset list, so responses that read other datasets (history, batch) go stale with it
+
+    Every dataset becomes visible with the newest uploaded_at, and between those
+    only deletions happen, which lower the count: no two states share a value.
+    """
+    state = EquipmentDataset.objects.aggregate(count=Count('id'), last_upload=Max('uploaded_at'))
+    last_upload = state['last_upload'].isoformat() if state['last_upload'] else ''
+    return f"{state['count']}:{last_upload}"
+
+def response_key(name, dataset, request, extra=''):
+    """Cache key and strong ETag of an endpoint's response for a dataset
+
+    extra identifies anything else the response depends on, e.g. a request body.
+    """
+    query = '&'.join(sorted(request.GET.urlencode().split('&')))
+    raw = (f"{CACHE_FORMAT}:{get_generation()}:{name}:{dataset.id}:{dataset.content_hash}:"
+           f"{request.accepted_renderer.format}:{query}:{extra}")
+    digest = hashlib.sha256(raw.encode()).hexdigest()
+    return f"equipment:response:{digest}", f'"{digest[:40]}"'
+
+def _get(key):
+    body = local_cache().get(key)
+    if body is None and shared_cache() is not None:
+        body = shared_cache().get(key)
+        if body is not None:
+            local_cache().set(key, body, timeout=None)
+    return body
+
+def _set(key, body):
+    if len(body) > getattr(settings, 'EQUIPMENT_CACHE_MAX_BYTES', 32 * 1024 * 1024):
+        return
+    local_cache().set(key, body, timeout=None)
+    if shared_cache() is not None:
+        shared_cache().set(key, body, timeout=None)
+
+def cached_response(request, name, dataset, build, extra=''):
+    """Rendered response of build(dataset), served from cache or as 304 when If-None-Match matches"""
+    renderer = request.accepted_renderer
+    if renderer.format == 'api':
+        # The browsable API renders a page around the data: render normally
+        return Response(build(dataset))
+    key, etag = response_key(name, dataset, request, extra)
+    if_none_match = parse_etags(request.headers.get('If-None-Match', ''))
+    if etag in if_none_match or '*' in if_none_match:
+        response = HttpResponseNotModified()
+    else:
+        body = _get(key)
+        if body is None:
+            body = renderer.render(build(dataset), renderer.media_type, {'request': request})
+            _set(key, body)
+        content_type = renderer.media_type
+        if renderer.charset:
+            content_type = f"{content_type}; charset={renderer.charset}"
+        response = HttpResponse(body, content_type=content_type)
+    response['ETag'] = etag
+    # Let browsers keep the body but revalidate it on every use
+    response['Cache-Control'] = 'private, no-cache'
+    patch_vary_headers(response, ['Accept'])
+    return response
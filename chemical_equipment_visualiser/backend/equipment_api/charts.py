@@ -0,0 +1,231 @@
+"""Display-sized chart data computed from a dataset's columns.
+
+Charts need a few hundred numbers, not every row, so these reduce the
+typed columns (memory-mapped when stored) to histograms, 2D densities and
+LTTB-downsampled series. Results are cached per dataset like the other
+latest-dataset responses.
+"""
+import numpy as np
+from django.conf import settings
+from .stats import PARAMETERS
+
+BIN_RULES = ['auto', 'fd', 'doane', 'scott', 'stone', 'rice', 'sturges', 'sqrt']
+
+def get_max_bins():
+    return getattr(settings, 'EQUIPMENT_CHART_MAX_BINS', 200)
+
+def get_max_points():
+    return getattr(settings, 'EQUIPMENT_CHART_MAX_POINTS', 5000)
+
+def parse_parameter(params, name='parameter'):
+    value = params.get(name)
+    if value not in PARAMETERS:
+        raise ValueError(f"{name} must be one of {', '.join(PARAMETERS)}")
+    return value
+
+def parse_bins(value, default='auto'):
+    """A bin count or one of numpy's binning rules"""
+    value = value or default
+    if value in BIN_RULES:
+        return value
+    try:
+        bins = int(value)
+    except ValueError:
+        raise ValueError(f"bins must be an integer or one of {', '.join(BIN_RULES)}")
+    if not 1 <= bins <= get_max_bins():
+        raise ValueError(f"bins must be between 1 and {get_max_bins()}")
+    return bins
+
+def parse_range(params, prefix=''):
+    """Optional (low, high) histogram range from <prefix>min/<prefix>max"""
+    low, high = params.get(f"{prefix}min"), params.get(f"{prefix}max")
+    if low is None and high is None:
+        return None
+    try:
+        low, high = float(low), float(high)
+    except (TypeError, ValueError):
+        raise ValueError(f"{prefix}min and {prefix}max must both be numbers")
+    if not low < high:
+        raise ValueError(f"{prefix}min must be below {prefix}max")
+    return low, high
+
+def _fd_width(values):
+    iqr = np.subtract(*np.percentile(values, [75, 25]))
+    return 2.0 * iqr * len(values) ** (-1.0 / 3.0)
+
+def _sturges_width(values):
+    return np.ptp(values) / (np.log2(len(values)) + 1.0)
+
+def _doane_width(values):
+    n = len(values)
+    sigma = values.std()
+    if n <= 2 or not sigma > 0:
+        return 0.0
+    sg1 = np.sqrt(6.0 * (n - 2) / ((n + 1.0) * (n + 3)))
+    g1 = np.mean(((values - values.mean()) / sigma) ** 3)
+    return np.ptp(values) / (1.0 + np.log2(n) + np.log2(1.0 + abs(g1) / sg1))
+
+def _stone_width(values, value_range):
+    # Cross-validated over at most the bin cap, on an evenly strided sample of large columns
+    sample = values[::max(1, len(values) // 100_000)]
+    n = len(sample)
+    ptp = np.ptp(sample)
+    if n <= 1 or ptp == 0:
+        return 0.0
+
+    def risk(n_bins):
+        p_k = np.histogram(sample, bins=n_bins, range=value_range)[0] / n
+        return (2 - (n + 1) * p_k.dot(p_k)) / (ptp / n_bins)
+
+    return ptp / min(range(1, min(max(100, int(np.sqrt(n))), get_max_bins()) + 1), key=risk)
+
+# Bin width of each of numpy's rules, as numpy computes it (values are already trimmed to the range)
+BIN_WIDTHS = {
+    'auto': lambda values, value_range: min(
+        max(_fd_width(values), np.ptp(values) / np.sqrt(len(values)) / 2), _sturges_width(values)
+    ),
+    'fd': lambda values, value_range: _fd_width(values),
+    'doane': lambda values, value_range: _doane_width(values),
+    'scott': lambda values, value_range: (24.0 * np.pi ** 0.5 / len(values)) ** (1.0 / 3.0) * values.std(),
+    'stone': _stone_width,
+    'rice': lambda values, value_range: np.ptp(values) / (2.0 * len(values) ** (1.0 / 3)),
+    'sturges': lambda values, value_range: _sturges_width(values),
+    'sqrt': lambda values, value_range: np.ptp(values) / np.sqrt(len(values)),
+}
+
+def rule_bins(values, rule, value_range=None):
+    """Bin count a binning rule picks, capped at the maximum before any edges exist
+
+    numpy would build every edge of the rule's width first; one outlier under
+    'fd' asks for hundreds of millions of them.
+    """
+    if value_range is not None:
+        low, high = value_range
+        values = values[(values >= low) & (values <= high)]
+    elif len(values):
+        low, high = float(values.min()), float(values.max())
+    if not len(values):
+        return 1
+    width = float(BIN_WIDTHS[rule](np.asarray(values, dtype=np.float64), value_range))
+    if not width > 0 or high == low:
+        return 1
+    return int(min(np.ceil((high - low) / width), get_max_bins()))
+
+def bin_edges(values, bins, value_range=None):
+    """Histogram edges for a bin count or a rule; rule-based counts are capped at the maximum"""
+    if value_range is None and not len(values):
+        value_range = (0.0, 1.0)
+    if isinstance(bins, str):
+        bins = rule_bins(values, bins, value_range)
+    return np.histogram_bin_edges(values, bins=bins, range=value_range)
+
+def bin_index(values, edges):
+    """Bin of each value (the last bin is closed, as in np.histogram); -1 when outside the edges"""
+    index = np.searchsorted(edges, values, side='right') - 1
+    index[values == edges[-1]] = len(edges) - 2
+    index[(index < 0) | (index >= len(edges) - 1)] = -1
+    return index
+
+def histogram(columns, parameter, bins='auto', value_range=None, by_type=False):
+    values = columns.values[parameter]
+    edges = bin_edges(values, bins, value_range)
+    n_bins = len(edges) - 1
+    result = {
+        'parameter': parameter,
+        'edges': edges.tolist(),
+        'counts': np.histogram(values, bins=edges)[0].tolist(),
+        'total': len(values),
+    }
+    if by_type:
+        # One pass: count (type, bin) pairs as a flat index
+        index = bin_index(values, edges)
+        inside = index >= 0
+        n_types = len(columns.type_names)
+        flat = np.asarray(columns.type_codes, dtype=np.int64)[inside] * n_bins + index[inside]
+        counts = np.bincount(flat, minlength=n_types * n_bins).reshape(n_types, n_bins)
+        result['by_type'] = {name: counts[code].tolist() for code, name in enumerate(columns.type_names)}
+    return result
+
+def histogram2d(columns, x, y, bins=(50, 50), x_range=None, y_range=None):
+    """Binned density of two parameters; counts[i][j] is x bin i, y bin j"""
+    x_values, y_values = columns.values[x], columns.values[y]
+    x_edges = bin_edges(x_values, bins[0], x_range)
+    y_edges = bin_edges(y_values, bins[1], y_range)
+    counts = np.histogram2d(x_values, y_values, bins=(x_edges, y_edges))[0]
+    return {
+        'x': x,
+        'y': y,
+        'x_edges': x_edges.tolist(),
+        'y_edges': y_edges.tolist(),
+        'counts': counts.astype(np.int64).tolist(),
+        'total': len(x_values),
+    }
+
+def lttb(x, y, threshold):
+    """Indexes of the points Largest-Triangle-Three-Buckets keeps; x must be sorted"""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    # Buckets between the fixed first and last points; bucket i is bounds[i]:bounds[i + 1]
+    bounds = (np.arange(threshold - 1) * ((n - 2) / (threshold - 2))).astype(np.int64) + 1
+    bounds[-1] = n - 1
+    # Average point of each bucket, plus the last point as the "bucket" after the final one
+    sizes = np.diff(np.append(bounds, n))
+    avg_x = np.add.reduceat(x, bounds) / sizes
+    avg_y = np.add.reduceat(y, bounds) / sizes
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for bucket in range(threshold - 2):
+        start, stop = bounds[bucket], bounds[bucket + 1]
+        bx, by = x[start:stop], y[start:stop]
+        area = np.abs((x[a] - avg_x[bucket + 1]) * (by - y[a]) - (x[a] - bx) * (avg_y[bucket + 1] - y[a]))
+        a = start + int(np.argmax(area))
+        selected[bucket + 1] = a
+    return selected
+
+def series(columns, parameter, points=1000, x='index'):
+    """parameter against row order (x='index') or against another parameter, downsampled to points"""
+    y_values = np.asarray(columns.values[parameter], dtype=np.float64)
+    if x == 'index':
+        x_values = np.arange(len(y_values), dtype=np.float64)
+    else:
+        order = np.argsort(columns.values[x], kind='stable')
+        x_values = np.asarray(columns.values[x], dtype=np.float64)[order]
+        y_values = y_values[order]
+    keep = lttb(x_values, y_values, points)
+    return {
+        'parameter': parameter,
+        'x': x,
+        'x_values': x_values[keep].tolist(),
+        'y_values': y_values[keep].tolist(),
+        'total': len(y_values),
+    }
+
+def chart_data(kind, columns, params):
+    """Chart payload of the given kind from query parameters; raises ValueError on bad input"""
+    if kind == 'histogram':
+        return histogram(
+            columns, parse_parameter(params), parse_bins(params.get('bins')), parse_range(params),
+            by_type=params.get('by_type') in ('1', 'true', 'yes')
+        )
+    if kind == 'histogram2d':
+        x, y = parse_parameter(params, 'x'), parse_parameter(params, 'y')
+        bins = parse_bins(params.get('bins'), '50')
+        return histogram2d(
+            columns, x, y, (parse_bins(params.get('x_bins'), bins), parse_bins(params.get('y_bins'), bins)),
+            parse_range(params, 'x_'), parse_range(params, 'y_')
+        )
+    if kind == 'series':
+        try:
+            points = int(params.get('points', 1000))
+        except ValueError:
+            raise ValueError("points must be an integer")
+        if not 3 <= points <= get_max_points():
+            raise ValueError(f"points must be between 3 and {get_max_points()}")
+        x = params.get('x', 'index')
+        if x != 'index' and x not in PARAMETERS:
+            raise ValueError(f"x must be index or one of {', '.join(PARAMETERS)}")
+        return series(columns, parse_parameter(params), points, x)
+    raise ValueError("Chart kind must be histogram, histogram2d or series")
@@ -0,0 +1,294 @@
+"""Columnar on-disk copy of each dataset's equipment rows, read back through memory maps.
+
+Each dataset gets a directory of raw little-endian column files plus meta.json:
+
+    id.bin            int64    Equipment primary keys, in insertion order
+    type_code.bin     int16    index into meta['type_names']
+    flowrate.bin      float64
+    pressure.bin      float64
+    temperature.bin   float64
+    name_offsets.bin  int64    row_count + 1 offsets into names.bin
+    names.bin         utf-8    equipment names, concatenated
+
+The Equipment table stays the source of truth: a dataset whose directory is
+missing or unreadable is read from the database instead.
+"""
+import json
+import os
+import shutil
+import numpy as np
+from django.conf import settings
+from django.db import connection, transaction
+from .analytics import EquipmentColumns, encode_rows
+from .stats import PARAMETERS
+
+FORMAT_VERSION = 1
+COLUMNS = {
+    'id': '<i8',
+    'type_code': '<i2',
+    'flowrate': '<f8',
+    'pressure': '<f8',
+    'temperature': '<f8',
+    'name_offsets': '<i8',
+}
+
+def columnar_enabled():
+    return getattr(settings, 'EQUIPMENT_COLUMNAR_STORAGE', True)
+
+def get_columnar_dir():
+    return str(getattr(settings, 'EQUIPMENT_COLUMNAR_DIR', os.path.join(settings.BASE_DIR, 'columnar')))
+
+def dataset_dir(dataset_id):
+    return os.path.join(get_columnar_dir(), str(dataset_id))
+
+class ColumnarWriter:
+    """Appends ingested chunks to a dataset's column files; published when the ingest commits"""
+
+    def __init__(self, dataset_id):
+        self.path = dataset_dir(dataset_id)
+        self.tmp_path = f"{self.path}.tmp"
+        shutil.rmtree(self.tmp_path, ignore_errors=True)
+        os.makedirs(self.tmp_path)
+        self.files = {name: open(os.path.join(self.tmp_path, f"{name}.bin"), 'wb') for name in COLUMNS}
+        self.names_file = open(os.path.join(self.tmp_path, 'names.bin'), 'wb')
+        self.type_index = {}
+        self.row_count = 0
+        self.name_bytes = 0
+        self._write('name_offsets', np.zeros(1))
+
+    @classmethod
+    def open(cls, dataset_id):
+        """Writer for a new dataset, or None when columnar storage is off or ids aren't returned on insert"""
+        if not columnar_enabled() or not connection.features.can_return_rows_from_bulk_insert:
+            return None
+        return cls(dataset_id)
+
+    def _write(self, name, values):
+        self.files[name].write(np.ascontiguousarray(values, dtype=COLUMNS[name]).tobytes())
+
+    def append(self, ids, names, type_names, type_codes, values):
+        """Append a chunk; type_codes index into type_names and are remapped to the dataset's dictionary"""
+        mapping = np.array(
+            [self.type_index.setdefault(name, len(self.type_index)) for name in type_names],
+            dtype=np.int16
+        )
+        encoded = [name.encode('utf-8') for name in names]
+        offsets = self.name_bytes + np.cumsum(np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded)))
+
+        self._write('id', ids)
+        self._write('type_code', mapping[type_codes])
+        for index, param in enumerate(PARAMETERS):
+            self._write(param, values[:, index])
+        self._write('name_offsets', offsets)
+        self.names_file.write(b''.join(encoded))
+        if len(offsets):
+            self.name_bytes = int(offsets[-1])
+        self.row_count += len(encoded)
+
+    def append_rows(self, ids, rows):
+        """Append (name, type, flowrate, pressure, temperature) tuples"""
+        self.append(ids, [row[0] for row in rows], *encode_rows(rows))
+
+    def _close(self):
+        for f in self.files.values():
+            f.close()
+        self.names_file.close()
+
+    def finish(self):
+        """Write the metadata and move the files into place once the surrounding transaction commits"""
+        self._close()
+        with open(os.path.join(self.tmp_path, 'meta.json'), 'w') as f:
+            json.dump({
+                'version': FORMAT_VERSION,
+                'row_count': self.row_count,
+                'type_names': list(self.type_index),
+                'columns': COLUMNS,
+            }, f)
+        transaction.on_commit(self.publish)
+
+    def publish(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+        os.replace(self.tmp_path, self.path)
+
+    def discard(self):
+        self._close()
+        shutil.rmtree(self.tmp_path, ignore_errors=True)
+
+class EquipmentBlock:
+    """A run of equipment rows held column by column, as served to clients"""
+
+    def __init__(self, ids, names, type_names, type_codes, values):
+        self.ids = ids
+        self.names = names
+        self.type_names = list(type_names)
+        self.type_codes = type_codes
+        self.values = values
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Block of (id, name, type, flowrate, pressure, temperature) tuples"""
+        type_index = {}
+        type_codes = np.fromiter(
+            (type_index.setdefault(row[2], len(type_index)) for row in rows), dtype=np.int16, count=len(rows)
+        )
+        values = np.array([row[3:] for row in rows], dtype=np.float64).reshape(-1, len(PARAMETERS))
+        return cls(
+            np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows)),
+            [row[1] for row in rows], type_index, type_codes,
+            {param: np.ascontiguousarray(values[:, index]) for index, param in enumerate(PARAMETERS)}
+        )
+
+    def __len__(self):
+        return len(self.ids)
+
+    def record(self, index):
+        return {
+            'id': int(self.ids[index]),
+            'equipment_name': self.names[index],
+            'equipment_type': self.type_names[self.type_codes[index]],
+            **{param: float(self.values[param][index]) for param in PARAMETERS}
+        }
+
+    def records(self):
+        """Rows as dicts in the EquipmentSerializer layout"""
+        type_names = self.type_names
+        return [
+            {
+                'id': equipment_id,
+                'equipment_name': name,
+                'equipment_type': type_names[code],
+                'flowrate': flowrate,
+                'pressure': pressure,
+                'temperature': temperature
+            }
+            for equipment_id, name, code, flowrate, pressure, temperature in zip(
+                self.ids.tolist(), self.names, self.type_codes.tolist(),
+                self.values['flowrate'].tolist(), self.values['pressure'].tolist(),
+                self.values['temperature'].tolist()
+            )
+        ]
+
+    def columns(self, binary=False):
+        """One array per column; equipment_type holds indexes into equipment_types
+
+        With binary=True the numeric columns are raw little-endian bytes (dtypes
+        listed under 'dtypes') for formats that carry bytes natively.
+        """
+        numeric = {'id': self.ids, 'equipment_type': self.type_codes, **self.values}
+        dtypes = {name: COLUMNS['type_code' if name == 'equipment_type' else name] for name in numeric}
+        if binary:
+            encoded = {name: np.ascontiguousarray(data, dtype=dtypes[name]).tobytes() for name, data in numeric.items()}
+        else:
+            encoded = {name: data.tolist() for name, data in numeric.items()}
+        data = {
+            'count': len(self),
+            'equipment_types': self.type_names,
+            'columns': {
+                'id': encoded['id'],
+                'equipment_name': self.names,
+                'equipment_type': encoded['equipment_type'],
+                **{param: encoded[param] for param in PARAMETERS}
+            }
+        }
+        if binary:
+            data['dtypes'] = dtypes
+        return data
+
+class StoredColumns(EquipmentColumns):
+    """Memory-mapped columns of a stored dataset"""
+
+    def __init__(self, path, meta):
+        self.path = path
+        self.row_count = meta['row_count']
+        super().__init__(
+            meta['type_names'],
+            self._map('type_code'),
+            self._map('flowrate'),
+            self._map('pressure'),
+            self._map('temperature')
+        )
+        self.ids = self._map('id')
+        self.name_offsets = self._map('name_offsets', self.row_count + 1)
+        self.name_data = self._map_file('names.bin', np.uint8, int(self.name_offsets[-1]))
+
+    def _map(self, name, count=None):
+        return self._map_file(f"{name}.bin", COLUMNS[name], self.row_count if count is None else count)
+
+    def _map_file(self, file_name, dtype, count):
+        if not count:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(os.path.join(self.path, file_name), dtype=dtype, mode='r', shape=(count,))
+
+    def names(self, start=0, stop=None):
+        stop = self.row_count if stop is None else stop
+        offsets = self.name_offsets[start:stop + 1].tolist()
+        if len(offsets) < 2:
+            return []
+        base = offsets[0]
+        data = self.name_data[base:offsets[-1]].tobytes()
+        return [data[begin - base:end - base].decode('utf-8') for begin, end in zip(offsets, offsets[1:])]
+
+    def block(self, start=0, stop=None):
+        """Rows start:stop as an EquipmentBlock; numeric columns stay views of the maps"""
+        rows = slice(start, self.row_count if stop is None else stop)
+        return EquipmentBlock(
+            self.ids[rows], self.names(rows.start, rows.stop), self.type_names, self.type_codes[rows],
+            {param: self.values[param][rows] for param in PARAMETERS}
+        )
+
+    def records(self, start=0, stop=None):
+        """Rows as dicts in the EquipmentSerializer layout"""
+        return self.block(start, stop).records()
+
+def load_columns(dataset_id):
+    """Memory-mapped columns of a dataset, or None if it has no readable columnar copy"""
+    if not columnar_enabled():
+        return None
+    path = dataset_dir(dataset_id)
+    try:
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        if meta.get('version') != FORMAT_VERSION:
+            return None
+        return StoredColumns(path, meta)
+    except (OSError, ValueError, KeyError):
+        return None
+
+def dataset_columns(dataset):
+    """Typed columns of a dataset, memory-mapped when stored, otherwise read from the database"""
+    columns = load_columns(dataset.id)
+    if columns is not None:
+        return columns
+    rows = list(dataset.equipments.order_by('id').values_list('equipment_type', *PARAMETERS))
+    type_index = {}
+    type_codes = np.fromiter(
+        (type_index.setdefault(row[0], len(type_index)) for row in rows), dtype=np.int16, count=len(rows)
+    )
+    values = np.array([row[1:] for row in rows], dtype=np.float64).reshape(-1, len(PARAMETERS))
+    return EquipmentColumns(type_index, type_codes, *(np.ascontiguousarray(values[:, i]) for i in range(len(PARAMETERS))))
+
+def write_dataset_columns(dataset, batch_size=5000):
+    """Build a dataset's columnar copy from its Equipment rows (for datasets ingested without one)"""
+    writer = ColumnarWriter(dataset.id)
+    try:
+        rows = dataset.equipments.order_by('id').values_list(
+            'id', 'equipment_name', 'equipment_type', *PARAMETERS
+        ).iterator(chunk_size=batch_size)
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) == batch_size:
+                writer.append_rows([row[0] for row in chunk], [row[1:] for row in chunk])
+                chunk = []
+        if chunk:
+            writer.append_rows([row[0] for row in chunk], [row[1:] for row in chunk])
+    except Exception:
+        writer.discard()
+        raise
+    writer.finish()
+    return writer.row_count
+
+def remove_columns(dataset_id):
+    path = dataset_dir(dataset_id)
+    shutil.rmtree(path, ignore_errors=True)
+    shutil.rmtree(f"{path}.tmp", ignore_errors=True)
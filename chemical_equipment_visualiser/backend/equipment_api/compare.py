@@ -0,0 +1,135 @@
+"""Comparison of datasets across the upload history.
+
+Statistic and type distribution deltas come from each dataset's stored
+summary. The equipment diff by name runs in SQL as correlated EXISTS
+subqueries on the (dataset, equipment_name) index, so only the counts and
+the listed examples leave the database.
+"""
+from django.conf import settings
+from django.db.models import BooleanField, Case, Exists, OuterRef, Q, Subquery, Value, When
+from .models import Equipment
+from .stats import PARAMETERS
+
+VALUE_FIELDS = ['equipment_type', *PARAMETERS]
+
+def get_max_datasets():
+    return getattr(settings, 'EQUIPMENT_COMPARE_MAX_DATASETS', 10)
+
+def parse_ids(value):
+    """Dataset ids from ?ids=1,2,3, in the order given"""
+    try:
+        ids = [int(part) for part in (value or '').split(',') if part.strip()]
+    except ValueError:
+        raise ValueError("ids must be comma-separated dataset ids")
+    if len(set(ids)) != len(ids):
+        raise ValueError("ids must not repeat")
+    if not 2 <= len(ids) <= get_max_datasets():
+        raise ValueError(f"Compare between 2 and {get_max_datasets()} datasets")
+    return ids
+
+def parse_limit(params, default=100, maximum=1000):
+    try:
+        limit = int(params.get('limit', default))
+    except ValueError:
+        raise ValueError("limit must be an integer")
+    if not 0 <= limit <= maximum:
+        raise ValueError(f"limit must be between 0 and {maximum}")
+    return limit
+
+def change(before, after):
+    return {'from': before, 'to': after, 'delta': after - before}
+
+def stat_deltas(before, after):
+    """Per-statistic changes for the statistics both summaries have"""
+    return {key: change(before[key], after[key]) for key in before if key in after}
+
+def parameter_deltas(before, after):
+    return {
+        param: stat_deltas(before[param], after[param])
+        for param in PARAMETERS if param in before and param in after
+    }
+
+def type_parameter_deltas(before, after):
+    """Parameter deltas for each equipment type present in both datasets"""
+    return {
+        eq_type: parameter_deltas(before[eq_type], after[eq_type])
+        for eq_type in before if eq_type in after
+    }
+
+def distribution_changes(before, after):
+    """Count per equipment type in each dataset (0 when absent)"""
+    types = list(before) + [eq_type for eq_type in after if eq_type not in before]
+    return {eq_type: change(before.get(eq_type, 0), after.get(eq_type, 0)) for eq_type in types}
+
+def same_name(dataset_id):
+    """Rows of a dataset named like the outer row (an index lookup on dataset, equipment_name)"""
+    return Equipment.objects.filter(dataset_id=dataset_id, equipment_name=OuterRef('equipment_name'))
+
+def added_equipment(before_id, after_id):
+    """Rows of the later dataset whose name the earlier one doesn't have"""
+    return Equipment.objects.filter(dataset_id=after_id).filter(~Exists(same_name(before_id)))
+
+def changed_equipment(before_id, after_id):
+    """Rows of the later dataset whose name the earlier one has, but never with the same type and values"""
+    # Inside CASE the value comparisons can't pick a value index, so SQLite stays on the name index
+    same_values = Q(**{field: OuterRef(field) for field in VALUE_FIELDS})
+    identical = same_name(before_id).filter(
+        Case(When(same_values, then=Value(True)), default=Value(False), output_field=BooleanField())
+    )
+    return Equipment.objects.filter(dataset_id=after_id).filter(Exists(same_name(before_id)), ~Exists(identical))
+
+def equipment_diff(before_id, after_id, limit):
+    """Counts of added, removed and changed equipment, with up to limit examples of each by name"""
+    added = added_equipment(before_id, after_id)
+    removed = added_equipment(after_id, before_id)
+    changed = changed_equipment(before_id, after_id)
+
+    previous = same_name(before_id).order_by('id')
+    changed_rows = changed.annotate(**{
+        f"previous_{field}": Subquery(previous.values(field)[:1]) for field in VALUE_FIELDS
+    }).order_by('equipment_name', 'id').values('equipment_name', *VALUE_FIELDS, *(f"previous_{field}" for field in VALUE_FIELDS))
+
+    return {
+        'added_count': added.count(),
+        'removed_count': removed.count(),
+        'changed_count': changed.count(),
+        'added': list(added.order_by('equipment_name', 'id').values('equipment_name', *VALUE_FIELDS)[:limit]),
+        'removed': list(removed.order_by('equipment_name', 'id').values('equipment_name', *VALUE_FIELDS)[:limit]),
+        'changed': [
+            {
+                'equipment_name': row['equipment_name'],
+                'from': {field: row[f"previous_{field}"] for field in VALUE_FIELDS},
+                'to': {field: row[field] for field in VALUE_FIELDS},
+            }
+            for row in changed_rows[:limit]
+        ],
+    }
+
+def compare_pair(before, after, limit):
+    before_stats, after_stats = before.summary_stats, after.summary_stats
+    return {
+        'from': before.id,
+        'to': after.id,
+        'total_count': change(before_stats.get('total_count', 0), after_stats.get('total_count', 0)),
+        'type_distribution': distribution_changes(
+            before_stats.get('equipment_type_distribution', {}), after_stats.get('equipment_type_distribution', {})
+        ),
+        'parameter_stats': parameter_deltas(
+            before_stats.get('parameter_stats', {}), after_stats.get('parameter_stats', {})
+        ),
+        'type_parameter_stats': type_parameter_deltas(
+            before_stats.get('type_parameter_stats', {}), after_stats.get('type_parameter_stats', {})
+        ),
+        'equipment': equipment_diff(before.id, after.id, limit),
+    }
+
+def compare_datasets(datasets, limit=100):
+    """Each dataset compared with the one before it in the given order"""
+    return {
+        'datasets': [
+            {'id': dataset.id, 'name': dataset.name, 'uploaded_at': dataset.uploaded_at,
+             'total_count': dataset.summary_stats.get('total_count', 0)}
+            for dataset in datasets
+        ],
+        'comparisons': [compare_pair(before, after, limit) for before, after in zip(datasets, datasets[1:])],
+    }
@@ -0,0 +1,50 @@
+"""Streaming decompression of compressed CSV uploads."""
+import bz2
+import gzip
+import io
+import lzma
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+CSV_SUFFIXES = {
+    '.csv': None,
+    '.csv.gz': 'gzip',
+    '.csv.bz2': 'bz2',
+    '.csv.xz': 'xz',
+    '.csv.zst': 'zstd',
+}
+
+def supported_suffixes():
+    """File name suffixes accepted for upload in this installation"""
+    return [suffix for suffix, codec in CSV_SUFFIXES.items() if codec != 'zstd' or zstandard is not None]
+
+def is_csv_upload(file_name):
+    return any(file_name.lower().endswith(suffix) for suffix in supported_suffixes())
+
+def compression_for(file_name):
+    """Codec implied by a file name's suffix, or None for plain CSV"""
+    lower = (file_name or '').lower()
+    for suffix, codec in CSV_SUFFIXES.items():
+        if codec and lower.endswith(suffix):
+            return codec
+    return None
+
+def open_decompressed(fileobj, codec):
+    """Wrap a binary file object so reads return decompressed bytes, without inflating it up front
+
+    Closing the returned stream leaves fileobj open.
+    """
+    if codec == 'gzip':
+        return gzip.GzipFile(fileobj=fileobj, mode='rb')
+    if codec == 'bz2':
+        return bz2.BZ2File(fileobj, mode='rb')
+    if codec == 'xz':
+        return lzma.LZMAFile(fileobj, mode='rb')
+    if codec == 'zstd':
+        if zstandard is None:
+            raise ValueError("zstd compressed uploads need the zstandard package")
+        return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(fileobj, closefd=False))
+    raise ValueError(f"Unsupported compression: {codec}")
@@ -0,0 +1,64 @@
+"""Fast JSON encoding of equipment rows, byte-identical to JSONRenderer.
+
+JSONRenderer runs json.dumps over one dict per row. encode_block produces
+the same bytes from an EquipmentBlock: with orjson when it is installed and
+every float prints the same way in both (finite and in decimal notation),
+otherwise with a row template whose type-name fragments are encoded once
+per block. Anything else (NaN/inf, non-default DRF JSON settings) goes
+through JSONRenderer itself.
+"""
+from json.encoder import encode_basestring
+import numpy as np
+from rest_framework.renderers import JSONRenderer
+from .stats import PARAMETERS
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+ROW_TEMPLATE = ('{"id":%d,"equipment_name":%s,"equipment_type":%s,'
+                '"flowrate":%r,"pressure":%r,"temperature":%r}')
+# Python prints floats outside this magnitude range with an exponent, and orjson spells those differently
+DECIMAL_RANGE = (1e-4, 1e16)
+
+def fast_path_available():
+    """The encoders below reproduce compact, non-ASCII-escaped JSON (DRF's defaults)"""
+    return JSONRenderer.compact and not JSONRenderer.ensure_ascii
+
+def _escape_line_separators(body):
+    # JSONRenderer escapes U+2028/U+2029 so its output stays a JavaScript subset
+    return body.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+
+def _decimal_floats(columns):
+    low, high = DECIMAL_RANGE
+    for values in columns:
+        magnitude = np.abs(values)
+        if ((magnitude != 0) & ((magnitude < low) | (magnitude >= high))).any():
+            return False
+    return True
+
+def encode_rows_orjson(block):
+    return _escape_line_separators(orjson.dumps(block.records()))
+
+def encode_rows_template(block):
+    type_fragments = [encode_basestring(name) for name in block.type_names]
+    body = ','.join([
+        ROW_TEMPLATE % (equipment_id, encode_basestring(name), type_fragments[code], flowrate, pressure, temperature)
+        for equipment_id, name, code, flowrate, pressure, temperature in zip(
+            block.ids.tolist(), block.names, block.type_codes.tolist(),
+            block.values['flowrate'].tolist(), block.values['pressure'].tolist(),
+            block.values['temperature'].tolist()
+        )
+    ])
+    return _escape_line_separators(f"[{body}]".encode())
+
+def encode_block(block):
+    """JSON array of a block's rows; the same bytes as JSONRenderer().render(block.records())"""
+    columns = [block.values[param] for param in PARAMETERS]
+    if not fast_path_available() or not all(np.isfinite(values).all() for values in columns):
+        # Non-finite floats raise (or print NaN) exactly as JSONRenderer decides
+        return JSONRenderer().render(block.records())
+    if orjson is not None and _decimal_floats(columns):
+        return encode_rows_orjson(block)
+    return encode_rows_template(block)
@@ -0,0 +1,160 @@
+"""Dataset change notifications, streamed to clients as Server-Sent Events.
+
+Uploads, retention and ingest jobs record a DatasetEvent row in the same
+transaction as the change they describe, so every server process (and every
+gunicorn worker) finds them by polling that table; no broker is involved.
+Event ids only grow (SQLite AUTOINCREMENT), so an event's id is also the
+version of the data after it, and the SSE id a reconnecting client sends back
+in Last-Event-ID. Rows counted by a running job are not written to the
+database, where they would wait on the ingest's write lock; streams read them
+from the progress files the job workers already publish.
+
+    GET /api/events/  (Accept: text/event-stream)
+
+    event: ready
+    data: {"version": 41, "latest_dataset_id": 16, "running_jobs": []}
+
+    id: 42
+    event: dataset-created
+    data: {"version": 42, "dataset_id": 17, "content_hash": "...", "total_count": 1000, ...}
+
+A stream ends after EQUIPMENT_EVENTS_STREAM_SECONDS so it never holds a
+worker thread for long; clients reconnect and pick up where they left off.
+"""
+import asyncio
+import json
+import time
+from django.conf import settings
+from django.db import OperationalError
+from .models import DatasetEvent, EquipmentDataset, IngestJob
+
+def get_poll_seconds():
+    return getattr(settings, 'EQUIPMENT_EVENTS_POLL_SECONDS', 1.0)
+
+def get_stream_seconds():
+    return getattr(settings, 'EQUIPMENT_EVENTS_STREAM_SECONDS', 60)
+
+def get_heartbeat_seconds():
+    return getattr(settings, 'EQUIPMENT_EVENTS_HEARTBEAT_SECONDS', 15)
+
+def get_events_kept():
+    return getattr(settings, 'EQUIPMENT_EVENTS_KEPT', 1000)
+
+def record_event(kind, **data):
+    """Store an event for the streams to pick up; call it inside the transaction making the change"""
+    event = DatasetEvent.objects.create(kind=kind, data=data)
+    # Reconnecting clients only need recent history; older ones resync from the ready event
+    DatasetEvent.objects.filter(id__lte=event.id - get_events_kept()).delete()
+    return event
+
+def dataset_created(dataset):
+    return record_event(
+        'dataset-created', dataset_id=dataset.id, name=dataset.name, file_name=dataset.file_name,
+        content_hash=dataset.content_hash, total_count=dataset.summary_stats.get('total_count', 0)
+    )
+
+def datasets_pruned(dataset_ids):
+    return record_event('dataset-pruned', dataset_ids=list(dataset_ids))
+
+def job_changed(job):
+    return record_event(
+        'job-progress', job_id=str(job.id), state=job.state, dataset_id=job.dataset_id,
+        rows_processed=job.rows_processed, bytes_total=job.bytes_total, error=job.error
+    )
+
+def parse_last_event_id(value):
+    if value in (None, ''):
+        return None
+    try:
+        last_id = int(value)
+    except ValueError:
+        raise ValueError("Last-Event-ID must be an integer")
+    if last_id < 0:
+        raise ValueError("Last-Event-ID must not be negative")
+    return last_id
+
+def format_event(kind, data, event_id=None):
+    lines = [] if event_id is None else [f"id: {event_id}"]
+    lines += [f"event: {kind}", f"data: {json.dumps(data, separators=(',', ':'))}"]
+    return '\n'.join(lines) + '\n\n'
+
+class EventStream:
+    """One client's stream: a ready event, then whatever happens after its last seen event"""
+
+    def __init__(self, last_event_id=None):
+        self.last_id = last_event_id
+        self.running = {}
+        self.last_sent = 0
+
+    def open(self):
+        """The first messages: reconnect delay and the state the client should be showing"""
+        version = DatasetEvent.objects.order_by('-id').values_list('id', flat=True).first() or 0
+        if self.last_id is None or self.last_id > version:
+            self.last_id = version
+        latest = EquipmentDataset.objects.order_by('-uploaded_at').values_list('id', flat=True).first()
+        for job_id, bytes_total in IngestJob.objects.filter(state='running').values_list('id', 'bytes_total'):
+            self.running[str(job_id)] = {'bytes_total': bytes_total, 'rows_processed': None}
+        self.last_sent = time.monotonic()
+        return [
+            f"retry: {int(get_poll_seconds() * 1000) + 1000}\n\n",
+            format_event('ready', {'version': version, 'latest_dataset_id': latest,
+                                   'running_jobs': sorted(self.running)}),
+        ]
+
+    def poll(self):
+        """Messages for events recorded since the last poll, plus row counts of running jobs"""
+        # jobs records events, so import it here rather than at module level
+        from .jobs import read_progress
+
+        messages = []
+        try:
+            events = list(DatasetEvent.objects.filter(id__gt=self.last_id).order_by('id')[:500])
+        except OperationalError:
+            # SQLite is locked by a writer: the events will still be there next poll
+            events = []
+        for event in events:
+            data = dict(event.data, version=event.id)
+            messages.append(format_event(event.kind, data, event.id))
+            self.last_id = event.id
+            if event.kind == 'job-progress':
+                if data['state'] == 'running':
+                    self.running[data['job_id']] = {'bytes_total': data['bytes_total'], 'rows_processed': None}
+                else:
+                    self.running.pop(data['job_id'], None)
+
+        for job_id, job in self.running.items():
+            progress = read_progress(job_id)
+            if progress and progress['rows_processed'] != job['rows_processed']:
+                job['rows_processed'] = progress['rows_processed']
+                # Live counts aren't stored, so they carry no id and don't move Last-Event-ID
+                messages.append(format_event('job-progress', dict(
+                    progress, job_id=job_id, state='running', bytes_total=job['bytes_total'], version=self.last_id
+                )))
+
+        now = time.monotonic()
+        if messages:
+            self.last_sent = now
+        elif now - self.last_sent >= get_heartbeat_seconds():
+            # A comment line keeps proxies from closing an idle connection
+            messages.append(': keep-alive\n\n')
+            self.last_sent = now
+        return messages
+
+    def messages(self):
+        """The stream for a sync view; replays missed events, then polls until the stream time is up"""
+        yield from self.open()
+        yield from self.poll()
+        deadline = time.monotonic() + get_stream_seconds()
+        while time.monotonic() < deadline:
+            time.sleep(get_poll_seconds())
+            yield from self.poll()
+
+    async def amessages(self, in_thread):
+        """The same stream for an async view; in_thread(func) makes the blocking polls awaitable"""
+        for message in await in_thread(lambda: self.open() + self.poll())():
+            yield message
+        deadline = time.monotonic() + get_stream_seconds()
+        while time.monotonic() < deadline:
+            await asyncio.sleep(get_poll_seconds())
+            for message in await in_thread(self.poll)():
+                yield message
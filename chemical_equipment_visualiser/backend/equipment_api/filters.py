@@ -0,0 +1,74 @@
+"""Query parameter filtering and sorting of equipment rows.
+
+Every filter maps onto a composite (dataset, column) index on Equipment:
+equality on equipment_type, ranges on the numeric columns, and name
+prefixes expressed as a range rather than LIKE so the index can serve them.
+"""
+import math
+from .stats import PARAMETERS
+
+SORT_FIELDS = ['id', 'equipment_name', 'equipment_type'] + PARAMETERS
+FILTER_PARAMS = ['equipment_type', 'name_prefix'] + [
+    f"{param}_{bound}" for param in PARAMETERS for bound in ('min', 'max')
+]
+
+def has_filters(params):
+    return any(params.get(name) not in (None, '') for name in FILTER_PARAMS)
+
+def parse_number(params, name):
+    value = params.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        number = float(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a number")
+    if not math.isfinite(number):
+        raise ValueError(f"{name} must be finite")
+    return number
+
+def prefix_range(field, prefix):
+    """Lookups matching values that start with prefix, as a half-open range"""
+    lookups = {f"{field}__gte": prefix}
+    if ord(prefix[-1]) < 0x10FFFF:
+        lookups[f"{field}__lt"] = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    else:
+        lookups[f"{field}__startswith"] = prefix
+    return lookups
+
+def filter_equipment(queryset, params):
+    """Apply equipment_type, <param>_min/<param>_max and name_prefix from a QueryDict"""
+    # Repeated or comma-separated: ?equipment_type=Pump,Valve
+    types = [eq_type for value in params.getlist('equipment_type') for eq_type in value.split(',') if eq_type]
+    if len(types) == 1:
+        queryset = queryset.filter(equipment_type=types[0])
+    elif types:
+        queryset = queryset.filter(equipment_type__in=types)
+
+    for param in PARAMETERS:
+        minimum = parse_number(params, f"{param}_min")
+        maximum = parse_number(params, f"{param}_max")
+        if minimum is not None:
+            queryset = queryset.filter(**{f"{param}__gte": minimum})
+        if maximum is not None:
+            queryset = queryset.filter(**{f"{param}__lte": maximum})
+
+    prefix = params.get('name_prefix')
+    if prefix:
+        queryset = queryset.filter(**prefix_range('equipment_name', prefix))
+    return queryset
+
+def get_sort(params):
+    """(field, descending) from the sort parameter, e.g. sort=-flowrate"""
+    sort = params.get('sort') or 'id'
+    field = sort.lstrip('-')
+    if field not in SORT_FIELDS:
+        raise ValueError(f"sort must be one of {', '.join(SORT_FIELDS)} (prefix with - for descending)")
+    return field, sort.startswith('-')
+
+def sort_equipment(queryset, field, descending):
+    """Order by the field with id as tie-breaker, matching the (dataset, field) index order"""
+    prefix = '-' if descending else ''
+    if field == 'id':
+        return queryset.order_by(f"{prefix}id")
+    return queryset.order_by(f"{prefix}{field}", f"{prefix}id")
@@ -0,0 +1,293 @@
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from django.conf import settings
+from django.core.files.move import file_move_safe
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+from .events import job_changed
+from .models import IngestJob
+from .retention import clean_up_abandoned_datasets, prune
+from .workers import init_worker, run_ingest_job
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+INTERRUPTED_ERROR = "Interrupted by a server restart or a crashed worker; upload the file again"
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# Open, locked files of the jobs this process has queued (see claim_file)
+_claimed_files = {}
+_claimed_files_lock = threading.Lock()
+
+def async_uploads_enabled():
+    """Whether uploads are handed to the background worker pool"""
+    return getattr(settings, 'EQUIPMENT_ASYNC_UPLOADS', True) and get_worker_count() > 0
+
+def get_worker_count():
+    return getattr(settings, 'EQUIPMENT_JOB_WORKERS', 2)
+
+def get_job_dir():
+    """Directory holding spooled uploads and job progress files"""
+    job_dir = str(getattr(settings, 'EQUIPMENT_JOB_DIR', os.path.join(settings.BASE_DIR, 'uploads')))
+    os.makedirs(job_dir, exist_ok=True)
+    return job_dir
+
+def get_executor():
+    """Lazily create the process pool for this server process"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=get_worker_count(),
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=init_worker
+            )
+        return _executor
+
+def claim_file(path):
+    """Lock a job's file until release_file; False if another live process holds it
+
+    The process that queues a job holds the lock until the job ends, and the OS
+    drops it when that process dies, so a queued or running job whose file can
+    be claimed was abandoned. Without fcntl there is nothing to lock.
+    """
+    if fcntl is None:
+        return True
+    f = open(path, 'rb')
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        f.close()
+        return False
+    with _claimed_files_lock:
+        _claimed_files[path] = f
+    return True
+
+def release_file(path):
+    with _claimed_files_lock:
+        f = _claimed_files.pop(path, None)
+    if f is not None:
+        f.close()
+
+def _job_done(job_id, file_path, future):
+    release_file(file_path)
+    if future.cancelled() or future.exception() is not None:
+        # The worker died (or the pool shut down) before run_job recorded an outcome
+        try:
+            fail_interrupted_jobs(IngestJob.objects.filter(pk=job_id))
+        except Exception:
+            logger.exception("Could not record the failure of job %s", job_id)
+        finally:
+            connection.close()
+
+def submit_job(job_id, file_path):
+    """Submit a job to the pool, replacing the pool if a worker died"""
+    global _executor
+    try:
+        future = get_executor().submit(run_ingest_job, job_id)
+    except BrokenProcessPool:
+        with _executor_lock:
+            _executor = None
+        future = get_executor().submit(run_ingest_job, job_id)
+    future.add_done_callback(lambda future: _job_done(job_id, file_path, future))
+    return future
+
+def _progress_path(job_id):
+    return os.path.join(get_job_dir(), f"{job_id}.progress.json")
+
+def write_progress(job_id, rows_processed, bytes_processed):
+    """Publish progress through a small file so any server process can report it"""
+    path = _progress_path(job_id)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({'rows_processed': rows_processed, 'bytes_processed': bytes_processed}, f)
+    os.replace(tmp_path, path)
+
+def read_progress(job_id):
+    try:
+        with open(_progress_path(job_id)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def enqueue_file(file_path, file_name, dataset_name, bytes_total, content_hash=''):
+    """Create a job for a CSV already stored on disk and submit it to the pool"""
+    # Before the job exists, so no other process can take it for abandoned
+    claim_file(file_path)
+    job = IngestJob.objects.create(
+        dataset_name=dataset_name,
+        file_name=file_name,
+        file_path=file_path,
+        bytes_total=bytes_total,
+        content_hash=content_hash
+    )
+    job_changed(job)
+    job_id = str(job.id)
+    transaction.on_commit(lambda: submit_job(job_id, file_path))
+    return job
+
+def submit_upload(uploaded_file, dataset_name, content_hash=''):
+    """Move an uploaded file into the job directory and enqueue it
+
+    An upload Django already spooled to a temporary file is renamed (copied
+    only across filesystems); a small one held in memory is written out.
+    """
+    file_path = os.path.join(get_job_dir(), f"{time.time_ns()}-{os.getpid()}.upload")
+    if hasattr(uploaded_file, 'temporary_file_path'):
+        uploaded_file.file.flush()
+        file_move_safe(uploaded_file.temporary_file_path(), file_path)
+        bytes_total = os.path.getsize(file_path)
+    else:
+        bytes_total = 0
+        with open(file_path, 'wb') as f:
+            for chunk in uploaded_file.chunks():
+                f.write(chunk)
+                bytes_total += len(chunk)
+    return enqueue_file(file_path, uploaded_file.name, dataset_name, bytes_total, content_hash)
+
+def _remove_job_files(job):
+    for path in (job.file_path, _progress_path(job.id)):
+        if os.path.exists(path):
+            os.remove(path)
+
+def fail_interrupted_jobs(jobs):
+    """Mark queued or running jobs that will never finish as failed and remove their files"""
+    for job in jobs:
+        # Conditional, so a job that finished in the meantime keeps its outcome
+        failed = IngestJob.objects.filter(pk=job.pk, state__in=['queued', 'running']).update(
+            state='failed', error=INTERRUPTED_ERROR, finished_at=timezone.now()
+        )
+        if failed:
+            job.refresh_from_db()
+            job_changed(job)
+            _remove_job_files(job)
+
+def recover_jobs():
+    """Fail queued or running jobs whose server process is gone; returns their ids
+
+    Then deletes the hidden datasets of ingests that died, once no ingest runs.
+    Jobs other live processes own are left alone, so every server process can
+    run this when it starts.
+    """
+    if fcntl is None:
+        return []
+    abandoned = []
+    try:
+        for job in IngestJob.objects.filter(state__in=['queued', 'running']):
+            try:
+                claimed = claim_file(job.file_path)
+            except FileNotFoundError:
+                claimed = True
+            if claimed:
+                abandoned.append(job)
+        fail_interrupted_jobs(abandoned)
+    finally:
+        for job in abandoned:
+            release_file(job.file_path)
+    # Also whatever an ingest in a request left when its server process died
+    clean_up_abandoned_datasets()
+    return [str(job.id) for job in abandoned]
+
+def _recover_jobs():
+    try:
+        recovered = recover_jobs()
+        if recovered:
+            logger.warning("Failed %d ingest jobs interrupted by a restart: %s", len(recovered), recovered)
+    except Exception:
+        logger.exception("Could not recover interrupted ingest jobs")
+    finally:
+        connection.close()
+
+def recover_jobs_in_background():
+    """Run recover_jobs in a thread at server startup rather than ahead of the first requests"""
+    threading.Thread(target=_recover_jobs, name='job-recovery', daemon=True).start()
+
+def run_job(job_id):
+    """Ingest a queued job's file; runs inside a pool process"""
+    from .utils import find_duplicate, make_latest, process_csv_file
+
+    close_old_connections()
+    job = IngestJob.objects.get(pk=job_id)
+
+    try:
+        job.state = 'running'
+        job.started_at = timezone.now()
+        job.save(update_fields=['state', 'started_at'])
+        job_changed(job)
+
+        # Identical content may have been ingested while this job was queued
+        dataset = find_duplicate(job.content_hash)
+        if dataset is not None:
+            make_latest(dataset)
+        else:
+            with open(job.file_path, 'rb') as f:
+                dataset = process_csv_file(
+                    f, job.dataset_name,
+                    file_name=job.file_name,
+                    progress=lambda rows, position: write_progress(job_id, rows, position),
+                    content_hash=job.content_hash or None
+                )
+        job.state = 'succeeded'
+        job.dataset = dataset
+        job.rows_processed = dataset.summary_stats.get('total_count', 0)
+    except Exception as e:
+        job.state = 'failed'
+        job.error = str(e)
+    finally:
+        job.finished_at = timezone.now()
+        try:
+            job.save(update_fields=['state', 'started_at', 'dataset', 'rows_processed', 'error', 'finished_at'])
+            job_changed(job)
+        except Exception:
+            logger.exception("Could not record the outcome of job %s", job_id)
+        _remove_job_files(job)
+
+    # Already off the request path, so apply retention right here
+    if job.state == 'succeeded':
+        try:
+            prune()
+        except Exception:
+            logger.exception("Dataset retention failed after job %s", job_id)
+    close_old_connections()
+    return job.state
+
+def job_status(job):
+    """Serializable status of a job including live progress and throughput"""
+    rows_processed = job.rows_processed
+    bytes_processed = job.bytes_total if job.state == 'succeeded' else 0
+    if job.state == 'running':
+        progress = read_progress(job.id)
+        if progress:
+            rows_processed = progress['rows_processed']
+            bytes_processed = progress['bytes_processed']
+
+    elapsed = None
+    if job.started_at:
+        elapsed = ((job.finished_at or timezone.now()) - job.started_at).total_seconds()
+
+    return {
+        'job_id': str(job.id),
+        'state': job.state,
+        'dataset_name': job.dataset_name,
+        'file_name': job.file_name,
+        'rows_processed': rows_processed,
+        'bytes_processed': bytes_processed,
+        'bytes_total': job.bytes_total,
+        'elapsed_seconds': elapsed,
+        'rows_per_second': rows_processed / elapsed if elapsed else None,
+        'dataset_id': job.dataset_id,
+        'error': job.error or None,
+        'created_at': job.created_at,
+    }
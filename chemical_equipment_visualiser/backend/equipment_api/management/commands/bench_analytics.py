@@ -0,0 +1,112 @@
+import csv
+import os
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+from django.core.management.base import BaseCommand
+from equipment_api.analytics import QuantileBuilder, add_quantiles, chunk_stats, encode_rows
+from equipment_api.parsing import iter_parsed_chunks, validate_fieldnames
+from equipment_api.stats import DatasetStats
+from .bench_parse import write_csv
+
+def legacy_calculate_stats(values):
+    """The original pure-Python calculate_stats"""
+    mean = sum(values) / len(values)
+    variance = sum((x - mean) ** 2 for x in values) / len(values)
+    std_dev = variance ** 0.5
+    return {
+        'mean': mean,
+        'min': min(values),
+        'max': max(values),
+        'std': std_dev
+    }
+
+def legacy_summary(path):
+    """The original ingest: read every row into memory, then analyze_equipment_data"""
+    with open(path, newline='', encoding='utf-8') as f:
+        data = list(csv.DictReader(f))
+    type_distribution = {}
+    for row in data:
+        type_distribution[row['Type']] = type_distribution.get(row['Type'], 0) + 1
+    return {
+        'total_count': len(data),
+        'equipment_type_distribution': type_distribution,
+        'parameter_stats': {
+            param: legacy_calculate_stats([float(row[column]) for row in data])
+            for param, column in [('flowrate', 'Flowrate'), ('pressure', 'Pressure'), ('temperature', 'Temperature')]
+        }
+    }
+
+def ingest_summary(path, quantiles=None, batch_size=5000):
+    """summary_stats as process_csv_file computes them, chunk by chunk, without the database writes"""
+    stats = DatasetStats()
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.DictReader(f)
+        validate_fieldnames(reader.fieldnames)
+        for chunk in iter_parsed_chunks(reader, batch_size):
+            columns = encode_rows(chunk)
+            stats.merge(chunk_stats(*columns))
+            if quantiles is not None:
+                quantiles.add_columns(*columns)
+    summary = stats.summary()
+    if quantiles is not None:
+        add_quantiles(summary, quantiles)
+    return summary
+
+def peak_mb(function, *args):
+    """Peak Python allocations of a call, in a pass of its own since tracing slows it down"""
+    tracemalloc.start()
+    try:
+        function(*args)
+        return tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    finally:
+        tracemalloc.stop()
+
+class Command(BaseCommand):
+    help = 'Benchmark ingest summary statistics, CSV parsing included, against the original analyze_equipment_data'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', nargs='+', type=int, default=[100_000, 1_000_000])
+        parser.add_argument('--file', help='Benchmark an existing CSV instead of generated data')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{'rows':>12} {'legacy (s)':>11} {'ingest (s)':>11} {'+ quantiles (s)':>16} "
+            f"{'legacy MB':>10} {'ingest MB':>10}"
+        )
+        if options['file']:
+            self.run(options['file'])
+        else:
+            for rows in options['rows']:
+                with tempfile.TemporaryDirectory() as tmp:
+                    path = os.path.join(tmp, 'bench.csv')
+                    write_csv(path, rows, options['seed'])
+                    self.run(path)
+        self.stdout.write('ingest is the bounded-memory path process_csv_file uses; '
+                          'quantiles add median, p5/p25/p75/p95 and IQR overall and per type')
+
+    def run(self, path):
+        start = time.perf_counter()
+        legacy = legacy_summary(path)
+        legacy_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        summary = ingest_summary(path)
+        ingest_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        ingest_summary(path, QuantileBuilder())
+        quantile_time = time.perf_counter() - start
+
+        assert summary['total_count'] == legacy['total_count']
+        assert summary['equipment_type_distribution'] == legacy['equipment_type_distribution']
+        for param, stats in legacy['parameter_stats'].items():
+            assert np.isclose(stats['mean'], summary['parameter_stats'][param]['mean'])
+            assert np.isclose(stats['std'], summary['parameter_stats'][param]['std'])
+
+        self.stdout.write(
+            f"{legacy['total_count']:>12,} {legacy_time:>11.3f} {ingest_time:>11.3f} {quantile_time:>16.3f} "
+            f"{peak_mb(legacy_summary, path):>10.1f} {peak_mb(ingest_summary, path, QuantileBuilder()):>10.1f}"
+        )
@@ -0,0 +1,62 @@
+import base64
+import time
+from django.contrib.auth import authenticate
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.authentication import BasicAuthentication, TokenAuthentication
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from equipment_api.authentication import CachedTokenAuthentication, forget_token, issue_token
+
+class Command(BaseCommand):
+    help = 'Measure per-request authentication cost of Basic auth against API tokens, with and without the token cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=20, help='Requests per scheme')
+        parser.add_argument('--user', default='api_user')
+        parser.add_argument('--password', default='api_password123')
+        parser.add_argument('--url', help='Also time full HTTP requests against a running server, '
+                                          'e.g. http://localhost:8000/api/equipment-types/')
+
+    def handle(self, *args, **options):
+        user = authenticate(username=options['user'], password=options['password'])
+        if user is None:
+            raise CommandError(f"Cannot log in as {options['user']}")
+        token = issue_token(user)
+        basic = 'Basic ' + base64.b64encode(f"{options['user']}:{options['password']}".encode()).decode()
+        count = options['requests']
+
+        self.stdout.write(f"{count} requests per scheme")
+        self.stdout.write(f"{'scheme':>24} {'ms/request':>11} {'requests/s':>11}")
+        forget_token(token.key)
+        self.report('basic (PBKDF2)', self.time_authenticator(BasicAuthentication(), basic, count), count)
+        self.report('token, database lookup',
+                    self.time_authenticator(TokenAuthentication(), f"Token {token.key}", count), count)
+        forget_token(token.key)
+        self.report('token, cached',
+                    self.time_authenticator(CachedTokenAuthentication(), f"Token {token.key}", count), count)
+
+        if options['url']:
+            import requests
+            self.stdout.write(f"\nGET {options['url']}")
+            self.report('HTTP basic', self.time_http(requests, options['url'], basic, count), count)
+            self.report('HTTP token', self.time_http(requests, options['url'], f"Token {token.key}", count), count)
+
+    def report(self, name, elapsed, count):
+        self.stdout.write(f"{name:>24} {elapsed / count * 1000:>11.2f} {count / elapsed:>11,.0f}")
+
+    def time_authenticator(self, authenticator, header, count):
+        factory = APIRequestFactory()
+        start = time.perf_counter()
+        for _ in range(count):
+            request = Request(factory.get('/api/summary/', HTTP_AUTHORIZATION=header))
+            if authenticator.authenticate(request) is None:
+                raise CommandError(f"{type(authenticator).__name__} rejected the credentials")
+        return time.perf_counter() - start
+
+    def time_http(self, requests, url, header, count):
+        start = time.perf_counter()
+        for _ in range(count):
+            response = requests.get(url, headers={'Authorization': header})
+            if response.status_code != 200:
+                raise CommandError(f"{url} returned {response.status_code}")
+        return time.perf_counter() - start
@@ -0,0 +1,68 @@
+import time
+import numpy as np
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+from equipment_api.columnar import EquipmentBlock
+from equipment_api.encoders import encode_block, encode_rows_orjson, encode_rows_template, orjson
+from equipment_api.models import EquipmentDataset
+from equipment_api.renderers import EquipmentJSONRenderer
+from equipment_api.serializers import EquipmentSerializer
+from equipment_api.stats import PARAMETERS
+
+def decimal_block(rows, seed):
+    rng = np.random.default_rng(seed)
+    values = np.round(rng.uniform([50, 1, 50], [300, 20, 400], (rows, 3)), 2)
+    types = ['Pump', 'Compressor', 'Valve', 'HeatExchanger', 'Reactor', 'Condenser']
+    return EquipmentBlock(
+        np.arange(1, rows + 1, dtype=np.int64), [f"EQ-{i}" for i in range(rows)], types,
+        rng.integers(0, len(types), rows).astype(np.int16),
+        {param: np.ascontiguousarray(values[:, i]) for i, param in enumerate(PARAMETERS)}
+    )
+
+class Command(BaseCommand):
+    help = ('Time the fast equipment JSON encoders against EquipmentSerializer + JSONRenderer '
+            '(their byte-for-byte parity is covered by the equipment_api tests)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100_000, help='Rows of generated data to time')
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        self.benchmark(options['rows'], options['repeat'])
+
+    def encoders(self, block):
+        encoders = {'encode_block': encode_block, 'template': encode_rows_template}
+        if orjson is not None:
+            encoders['orjson'] = encode_rows_orjson
+        encoders['renderer'] = lambda block: EquipmentJSONRenderer().render({'results': block})[len(b'{"results":'):-1]
+        return encoders
+
+    def best(self, func, repeat):
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - start)
+        return min(times)
+
+    def benchmark(self, rows, repeat):
+        block = decimal_block(rows, 1)
+        records = block.records()
+        self.stdout.write(f"\n{rows:,} rows, best of {repeat}")
+        self.stdout.write(f"{'encoder':>28} {'seconds':>9} {'rows/s':>12}")
+        timings = [
+            ('records + JSONRenderer', lambda: JSONRenderer().render(block.records())),
+            ('JSONRenderer (dicts ready)', lambda: JSONRenderer().render(records)),
+        ]
+        timings += [(name, lambda encode=encode: encode(block)) for name, encode in self.encoders(block).items()]
+        for name, func in timings:
+            elapsed = self.best(func, repeat)
+            self.stdout.write(f"{name:>28} {elapsed:>9.3f} {rows / elapsed:>12,.0f}")
+
+        # The per-object serializer, on a smaller sample since it is much slower
+        dataset = EquipmentDataset.objects.order_by('-uploaded_at').first()
+        if dataset is not None:
+            equipment = list(dataset.equipments.order_by('id')[:10_000])
+            elapsed = self.best(lambda: JSONRenderer().render(EquipmentSerializer(equipment, many=True).data), 1)
+            self.stdout.write(f"{'EquipmentSerializer':>28} {elapsed:>9.3f} {len(equipment) / elapsed:>12,.0f}"
+                              f"  ({len(equipment):,} stored rows)")
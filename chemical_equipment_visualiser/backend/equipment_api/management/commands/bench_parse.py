@@ -0,0 +1,82 @@
+import csv
+import os
+import tempfile
+import time
+import numpy as np
+from django.core.management.base import BaseCommand
+from equipment_api.parallel import iter_parsed_ranges
+from equipment_api.parsing import iter_parsed_chunks, validate_fieldnames
+from equipment_api.stats import DatasetStats
+
+TYPES = ['Pump', 'Compressor', 'Valve', 'HeatExchanger', 'Reactor', 'Condenser']
+
+def write_csv(path, rows, seed):
+    rng = np.random.default_rng(seed)
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Equipment Name', 'Type', 'Flowrate', 'Pressure', 'Temperature'])
+        for start in range(0, rows, 100_000):
+            size = min(100_000, rows - start)
+            types = rng.integers(0, len(TYPES), size)
+            values = np.round(rng.uniform([50, 1, 50], [300, 20, 400], (size, 3)), 2).tolist()
+            writer.writerows(
+                (f"EQ-{start + i}", TYPES[t], *v) for i, (t, v) in enumerate(zip(types.tolist(), values))
+            )
+
+def parse_serial(path, batch_size=5000):
+    stats = DatasetStats()
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.DictReader(f)
+        validate_fieldnames(reader.fieldnames)
+        for chunk in iter_parsed_chunks(reader, batch_size):
+            stats.add_rows(chunk)
+    return stats
+
+def parse_parallel(path, workers):
+    stats = DatasetStats()
+    for parsed in iter_parsed_ranges(path, workers):
+        stats.merge(parsed.stats)
+    return stats
+
+class Command(BaseCommand):
+    help = 'Benchmark serial against multi-process CSV parsing (parse and statistics only, no database writes)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', nargs='+', type=int, default=[1_000_000, 5_000_000])
+        parser.add_argument('--workers', nargs='+', type=int, default=[2, 4, os.cpu_count() or 1])
+        parser.add_argument('--file', help='Benchmark an existing CSV instead of generated data')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        workers = sorted(set(w for w in options['workers'] if w > 1))
+        self.stdout.write(f"cpus: {os.cpu_count()}")
+        self.stdout.write(f"{'rows':>12} {'MB':>8} {'mode':>12} {'seconds':>9} {'rows/s':>12} {'speedup':>8}")
+
+        if options['file']:
+            self.run(options['file'], workers)
+            return
+        for rows in options['rows']:
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, 'bench.csv')
+                write_csv(path, rows, options['seed'])
+                self.run(path, workers)
+
+    def run(self, path, workers):
+        size_mb = os.path.getsize(path) / 1024 / 1024
+        start = time.perf_counter()
+        serial = parse_serial(path)
+        serial_time = time.perf_counter() - start
+        self.report(serial.count, size_mb, 'serial', serial_time, serial_time)
+
+        for count in workers:
+            start = time.perf_counter()
+            parallel = parse_parallel(path, count)
+            elapsed = time.perf_counter() - start
+            assert parallel.count == serial.count
+            assert np.isclose(parallel.parameters['flowrate'].mean, serial.parameters['flowrate'].mean)
+            self.report(parallel.count, size_mb, f"{count} procs", elapsed, serial_time)
+
+    def report(self, rows, size_mb, mode, elapsed, baseline):
+        self.stdout.write(
+            f"{rows:>12,} {size_mb:>8.1f} {mode:>12} {elapsed:>9.2f} {rows / elapsed:>12,.0f} {baseline / elapsed:>7.1f}x"
+        )
@@ -0,0 +1,205 @@
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+from contextlib import nullcontext
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from equipment_api.sqlite import apply_pragmas, get_pragmas, ingest_lock
+
+# Rollback journal, as SQLite and Django configure it by default
+ROLLBACK_PROFILE = {'journal_mode': 'DELETE', 'synchronous': 'FULL', 'busy_timeout': 5000}
+
+# What the read endpoints ask the database for
+READ_QUERIES = [
+    ('latest summary', "SELECT id, content_hash, summary_stats FROM equipment_api_equipmentdataset "
+                       "ORDER BY uploaded_at DESC LIMIT 1", False),
+    ('equipment page', "SELECT id, equipment_name, equipment_type, flowrate, pressure, temperature "
+                       "FROM equipment_api_equipment WHERE dataset_id = ? ORDER BY id LIMIT 500", True),
+    ('type filter', "SELECT id, flowrate, pressure, temperature FROM equipment_api_equipment "
+                    "WHERE dataset_id = ? AND equipment_type = 'Pump' ORDER BY id LIMIT 500", True),
+]
+TYPES = ['Pump', 'Valve', 'Compressor', 'HeatExchanger', 'Reactor']
+
+class Command(BaseCommand):
+    help = ('Measure reads and short writes (job and event bookkeeping) while large ingests write: the default '
+            'rollback-journal setup, WAL with one transaction per ingest, and WAL with a commit per batch as '
+            'ingest does. Runs on a temporary copy of the database.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=300000, help='Rows per ingest')
+        parser.add_argument('--ingests', type=int, default=2, help='Concurrent ingests')
+        parser.add_argument('--readers', type=int, default=4, help='Concurrent reader threads')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per INSERT batch')
+        parser.add_argument('--pause', type=float, default=0.01, help='Seconds each reader waits between queries')
+        parser.add_argument('--write-pause', type=float, default=0.1, help='Seconds between short writes')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('This benchmark is for SQLite databases')
+        connection.ensure_connection()
+        workdir = tempfile.mkdtemp(prefix='bench-sqlite-')
+        try:
+            # (name, pragmas, ingest lock, commit per batch)
+            profiles = [
+                ('rollback journal, one transaction', ROLLBACK_PROFILE, False, False),
+                ('WAL, one transaction', get_pragmas(), True, False),
+                ('WAL, commit per batch', get_pragmas(), True, True),
+            ]
+            self.stdout.write(f"{options['ingests']} ingests of {options['rows']:,} rows, "
+                              f"{options['readers']} readers")
+            for name, pragmas, locked, chunked in profiles:
+                path = os.path.join(workdir, f"{len(os.listdir(workdir))}.sqlite3")
+                # A copy of the real schema and data; the backup API copies consistently while in use
+                target = sqlite3.connect(path)
+                connection.connection.backup(target)
+                target.close()
+                self.report(name, pragmas, self.run(path, pragmas, locked, chunked, options))
+            self.report_connections(path, get_pragmas())
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    def connect(self, path, pragmas):
+        db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        apply_pragmas(db, pragmas)
+        return db
+
+    def run(self, path, pragmas, locked, chunked, options):
+        db = self.connect(path, pragmas)
+        dataset_id = db.execute("SELECT id FROM equipment_api_equipmentdataset ORDER BY uploaded_at DESC LIMIT 1"
+                                ).fetchone()
+        db.close()
+        dataset_id = dataset_id[0] if dataset_id else 0
+        results = {'reads': [], 'read_errors': 0, 'writes': [], 'write_errors': 0, 'ingests': [], 'ingest_errors': []}
+        lock = threading.Lock()
+        writing = threading.Event()
+        writing.set()
+
+        def ingest(number):
+            db = self.connect(path, pragmas)
+            start = time.perf_counter()
+            try:
+                with ingest_lock(f"{path}.ingest.lock") if locked else nullcontext():
+                    self.write_dataset(db, number, options['rows'], options['batch_size'], chunked)
+                with lock:
+                    results['ingests'].append(time.perf_counter() - start)
+            except sqlite3.OperationalError as e:
+                with lock:
+                    results['ingest_errors'].append(str(e))
+            finally:
+                db.close()
+
+        def read():
+            db = self.connect(path, pragmas)
+            index = 0
+            while writing.is_set():
+                _, sql, takes_dataset = READ_QUERIES[index % len(READ_QUERIES)]
+                index += 1
+                start = time.perf_counter()
+                try:
+                    db.execute(sql, (dataset_id,) if takes_dataset else ()).fetchall()
+                    elapsed = time.perf_counter() - start
+                    with lock:
+                        results['reads'].append(elapsed)
+                except sqlite3.OperationalError:
+                    with lock:
+                        results['read_errors'] += 1
+                time.sleep(options['pause'])
+            db.close()
+
+        def write():
+            # What job state saves and event records do while an ingest runs
+            db = self.connect(path, pragmas)
+            while writing.is_set():
+                start = time.perf_counter()
+                try:
+                    db.execute("INSERT INTO equipment_api_datasetevent (kind, data, created_at) "
+                               "VALUES ('job-progress', '{}', datetime('now'))")
+                    elapsed = time.perf_counter() - start
+                    with lock:
+                        results['writes'].append(elapsed)
+                except sqlite3.OperationalError:
+                    with lock:
+                        results['write_errors'] += 1
+                time.sleep(options['write_pause'])
+            db.close()
+
+        readers = [threading.Thread(target=read) for _ in range(options['readers'])] + [threading.Thread(target=write)]
+        ingests = [threading.Thread(target=ingest, args=(number,)) for number in range(options['ingests'])]
+        start = time.perf_counter()
+        for thread in readers + ingests:
+            thread.start()
+        for thread in ingests:
+            thread.join()
+        results['elapsed'] = time.perf_counter() - start
+        writing.clear()
+        for thread in readers:
+            thread.join()
+        return results
+
+    def write_dataset(self, db, number, rows, batch_size, chunked):
+        """Insert a dataset in batches, in one transaction or (as ingest does) committing each batch"""
+        db.execute('BEGIN')
+        try:
+            cursor = db.execute(
+                "INSERT INTO equipment_api_equipmentdataset (name, uploaded_at, file_name, summary_stats, content_hash, "
+                "ready) VALUES (?, datetime('now'), ?, '{}', '', ?)", (f"bench {number}", 'bench.csv', not chunked)
+            )
+            dataset_id = cursor.lastrowid
+            for offset in range(0, rows, batch_size):
+                db.executemany(
+                    "INSERT INTO equipment_api_equipment (dataset_id, equipment_name, equipment_type, flowrate, "
+                    "pressure, temperature) VALUES (?, ?, ?, ?, ?, ?)",
+                    [(dataset_id, f"E-{index}", random.choice(TYPES), random.uniform(50, 250),
+                      random.uniform(1, 20), random.uniform(20, 400))
+                     for index in range(offset, min(offset + batch_size, rows))]
+                )
+                if chunked:
+                    db.execute('COMMIT')
+                    db.execute('BEGIN')
+            if chunked:
+                db.execute("UPDATE equipment_api_equipmentdataset SET ready = 1 WHERE id = ?", (dataset_id,))
+            db.execute('COMMIT')
+        except sqlite3.OperationalError:
+            db.execute('ROLLBACK')
+            raise
+
+    def report(self, name, pragmas, results):
+        self.stdout.write(f"\n{name}: {', '.join(f'{key}={value}' for key, value in pragmas.items())}")
+        self.stdout.write(f"  ingests: {len(results['ingests'])} ok, {len(results['ingest_errors'])} failed "
+                          f"{sorted(set(results['ingest_errors']))}, all done in {results['elapsed']:.2f}s")
+        self.report_latency('reads', results['reads'], results['read_errors'], results['elapsed'])
+        self.report_latency('short writes', results['writes'], results['write_errors'], results['elapsed'])
+
+    def report_latency(self, kind, samples, errors, elapsed):
+        samples = sorted(sample * 1000 for sample in samples)
+        if not samples:
+            self.stdout.write(f"  {kind} during ingest: none succeeded, {errors} failed")
+            return
+        self.stdout.write(
+            f"  {kind} during ingest: {len(samples):,} ok ({len(samples) / elapsed:,.0f}/s), {errors} failed; "
+            f"p50 {statistics.median(samples):.2f} ms, p95 {samples[int(len(samples) * 0.95)]:.2f} ms, "
+            f"max {samples[-1]:.2f} ms"
+        )
+
+    def report_connections(self, path, pragmas, count=200):
+        """Cost of a connection per request (CONN_MAX_AGE=0) against a persistent one"""
+        sql = READ_QUERIES[0][1]
+        start = time.perf_counter()
+        for _ in range(count):
+            db = self.connect(path, pragmas)
+            db.execute(sql).fetchall()
+            db.close()
+        fresh = (time.perf_counter() - start) / count
+        db = self.connect(path, pragmas)
+        start = time.perf_counter()
+        for _ in range(count):
+            db.execute(sql).fetchall()
+        persistent = (time.perf_counter() - start) / count
+        db.close()
+        self.stdout.write(f"\nlatest-summary query: {fresh * 1000:.3f} ms on a new connection, "
+                          f"{persistent * 1000:.3f} ms on a persistent one")
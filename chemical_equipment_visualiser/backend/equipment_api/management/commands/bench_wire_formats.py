@@ -0,0 +1,123 @@
+import gzip
+import json
+import time
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from equipment_api.columnar import EquipmentBlock
+from equipment_api.models import EquipmentDataset
+from equipment_api.renderers import COLUMNAR_FORMATS, ColumnarJSONRenderer, MessagePackRenderer, msgpack
+from equipment_api.stats import PARAMETERS
+from equipment_api.views import equipment_block
+
+TYPES = ['Pump', 'Compressor', 'Valve', 'HeatExchanger', 'Reactor', 'Condenser']
+
+def generated_block(rows, seed):
+    rng = np.random.default_rng(seed)
+    values = np.round(rng.uniform([50, 1, 50], [300, 20, 400], (rows, 3)), 2)
+    return EquipmentBlock(
+        np.arange(1, rows + 1, dtype=np.int64), [f"EQ-{i}" for i in range(rows)], TYPES,
+        rng.integers(0, len(TYPES), rows).astype(np.int16),
+        {param: np.ascontiguousarray(values[:, i]) for i, param in enumerate(PARAMETERS)}
+    )
+
+def decode_json(body):
+    rows = json.loads(body)
+    return {
+        'id': np.fromiter((row['id'] for row in rows), dtype=np.int64, count=len(rows)),
+        **{param: np.fromiter((row[param] for row in rows), dtype=np.float64, count=len(rows)) for param in PARAMETERS}
+    }
+
+def decode_columns(body):
+    columns = json.loads(body)['columns']
+    return {
+        'id': np.array(columns['id'], dtype=np.int64),
+        **{param: np.array(columns[param], dtype=np.float64) for param in PARAMETERS}
+    }
+
+def decode_msgpack(body):
+    data = msgpack.unpackb(body)
+    return {
+        name: np.frombuffer(data['columns'][name], dtype=data['dtypes'][name])
+        for name in ['id', *PARAMETERS]
+    }
+
+class Command(BaseCommand):
+    help = 'Compare payload size and encode/decode latency of the row JSON and columnar equipment formats'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dataset', type=int, help='Benchmark a stored dataset instead of generated rows')
+        parser.add_argument('--rows', nargs='+', type=int, default=[10_000, 100_000, 1_000_000])
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument('--url', help='Also time full HTTP requests against a running server, '
+                                          'e.g. http://localhost:8000/api/equipment/')
+        parser.add_argument('--user', default='api_user')
+        parser.add_argument('--password', default='api_password123')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        self.repeat = options['repeat']
+        self.stdout.write(
+            f"{'rows':>10} {'format':>8} {'MB':>8} {'gzip MB':>8} {'encode s':>9} {'decode s':>9} {'total s':>8}"
+        )
+        if options['dataset']:
+            try:
+                dataset = EquipmentDataset.objects.get(id=options['dataset'])
+            except EquipmentDataset.DoesNotExist:
+                raise CommandError(f"Dataset {options['dataset']} not found")
+            self.run(lambda: equipment_block(dataset))
+        else:
+            for rows in options['rows']:
+                block = generated_block(rows, options['seed'])
+                self.run(lambda: block)
+        if options['url']:
+            self.run_http(options['url'], options['user'], options['password'])
+
+    def best(self, func):
+        times = []
+        for _ in range(self.repeat):
+            start = time.perf_counter()
+            result = func()
+            times.append(time.perf_counter() - start)
+        return min(times), result
+
+    def run(self, get_block):
+        formats = [
+            ('json', lambda block: JSONRenderer().render(block.records()), decode_json),
+            ('columns', lambda block: ColumnarJSONRenderer().render(block.columns()), decode_columns),
+        ]
+        if msgpack is not None:
+            binary = COLUMNAR_FORMATS[MessagePackRenderer.format]
+            formats.append(('msgpack', lambda block: MessagePackRenderer().render(block.columns(binary)), decode_msgpack))
+        else:
+            self.stderr.write("msgpack is not installed; skipping the MessagePack format")
+
+        reference = None
+        for name, encode, decode in formats:
+            encode_time, body = self.best(lambda: encode(get_block()))
+            decode_time, decoded = self.best(lambda: decode(body))
+            if reference is None:
+                reference = decoded
+            for column, values in reference.items():
+                assert np.array_equal(values, decoded[column]), f"{name} {column} differs from json"
+            self.stdout.write(
+                f"{len(decoded['id']):>10,} {name:>8} {len(body) / 1e6:>8.2f} "
+                f"{len(gzip.compress(body, 6)) / 1e6:>8.2f} {encode_time:>9.3f} {decode_time:>9.3f} "
+                f"{encode_time + decode_time:>8.3f}"
+            )
+
+    def run_http(self, url, user, password):
+        import requests
+        self.stdout.write(f"\nHTTP {url} (best of {self.repeat}, cache cold only on the first request)")
+        self.stdout.write(f"{'format':>8} {'MB':>8} {'seconds':>9}")
+        decoders = {'json': decode_json, 'columns': decode_columns}
+        if msgpack is not None:
+            decoders['msgpack'] = decode_msgpack
+        for name, decode in decoders.items():
+            def fetch():
+                response = requests.get(url, params={'format': name}, auth=(user, password))
+                response.raise_for_status()
+                decode(response.content)
+                return response
+            elapsed, response = self.best(fetch)
+            self.stdout.write(f"{name:>8} {len(response.content) / 1e6:>8.2f} {elapsed:>9.3f}")
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from equipment_api.columnar import columnar_enabled, load_columns, write_dataset_columns
+from equipment_api.models import EquipmentDataset
+
+class Command(BaseCommand):
+    help = 'Write the columnar copy of datasets that were ingested without one'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true', help='Rewrite copies that already exist')
+
+    def handle(self, *args, **options):
+        if not columnar_enabled():
+            self.stdout.write('EQUIPMENT_COLUMNAR_STORAGE is off, nothing to do')
+            return
+        for dataset in EquipmentDataset.objects.order_by('id'):
+            if not options['rebuild'] and load_columns(dataset.id) is not None:
+                continue
+            rows = write_dataset_columns(dataset)
+            self.stdout.write(f"dataset {dataset.id}: wrote {rows:,} rows")
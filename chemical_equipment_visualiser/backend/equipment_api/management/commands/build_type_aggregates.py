@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from equipment_api.aggregates import rebuild_type_aggregates
+from equipment_api.models import EquipmentDataset
+
+class Command(BaseCommand):
+    help = 'Compute the per-type aggregates of datasets that have none (e.g. restored from a backup)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true', help='Recompute aggregates that already exist')
+
+    def handle(self, *args, **options):
+        datasets = EquipmentDataset.objects.order_by('id')
+        if not options['rebuild']:
+            datasets = datasets.filter(type_aggregates__isnull=True)
+        for dataset in datasets:
+            stats = rebuild_type_aggregates(dataset)
+            self.stdout.write(f"dataset {dataset.id}: {len(stats.by_type)} types, {stats.count:,} rows")
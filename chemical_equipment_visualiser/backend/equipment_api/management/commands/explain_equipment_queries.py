@@ -0,0 +1,109 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.http import QueryDict
+from equipment_api.compare import added_equipment, changed_equipment
+from equipment_api.models import EquipmentDataset
+from equipment_api.pagination import page_queryset
+
+# (description, query string, whether to explain the follow-up page after a cursor)
+QUERIES = [
+    ('first page by id', '', False),
+    ('next page by id', '', True),
+    ('type filter', 'equipment_type=Pump', False),
+    ('several types', 'equipment_type=Pump,Valve', False),
+    ('flowrate range', 'flowrate_min=100&flowrate_max=120', False),
+    ('pressure range', 'pressure_min=5&pressure_max=6', False),
+    ('temperature lower bound', 'temperature_min=390', False),
+    ('name prefix', 'name_prefix=Pump-1', False),
+    ('sort by flowrate', 'sort=flowrate', False),
+    ('sort by flowrate, next page', 'sort=flowrate', True),
+    ('sort by -temperature, next page', 'sort=-temperature', True),
+    ('sort by name', 'sort=equipment_name', True),
+    ('sort by type', 'sort=equipment_type', True),
+    ('range sorted on the same column', 'flowrate_min=100&flowrate_max=120&sort=-flowrate', True),
+]
+
+# (description, queryset builder) for /api/compare/ between an earlier and a later dataset;
+# the correlated name lookups have to hit the (dataset, equipment_name) index
+COMPARE_QUERIES = [
+    ('compare: added', lambda before, after: added_equipment(before, after)),
+    ('compare: removed', lambda before, after: added_equipment(after, before)),
+    ('compare: changed', lambda before, after: changed_equipment(before, after)),
+    ('compare: changed, listed by name',
+     lambda before, after: changed_equipment(before, after).order_by('equipment_name', 'id')[:100]),
+]
+
+TABLE = 'equipment_api_equipment'
+NAME_INDEX = 'equipment_dataset_name_idx'
+
+class Command(BaseCommand):
+    help = ('Run EXPLAIN QUERY PLAN for the equipment filter/sort queries and fail if any of them '
+            'scans the whole equipment table instead of using an index')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dataset', type=int, help='Dataset to plan against (default: latest)')
+        parser.add_argument('--compare-with', type=int,
+                            help='Earlier dataset for the compare plans (default: the one before --dataset)')
+        parser.add_argument('--analyze', action='store_true', help='Run ANALYZE first so the planner has statistics')
+        parser.add_argument('--verbose-plans', action='store_true')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Plan checks are written for SQLite query plans')
+        if options['analyze']:
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+        datasets = EquipmentDataset.objects.order_by('-uploaded_at')
+        dataset = datasets.filter(id=options['dataset']).first() if options['dataset'] else datasets.first()
+        if dataset is None:
+            raise CommandError('No dataset to plan against; upload one first')
+
+        failures = []
+        for description, query, after_cursor in QUERIES:
+            params = QueryDict(query)
+            position = None
+            if after_cursor:
+                row = page_queryset(dataset, params).values('id', 'equipment_name', 'equipment_type',
+                                                              'flowrate', 'pressure', 'temperature').first()
+                if row is None:
+                    continue
+                sort = params.get('sort') or 'id'
+                position = {'id': row['id'], 'sort': sort, 'value': row[sort.lstrip('-')]}
+
+            plan = page_queryset(dataset, params, position)[:1000].explain()
+            if not self.check_plan(description, plan, options['verbose_plans']):
+                failures.append(description)
+
+        earlier = EquipmentDataset.objects.filter(uploaded_at__lt=dataset.uploaded_at).order_by('-uploaded_at')
+        if options['compare_with']:
+            earlier = EquipmentDataset.objects.filter(id=options['compare_with'])
+        before = earlier.first()
+        if before is None:
+            self.stdout.write('Skipping compare plans: no earlier dataset to compare with')
+        for description, build in COMPARE_QUERIES if before else []:
+            plan = build(before.id, dataset.id).explain()
+            if not self.check_plan(description, plan, options['verbose_plans'], NAME_INDEX):
+                failures.append(description)
+
+        if failures:
+            raise CommandError(f"Queries not served by an index: {', '.join(failures)}")
+        self.stdout.write(self.style.SUCCESS('All equipment queries use an index'))
+
+    def check_plan(self, description, plan, verbose, subquery_index=None):
+        """Report one plan; True when no equipment lookup is a full scan (and correlated ones use subquery_index)"""
+        lines = [line for line in plan.splitlines() if TABLE in line or ' U0 ' in line]
+        full_scan = any('SCAN ' in line and 'USING' not in line for line in lines)
+        indexed = any('USING' in line for line in lines)
+        temp_sort = 'TEMP B-TREE' in plan
+        correlated = [line for line in lines if ' U0 ' in line]
+
+        ok = indexed and not full_scan
+        if subquery_index is not None:
+            ok = ok and bool(correlated) and all(subquery_index in line for line in correlated)
+        status = self.style.SUCCESS('index') if ok else self.style.ERROR('SCAN ')
+        note = ' (+ sort in temp b-tree)' if temp_sort else ''
+        self.stdout.write(f"{status}  {description:<36} {'; '.join(line.split(' ', 3)[-1] for line in lines)}{note}")
+        if verbose:
+            self.stdout.write(plan)
+        return ok
@@ -0,0 +1,125 @@
+import io
+import random
+import statistics
+import threading
+import time
+from django.core.management.base import BaseCommand, CommandError
+
+# Read requests the readers cycle through (path relative to the API root)
+READ_PATHS = ['summary/', 'equipment-types/', 'equipment/', 'charts/histogram/?parameter=flowrate', 'history/']
+TYPES = ['Pump', 'Valve', 'Compressor', 'Heat Exchanger', 'Reactor']
+
+def random_csv(rows):
+    """A CSV of random equipment, different on every call so uploads are never deduplicated"""
+    out = io.StringIO()
+    out.write('Equipment Name,Type,Flowrate,Pressure,Temperature\n')
+    for index in range(rows):
+        kind = random.choice(TYPES)
+        out.write(f"{kind}-{index},{kind},{random.uniform(50, 250):.2f},"
+                  f"{random.uniform(1, 20):.2f},{random.uniform(20, 400):.1f}\n")
+    return out.getvalue().encode()
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+class Command(BaseCommand):
+    help = ('Measure request latency of running servers under a mixed workload of concurrent reads and '
+            'uploads, e.g. gunicorn sync workers against uvicorn serving the async views')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', action='append', required=True, metavar='NAME=URL',
+                            help='API root of a running server, e.g. async=http://localhost:8001/api/ (repeatable)')
+        parser.add_argument('--readers', type=int, default=16, help='Concurrent read clients')
+        parser.add_argument('--uploaders', type=int, default=2, help='Concurrent upload clients')
+        parser.add_argument('--rows', type=int, default=20000, help='Rows per uploaded CSV')
+        parser.add_argument('--duration', type=float, default=20, help='Seconds per target')
+        parser.add_argument('--user', default='api_user')
+        parser.add_argument('--password', default='api_password123')
+
+    def handle(self, *args, **options):
+        import requests
+        targets = []
+        for target in options['target']:
+            name, sep, url = target.partition('=')
+            if not sep:
+                raise CommandError(f"--target takes NAME=URL, got {target!r}")
+            targets.append((name, url if url.endswith('/') else url + '/'))
+
+        self.stdout.write(f"{options['readers']} readers, {options['uploaders']} uploaders of "
+                          f"{options['rows']:,}-row CSVs, {options['duration']:g}s per target")
+        self.stdout.write(f"{'target':>10} {'kind':>7} {'requests':>9} {'errors':>7} {'req/s':>7} "
+                          f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+        for name, url in targets:
+            response = requests.post(url + 'auth/login/',
+                                     json={'username': options['user'], 'password': options['password']})
+            if response.status_code != 200:
+                raise CommandError(f"Cannot log in to {url}: {response.status_code}")
+            headers = {'Authorization': f"Token {response.json()['token']}"}
+            results = self.run(requests, url, headers, options)
+            for kind in ('read', 'upload'):
+                self.report(name, kind, results[kind], options['duration'])
+            for kind, error in results['errors'].items():
+                self.stdout.write(self.style.WARNING(f"{name:>10} {kind:>7} first error: {error}"))
+
+    def run(self, requests, url, headers, options):
+        """{'read': [(seconds, ok)], 'upload': [...], 'errors': {kind: first error}} from all clients"""
+        results = {'read': [], 'upload': [], 'errors': {}}
+        lock = threading.Lock()
+        deadline = time.perf_counter() + options['duration']
+        # Build the upload bodies up front so the clients spend their time waiting on the server
+        bodies = [random_csv(options['rows']) for _ in range(max(options['uploaders'], 1) * 4)]
+
+        def record(kind, start, response, ok_statuses=(200,)):
+            elapsed = time.perf_counter() - start
+            ok = not isinstance(response, Exception) and response.status_code in ok_statuses
+            with lock:
+                results[kind].append((elapsed, ok))
+                if not ok and kind not in results['errors']:
+                    results['errors'][kind] = (str(response) if isinstance(response, Exception)
+                                               else f"{response.status_code} {response.text[:200]}")
+
+        def reader(offset):
+            index = offset
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    record('read', start, requests.get(url + READ_PATHS[index % len(READ_PATHS)], headers=headers))
+                except requests.RequestException as e:
+                    record('read', start, e)
+                index += 1
+
+        def uploader(offset):
+            index = offset
+            while time.perf_counter() < deadline:
+                body = bodies[index % len(bodies)]
+                # A fresh name row keeps every body unique across rounds too
+                body = body.replace(b'\n', f"\nPump-x{random.random()},Pump,100,5,50\n".encode(), 1)
+                start = time.perf_counter()
+                try:
+                    response = requests.post(url + 'upload/', headers=headers,
+                                             files={'file': ('loadtest.csv', body, 'text/csv')},
+                                             data={'name': 'Load test'})
+                    record('upload', start, response, (200, 201, 202))
+                except requests.RequestException as e:
+                    record('upload', start, e)
+                index += 1
+
+        threads = [threading.Thread(target=reader, args=(i,)) for i in range(options['readers'])]
+        threads += [threading.Thread(target=uploader, args=(i,)) for i in range(options['uploaders'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def report(self, name, kind, samples, duration):
+        if not samples:
+            return
+        times = [elapsed * 1000 for elapsed, _ in samples]
+        errors = sum(1 for _, ok in samples if not ok)
+        self.stdout.write(
+            f"{name:>10} {kind:>7} {len(samples):>9,} {errors:>7} {len(samples) / duration:>7.1f} "
+            f"{statistics.median(times):>8.1f} {percentile(times, 0.95):>8.1f} "
+            f"{percentile(times, 0.99):>8.1f} {max(times):>8.1f}"
+        )
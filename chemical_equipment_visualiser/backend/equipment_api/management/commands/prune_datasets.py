@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from equipment_api.retention import RetentionPolicy, clean_up_abandoned_datasets, prune
+from equipment_api.uploads import expire_sessions
+
+class Command(BaseCommand):
+    help = ('Delete datasets outside the retention policy (EQUIPMENT_RETENTION, overridable per run) '
+            'and chunked uploads idle longer than EQUIPMENT_UPLOAD_EXPIRY_HOURS; '
+            'also deletes the hidden rows of ingests that crashed')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-datasets', type=int)
+        parser.add_argument('--max-age-days', type=int)
+        parser.add_argument('--max-total-rows', type=int)
+        parser.add_argument('--dry-run', action='store_true', help='Only list the datasets that would be deleted')
+
+    def handle(self, *args, **options):
+        policy = RetentionPolicy.from_settings()
+        for option in ('max_datasets', 'max_age_days', 'max_total_rows'):
+            if options[option] is not None:
+                setattr(policy, option, options[option])
+
+        result = prune(policy, dry_run=options['dry_run'])
+        verb = 'Would delete' if options['dry_run'] else 'Deleted'
+        self.stdout.write(
+            f"{verb} {len(result['datasets'])} datasets {result['datasets']} "
+            f"({result['rows']:,} equipment rows); "
+            f"select {result['select_seconds']:.3f}s, delete {result['delete_seconds']:.3f}s"
+        )
+
+        sessions = expire_sessions(dry_run=options['dry_run'])
+        self.stdout.write(f"{verb} {len(sessions)} unfinished uploads {sessions}")
+
+        if not options['dry_run']:
+            rows = clean_up_abandoned_datasets()
+            if rows is not None:
+                self.stdout.write(f"Deleted {rows:,} equipment rows left by interrupted ingests")
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.7 on 2026-10-18 07:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipment_api', '0005_equipment_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DatasetEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('dataset-created', 'Dataset created'), ('dataset-pruned', 'Dataset pruned'), ('job-progress', 'Job progress')], max_length=20)),
+                ('data', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
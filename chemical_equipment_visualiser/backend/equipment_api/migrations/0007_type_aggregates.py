@@ -0,0 +1,65 @@
+# Generated by Django 4.2.7 on 2026-10-18 07:33
+
+import math
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Frozen copies of the app's parameter list and Welford update, so this migration
+# keeps doing the same thing whatever later happens to equipment_api.stats
+PARAMETERS = ['flowrate', 'pressure', 'temperature']
+
+
+def backfill_type_aggregates(apps, schema_editor):
+    """Compute the per-type aggregates of datasets ingested before the table existed"""
+    EquipmentDataset = apps.get_model('equipment_api', 'EquipmentDataset')
+    Equipment = apps.get_model('equipment_api', 'Equipment')
+    DatasetTypeAggregate = apps.get_model('equipment_api', 'DatasetTypeAggregate')
+    for dataset_id in EquipmentDataset.objects.values_list('id', flat=True):
+        # (type, parameter) -> [count, mean, m2, min, max]
+        state = {}
+        rows = Equipment.objects.filter(dataset_id=dataset_id).values_list('equipment_type', *PARAMETERS)
+        for eq_type, *values in rows.iterator(chunk_size=10000):
+            for param, value in zip(PARAMETERS, values):
+                running = state.setdefault((eq_type, param), [0, 0.0, 0.0, math.inf, -math.inf])
+                running[0] += 1
+                delta = value - running[1]
+                running[1] += delta / running[0]
+                running[2] += delta * (value - running[1])
+                running[3] = min(running[3], value)
+                running[4] = max(running[4], value)
+        DatasetTypeAggregate.objects.bulk_create([
+            DatasetTypeAggregate(
+                dataset_id=dataset_id, equipment_type=eq_type, parameter=param, count=count,
+                mean=mean, m2=m2, min=low, max=high
+            )
+            for (eq_type, param), (count, mean, m2, low, high) in state.items()
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipment_api', '0006_dataset_events'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DatasetTypeAggregate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('equipment_type', models.CharField(max_length=50)),
+                ('parameter', models.CharField(choices=[('flowrate', 'Flowrate'), ('pressure', 'Pressure'), ('temperature', 'Temperature')], max_length=20)),
+                ('count', models.BigIntegerField()),
+                ('mean', models.FloatField()),
+                ('m2', models.FloatField()),
+                ('min', models.FloatField()),
+                ('max', models.FloatField()),
+                ('dataset', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='type_aggregates', to='equipment_api.equipmentdataset')),
+            ],
+            options={
+                'unique_together': {('dataset', 'equipment_type', 'parameter')},
+            },
+        ),
+        migrations.RunPython(backfill_type_aggregates, migrations.RunPython.noop),
+    ]
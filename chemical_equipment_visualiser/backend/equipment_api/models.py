@@ -1,5 +1,13 @@
+from django.conf import settings
 from django.db import models
 import json
+import uuid
+
+class ReadyDatasetManager(models.Manager):
+    """Datasets whose ingest has finished; ones still being written (or deleted) stay hidden"""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(ready=True)
 
 class EquipmentDataset(models.Model):
     name = models.CharField(max_length=255, default="Untitled Dataset")
@@ -9,6 +17,15 @@ class EquipmentDataset(models.Model):
     # Store summary statistics as JSON
     summary_stats = models.JSONField(default=dict)
     
+    # SHA-256 of the uploaded bytes, used to skip re-ingesting identical files
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True)
+    
+    # Ingest commits rows chunk by chunk and sets this last, in the transaction that adds the statistics
+    ready = models.BooleanField(default=True)
+    
+    objects = ReadyDatasetManager()
+    all_objects = models.Manager()
+    
     def __str__(self):
         return f"{self.name} - {self.uploaded_at.strftime('%Y-%m-%d %H:%M')}"
 
@@ -29,5 +46,116 @@ class Equipment(models.Model):
     pressure = models.FloatField()
     temperature = models.FloatField()
     
+    class Meta:
+        # Per-dataset filter and sort paths; SQLite appends the rowid (id) to each entry,
+        # so (dataset, column) also serves ORDER BY column, id
+        indexes = [
+            models.Index(fields=['dataset', 'equipment_type'], name='equipment_dataset_type_idx'),
+            models.Index(fields=['dataset', 'equipment_name'], name='equipment_dataset_name_idx'),
+            models.Index(fields=['dataset', 'flowrate'], name='equipment_dataset_flow_idx'),
+            models.Index(fields=['dataset', 'pressure'], name='equipment_dataset_pressure_idx'),
+            models.Index(fields=['dataset', 'temperature'], name='equipment_dataset_temp_idx'),
+        ]
+    
+    def __str__(self):
+        return self.equipment_name
+
+class IngestJob(models.Model):
+    STATES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    state = models.CharField(max_length=20, choices=STATES, default='queued')
+    dataset_name = models.CharField(max_length=255, default="Uploaded Dataset")
+    file_name = models.CharField(max_length=255)
+    file_path = models.CharField(max_length=1024)
+    bytes_total = models.BigIntegerField(default=0)
+    content_hash = models.CharField(max_length=64, blank=True)
+    rows_processed = models.BigIntegerField(default=0)
+    error = models.TextField(blank=True)
+    dataset = models.ForeignKey(EquipmentDataset, null=True, blank=True, on_delete=models.SET_NULL, related_name='jobs')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.file_name} ({self.state})"
+
+class UploadSession(models.Model):
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    dataset_name = models.CharField(max_length=255, default="Uploaded Dataset")
+    file_name = models.CharField(max_length=255)
+    file_path = models.CharField(max_length=1024)
+    total_size = models.BigIntegerField()
+    chunk_size = models.IntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    job = models.ForeignKey(IngestJob, null=True, blank=True, on_delete=models.SET_NULL, related_name='upload_sessions')
+    # Only the user who started an upload can send its chunks or complete it
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.CASCADE,
+                              related_name='upload_sessions')
+
+    @property
+    def total_chunks(self):
+        return max((self.total_size + self.chunk_size - 1) // self.chunk_size, 1)
+
+    def chunk_length(self, index):
+        """Expected byte length of a chunk; the last one may be shorter"""
+        return min(self.chunk_size, self.total_size - index * self.chunk_size)
+
+    def __str__(self):
+        return f"{self.file_name} ({self.id})"
+
+class UploadChunk(models.Model):
+    session = models.ForeignKey(UploadSession, on_delete=models.CASCADE, related_name='chunks')
+    index = models.IntegerField()
+    size = models.IntegerField()
+    checksum = models.CharField(max_length=64)
+    received_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = [('session', 'index')]
+
+class DatasetEvent(models.Model):
+    """A change clients of /api/events/ are told about; the id orders events across server processes"""
+    KINDS = [
+        ('dataset-created', 'Dataset created'),
+        ('dataset-pruned', 'Dataset pruned'),
+        ('job-progress', 'Job progress'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KINDS)
+    data = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.kind} #{self.id}"
+
+class DatasetTypeAggregate(models.Model):
+    """Running statistics of one parameter over one equipment type of a dataset, stored at ingest"""
+    PARAMETERS = [
+        ('flowrate', 'Flowrate'),
+        ('pressure', 'Pressure'),
+        ('temperature', 'Temperature'),
+    ]
+
+    dataset = models.ForeignKey(EquipmentDataset, on_delete=models.CASCADE, related_name='type_aggregates')
+    equipment_type = models.CharField(max_length=50)
+    parameter = models.CharField(max_length=20, choices=PARAMETERS)
+    count = models.BigIntegerField()
+    mean = models.FloatField()
+    # Sum of squared deviations from the mean (Welford), so aggregates merge exactly
+    m2 = models.FloatField()
+    min = models.FloatField()
+    max = models.FloatField()
+
+    class Meta:
+        # The unique index also serves the per-dataset lookups
+        unique_together = [('dataset', 'equipment_type', 'parameter')]
+
     def __str__(self):
-        return self.equipment_name
\ No newline at end of file
+        return f"{self.equipment_type} {self.parameter} ({self.dataset_id})"
@@ -0,0 +1,117 @@
+"""Keyset (cursor) pagination of a dataset's equipment rows.
+
+Pages follow the requested sort with id as tie-breaker, and the cursor
+carries the sort key of the last row returned. Fetching page N therefore
+costs the same as page 1, and rows inserted or deleted between requests
+never shift the pages.
+"""
+import base64
+import json
+import math
+import numpy as np
+from django.conf import settings
+from django.db.models import Q
+from .columnar import EquipmentBlock, load_columns
+from .filters import filter_equipment, get_sort, has_filters, sort_equipment
+from .stats import PARAMETERS
+
+EQUIPMENT_FIELDS = ['id', 'equipment_name', 'equipment_type', 'flowrate', 'pressure', 'temperature']
+
+def get_page_size(params):
+    default = getattr(settings, 'EQUIPMENT_PAGE_SIZE', 1000)
+    maximum = getattr(settings, 'EQUIPMENT_MAX_PAGE_SIZE', 10000)
+    try:
+        page_size = int(params.get('page_size', default))
+    except (TypeError, ValueError):
+        raise ValueError("page_size must be an integer")
+    if not 1 <= page_size <= maximum:
+        raise ValueError(f"page_size must be between 1 and {maximum}")
+    return page_size
+
+def encode_cursor(position):
+    return base64.urlsafe_b64encode(json.dumps(position, separators=(',', ':')).encode()).decode()
+
+def decode_cursor(cursor, sort='id'):
+    """The position in a cursor issued for sort; ValueError unless it has the shape encode_cursor gives it"""
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except ValueError:
+        raise ValueError("Invalid cursor")
+    if not isinstance(position, dict) or type(position.get('id')) is not int:
+        raise ValueError("Invalid cursor")
+    if position.get('sort', 'id') != sort:
+        raise ValueError("Cursor was issued for a different sort order")
+    field = sort.lstrip('-')
+    if field != 'id':
+        value = position.get('value')
+        if field in PARAMETERS:
+            valid = type(value) in (int, float) and math.isfinite(value)
+        else:
+            valid = isinstance(value, str)
+        if not valid:
+            raise ValueError("Invalid cursor")
+    return position
+
+def after_position(queryset, field, descending, position):
+    """Rows strictly after the cursor in (field, id) order"""
+    op = 'lt' if descending else 'gt'
+    if field == 'id':
+        return queryset.filter(**{f"id__{op}": position['id']})
+    value = position['value']
+    # The inclusive bound gives the index a range start; the OR only breaks ties
+    return queryset.filter(**{f"{field}__{op}e": value}).filter(
+        Q(**{f"{field}__{op}": value}) | Q(**{f"id__{op}": position['id']})
+    )
+
+def page_queryset(dataset, params, position=None):
+    """Filtered rows after the cursor position, in page order"""
+    field, descending = get_sort(params)
+    queryset = filter_equipment(dataset.equipments.all(), params)
+    if position is not None:
+        queryset = after_position(queryset, field, descending, position)
+    return sort_equipment(queryset, field, descending)
+
+def paginate_equipment(dataset, params):
+    """One page of filtered, sorted equipment rows after the cursor in params, plus the next cursor
+
+    'results' is an EquipmentBlock; the view encodes it in the negotiated format.
+    """
+    page_size = get_page_size(params)
+    field, descending = get_sort(params)
+    sort = params.get('sort') or 'id'
+    position = decode_cursor(params['cursor'], sort) if params.get('cursor') else None
+    filtered = has_filters(params)
+
+    # Unfiltered id order is served straight from the columnar copy when there is one
+    columns = None if filtered or sort != 'id' else load_columns(dataset.id)
+    if columns is not None:
+        # Ids are stored in ascending order, so the page start is a binary search
+        start = 0 if position is None else int(np.searchsorted(columns.ids, position['id'], side='right'))
+        results = columns.block(start, min(start + page_size, len(columns)))
+        has_more = start + page_size < len(columns)
+        count = len(columns)
+    else:
+        if filtered:
+            count = filter_equipment(dataset.equipments.all(), params).count()
+        else:
+            count = dataset.summary_stats.get('total_count', 0)
+        queryset = page_queryset(dataset, params, position)
+        rows = list(queryset.values_list(*EQUIPMENT_FIELDS)[:page_size + 1])
+        has_more = len(rows) > page_size
+        results = EquipmentBlock.from_rows(rows[:page_size])
+
+    next_cursor = None
+    if has_more:
+        last = results.record(len(results) - 1)
+        next_position = {'id': last['id']}
+        if sort != 'id':
+            next_position.update({'sort': sort, 'value': last[field]})
+        next_cursor = encode_cursor(next_position)
+
+    return {
+        'dataset_id': dataset.id,
+        'count': count,
+        'page_size': page_size,
+        'next_cursor': next_cursor,
+        'results': results,
+    }
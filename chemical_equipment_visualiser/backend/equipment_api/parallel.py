@@ -0,0 +1,120 @@
+"""Parallel CSV parsing: split a file on line boundaries and parse the ranges in a process pool.
+
+Ranges are found by seeking and skipping to the next newline, which is only
+safe when no field spans lines; files with quote characters (has_quotes) are
+left to the serial parser. Results come back in file order with a bounded
+number of ranges in flight.
+"""
+import csv
+import io
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from .analytics import chunk_stats, encode_rows
+from .parsing import CSVRowError, parse_rows, validate_fieldnames
+from .stats import DatasetStats
+
+RANGE_BYTES = 16 * 1024 * 1024
+
+class ParsedRange:
+    """Validated rows of one byte range as compact typed columns, plus partial statistics"""
+
+    __slots__ = ('names', 'type_names', 'type_codes', 'values', 'stats', 'row_count', 'end', 'error')
+
+    def __init__(self, end):
+        self.names = []
+        self.type_names = []
+        self.type_codes = np.empty(0, dtype=np.int16)
+        self.values = np.empty((0, 3), dtype=np.float64)
+        self.stats = DatasetStats()
+        self.row_count = 0
+        self.end = end
+        self.error = None
+
+    def rows(self):
+        """Iterate (name, type, flowrate, pressure, temperature) tuples"""
+        type_names = self.type_names
+        for name, code, values in zip(self.names, self.type_codes.tolist(), self.values.tolist()):
+            yield (name, type_names[code], *values)
+
+def read_header(path):
+    """Parse the header line; returns (fieldnames, offset of the first data row)"""
+    with open(path, 'rb') as f:
+        first_line = f.readline()
+    fieldnames = next(csv.reader([first_line.decode('utf-8-sig')]), [])
+    return fieldnames, len(first_line)
+
+def has_quotes(path, block_size=1024 * 1024):
+    """Whether the file contains a double quote, i.e. a field that may hold a line break"""
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            if b'"' in block:
+                return True
+    return False
+
+def split_ranges(path, start, parts):
+    """Split [start, EOF) into up to `parts` byte ranges that each begin on a line start"""
+    size = os.path.getsize(path)
+    bounds = [start]
+    with open(path, 'rb') as f:
+        for part in range(1, parts):
+            position = start + (size - start) * part // parts
+            if position <= bounds[-1]:
+                continue
+            # The byte before a line start is a newline, so skip to the end of that line
+            f.seek(position - 1)
+            f.readline()
+            position = f.tell()
+            if position >= size:
+                break
+            if position > bounds[-1]:
+                bounds.append(position)
+    bounds.append(size)
+    return [(begin, end) for begin, end in zip(bounds, bounds[1:]) if end > begin]
+
+def parse_range(path, start, end, fieldnames):
+    """Parse and validate one byte range; runs inside a pool process"""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    rows = list(csv.DictReader(io.StringIO(data.decode('utf-8'), newline=''), fieldnames=fieldnames))
+
+    result = ParsedRange(end)
+    result.row_count = len(rows)
+    try:
+        parsed = parse_rows(rows, start_line=1)
+    except CSVRowError as e:
+        result.error = (e.reason, e.line)
+        return result
+
+    result.type_names, result.type_codes, result.values = encode_rows(parsed)
+    result.names = [row[0] for row in parsed]
+    result.stats = chunk_stats(result.type_names, result.type_codes, result.values)
+    return result
+
+def iter_parsed_ranges(path, workers, range_bytes=RANGE_BYTES):
+    """Yield ParsedRange results in file order, parsing up to 2 * workers ranges ahead"""
+    fieldnames, header_end = read_header(path)
+    validate_fieldnames(fieldnames)
+
+    data_size = os.path.getsize(path) - header_end
+    parts = max(workers, -(-data_size // range_bytes))
+    ranges = iter(split_ranges(path, header_end, parts))
+
+    executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+    try:
+        pending = deque()
+        for start, end in ranges:
+            pending.append(executor.submit(parse_range, path, start, end, fieldnames))
+            if len(pending) >= 2 * workers:
+                break
+        while pending:
+            result = pending.popleft().result()
+            next_range = next(ranges, None)
+            if next_range is not None:
+                pending.append(executor.submit(parse_range, path, *next_range, fieldnames))
+            yield result
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
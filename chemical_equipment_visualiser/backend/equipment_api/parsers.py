@@ -0,0 +1,8 @@
+from rest_framework.parsers import BaseParser
+
+class ChunkParser(BaseParser):
+    """Accept a raw binary request body, used for resumable upload chunks"""
+    media_type = 'application/octet-stream'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        return stream.read() if stream is not None else b''
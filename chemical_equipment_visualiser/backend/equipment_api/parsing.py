@@ -0,0 +1,46 @@
+"""CSV row validation shared by the serial ingest and the parallel parse workers.
+
+Deliberately free of Django model imports so pool processes can use it
+without setting Django up.
+"""
+from math import isfinite
+from itertools import islice
+
+REQUIRED_COLUMNS = ['Equipment Name', 'Type', 'Flowrate', 'Pressure', 'Temperature']
+
+class CSVRowError(ValueError):
+    """A data row failed validation; line is relative to the rows being parsed"""
+
+    def __init__(self, reason, line):
+        super().__init__(f"{reason} on line {line}")
+        self.reason = reason
+        self.line = line
+
+def validate_fieldnames(fieldnames):
+    if not fieldnames:
+        raise ValueError("CSV file is empty")
+    if not all(col in fieldnames for col in REQUIRED_COLUMNS):
+        raise ValueError("CSV file missing required columns")
+
+def parse_rows(rows, start_line=2):
+    """Validate and convert CSV rows into (name, type, flowrate, pressure, temperature) tuples"""
+    parsed = []
+    for line, row in enumerate(rows, start=start_line):
+        try:
+            flowrate, pressure, temperature = float(row['Flowrate']), float(row['Pressure']), float(row['Temperature'])
+        except (TypeError, ValueError):
+            raise CSVRowError("Invalid numeric value", line)
+        if not (isfinite(flowrate) and isfinite(pressure) and isfinite(temperature)):
+            raise CSVRowError("Non-finite numeric value", line)
+        parsed.append((row['Equipment Name'], row['Type'], flowrate, pressure, temperature))
+    return parsed
+
+def iter_parsed_chunks(reader, batch_size):
+    """Yield validated rows from a CSV reader in chunks of at most batch_size"""
+    line = 2
+    while True:
+        rows = list(islice(reader, batch_size))
+        if not rows:
+            return
+        yield parse_rows(rows, start_line=line)
+        line += len(rows)
@@ -0,0 +1,124 @@
+"""Renderers for equipment rows.
+
+Views hand EquipmentBlocks to the renderer rather than lists of dicts.
+EquipmentJSONRenderer writes them as the usual list of row objects through
+the fast encoder. The default JSON body repeats every key in every row, so
+clients that ask for one of these formats get the same rows as one array
+per column instead, with equipment types dictionary-encoded:
+
+    ?format=columns   application/vnd.equipment.columns+json
+    ?format=msgpack   application/x-msgpack (numeric columns as raw
+                      little-endian bytes; needs the msgpack package)
+"""
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.settings import api_settings
+from .columnar import EquipmentBlock
+from .encoders import encode_block
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+def _has_block(data):
+    """Whether data is or holds (in nested dicts and lists) an EquipmentBlock"""
+    if isinstance(data, EquipmentBlock):
+        return True
+    if isinstance(data, dict):
+        return any(_has_block(value) for value in data.values())
+    if isinstance(data, list):
+        return any(_has_block(item) for item in data)
+    return False
+
+def _with_records(data):
+    """data with every EquipmentBlock replaced by row dicts"""
+    if isinstance(data, EquipmentBlock):
+        return data.records()
+    if isinstance(data, list) and _has_block(data):
+        return [_with_records(item) for item in data]
+    if isinstance(data, dict) and _has_block(data):
+        return {key: _with_records(value) for key, value in data.items()}
+    return data
+
+class EquipmentJSONRenderer(JSONRenderer):
+    """JSONRenderer that encodes EquipmentBlocks with the fast row encoder"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(_with_records(data), accepted_media_type, renderer_context)
+        return self._encode(data)
+
+    def _encode(self, data):
+        if isinstance(data, EquipmentBlock):
+            return encode_block(data)
+        if isinstance(data, list) and _has_block(data):
+            return b'[' + b','.join(self._encode(item) for item in data) + b']'
+        if isinstance(data, dict) and _has_block(data):
+            return b'{' + b','.join(
+                super(EquipmentJSONRenderer, self).render(str(key)) + b':' + self._encode(value)
+                for key, value in data.items()
+            ) + b'}'
+        if data is None:
+            # JSONRenderer renders a top-level None as an empty body, but here it is a value
+            return b'null'
+        return super().render(data)
+
+class ColumnarJSONRenderer(JSONRenderer):
+    media_type = 'application/vnd.equipment.columns+json'
+    format = 'columns'
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = 'application/x-msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, use_bin_type=True)
+
+class NDJSONRenderer(JSONRenderer):
+    """Newline-delimited JSON: one line per list item"""
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        items = data if isinstance(data, list) else [data]
+        return b''.join(super(NDJSONRenderer, self).render(item) + b'\n' for item in items)
+
+class EventStreamRenderer(JSONRenderer):
+    """Lets clients negotiate text/event-stream; the stream itself bypasses rendering, errors are JSON"""
+    media_type = 'text/event-stream'
+    format = 'sse'
+
+# Whether each columnar format sends numeric columns as bytes
+COLUMNAR_FORMATS = {
+    ColumnarJSONRenderer.format: False,
+    MessagePackRenderer.format: True,
+}
+
+def json_renderers():
+    """The default renderers, with JSON handled by EquipmentJSONRenderer"""
+    return [
+        EquipmentJSONRenderer if renderer is JSONRenderer else renderer
+        for renderer in api_settings.DEFAULT_RENDERER_CLASSES
+    ]
+
+def equipment_renderers():
+    """Renderers of the equipment endpoints: JSON plus the columnar formats available here"""
+    renderers = json_renderers() + [ColumnarJSONRenderer]
+    if msgpack is not None:
+        renderers.append(MessagePackRenderer)
+    return renderers
+
+def equipment_payload(block, request):
+    """An EquipmentBlock in the layout of the negotiated format (JSON renders the block itself)"""
+    fmt = getattr(request.accepted_renderer, 'format', None)
+    if fmt in COLUMNAR_FORMATS:
+        return block.columns(binary=COLUMNAR_FORMATS[fmt])
+    return block
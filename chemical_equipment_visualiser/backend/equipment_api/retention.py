@@ -0,0 +1,163 @@
+"""Dataset retention: decide which datasets to drop and delete them with set-based queries.
+
+Runs off the request path, either in a background thread after an upload,
+in the ingest job worker, or from the prune_datasets management command,
+which also deletes datasets that crashed ingests left hidden.
+"""
+import logging
+import threading
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from .events import datasets_pruned
+from .models import Equipment, EquipmentDataset
+from .sqlite import ingest_lock, ingest_lock_shared
+
+logger = logging.getLogger(__name__)
+
+_prune_lock = threading.Lock()
+_prune_thread = None
+_prune_again = False
+
+class RetentionPolicy:
+    """Keep at most max_datasets, none older than max_age_days and at most max_total_rows in total
+
+    The newest dataset is always kept. None disables a limit.
+    """
+
+    def __init__(self, max_datasets=5, max_age_days=None, max_total_rows=None):
+        self.max_datasets = max_datasets
+        self.max_age_days = max_age_days
+        self.max_total_rows = max_total_rows
+
+    @classmethod
+    def from_settings(cls):
+        config = getattr(settings, 'EQUIPMENT_RETENTION', {})
+        return cls(
+            max_datasets=config.get('MAX_DATASETS', 5),
+            max_age_days=config.get('MAX_AGE_DAYS'),
+            max_total_rows=config.get('MAX_TOTAL_ROWS')
+        )
+
+    def expired_ids(self):
+        """Ids of datasets outside the policy, newest first"""
+        datasets = EquipmentDataset.objects.order_by('-uploaded_at', '-id').values_list(
+            'id', 'uploaded_at', 'summary_stats__total_count'
+        )
+        cutoff = timezone.now() - timedelta(days=self.max_age_days) if self.max_age_days is not None else None
+
+        expired = []
+        total_rows = 0
+        for index, (dataset_id, uploaded_at, row_count) in enumerate(datasets):
+            total_rows += row_count or 0
+            if index == 0:
+                continue
+            if ((self.max_datasets is not None and index >= self.max_datasets)
+                    or (cutoff is not None and uploaded_at < cutoff)
+                    or (self.max_total_rows is not None and total_rows > self.max_total_rows)):
+                expired.append(dataset_id)
+        return expired
+
+def get_delete_batch_size():
+    """Equipment rows removed per DELETE, each in its own short write transaction"""
+    return getattr(settings, 'EQUIPMENT_DELETE_BATCH_SIZE', 20000)
+
+def delete_hidden_datasets(dataset_ids):
+    """Delete datasets that readers no longer see, equipment first in bounded batches; returns rows deleted
+
+    A single DELETE of millions of rows would hold SQLite's write lock long enough
+    for other writers to give up on busy_timeout.
+    """
+    batch_size = get_delete_batch_size()
+    rows = 0
+    for dataset_id in dataset_ids:
+        equipment = Equipment.objects.filter(dataset_id=dataset_id)
+        while True:
+            # Walk the dataset's index in id order; Equipment has no dependents or signals,
+            # so each batch is a single DELETE instead of the collector loading every row
+            last_id = equipment.order_by('id').values_list('id', flat=True)[batch_size - 1:batch_size].first()
+            if last_id is None:
+                rows += equipment.delete()[0]
+                break
+            rows += equipment.filter(id__lte=last_id).delete()[0]
+    EquipmentDataset.all_objects.filter(id__in=dataset_ids).delete()
+    return rows
+
+def delete_datasets(dataset_ids):
+    """Hide datasets from readers, then delete them and their equipment; returns rows deleted"""
+    if not dataset_ids:
+        return 0
+    with transaction.atomic():
+        EquipmentDataset.all_objects.filter(id__in=dataset_ids).update(ready=False)
+        datasets_pruned(dataset_ids)
+    return delete_hidden_datasets(dataset_ids)
+
+def delete_abandoned_datasets():
+    """Delete hidden datasets left by an ingest or deletion that died midway; returns rows deleted
+
+    Only safe while holding the ingest lock across processes, when no other ingest is writing one.
+    """
+    return delete_hidden_datasets(list(EquipmentDataset.all_objects.filter(ready=False).values_list('id', flat=True)))
+
+def clean_up_abandoned_datasets():
+    """Delete the hidden rows of ingests that died, waiting for any running ingest first; returns rows deleted
+
+    Ingest commits chunk by chunk under a hidden dataset, so a crash mid-file
+    leaves rows behind. None when ingests in other processes can't be excluded
+    (no cross-process ingest lock), in which case the next ingest cleans up.
+    """
+    if not ingest_lock_shared():
+        return None
+    with ingest_lock():
+        return delete_abandoned_datasets()
+
+def prune(policy=None, dry_run=False):
+    """Apply the retention policy; returns what was (or would be) removed and how long it took"""
+    policy = policy or RetentionPolicy.from_settings()
+    start = time.perf_counter()
+    dataset_ids = policy.expired_ids()
+    selected = time.perf_counter()
+    if dry_run:
+        rows = Equipment.objects.filter(dataset_id__in=dataset_ids).count()
+    else:
+        rows = delete_datasets(dataset_ids)
+    result = {
+        'datasets': dataset_ids,
+        'rows': rows,
+        'select_seconds': selected - start,
+        'delete_seconds': time.perf_counter() - selected,
+    }
+    if dataset_ids and not dry_run:
+        logger.info(
+            "Pruned %d datasets (%d equipment rows) in %.3fs",
+            len(dataset_ids), rows, time.perf_counter() - start
+        )
+    return result
+
+def _prune_loop():
+    global _prune_thread, _prune_again
+    try:
+        while True:
+            try:
+                prune()
+            except Exception:
+                logger.exception("Dataset retention failed")
+            with _prune_lock:
+                if not _prune_again:
+                    _prune_thread = None
+                    return
+                _prune_again = False
+    finally:
+        connection.close()
+
+def schedule_prune():
+    """Prune in a background thread; uploads finishing while it runs trigger one more pass"""
+    global _prune_thread, _prune_again
+    with _prune_lock:
+        if _prune_thread is not None:
+            _prune_again = True
+            return
+        _prune_thread = threading.Thread(target=_prune_loop, name='dataset-retention', daemon=True)
+        _prune_thread.start()
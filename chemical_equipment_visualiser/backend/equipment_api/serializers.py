@@ -11,4 +11,19 @@ class EquipmentDatasetSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = EquipmentDataset
-        fields = ['id', 'name', 'uploaded_at', 'file_name', 'summary_stats', 'equipments']
\ No newline at end of file
+        fields = ['id', 'name', 'uploaded_at', 'file_name', 'summary_stats', 'equipments']
+
+class DynamicFieldsModelSerializer(serializers.ModelSerializer):
+    """ModelSerializer taking an optional `fields` argument that limits which fields are output"""
+    
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for field_name in set(self.fields) - set(fields):
+                self.fields.pop(field_name)
+
+class EquipmentDatasetSummarySerializer(DynamicFieldsModelSerializer):
+    class Meta:
+        model = EquipmentDataset
+        fields = ['id', 'name', 'uploaded_at', 'file_name', 'summary_stats']
\ No newline at end of file
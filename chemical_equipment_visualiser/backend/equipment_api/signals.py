@@ -0,0 +1,26 @@
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+from .authentication import forget_token
+from .columnar import remove_columns
+from .models import EquipmentDataset
+from .sqlite import apply_pragmas
+
+@receiver(post_delete, sender=EquipmentDataset)
+def delete_dataset_columns(sender, instance, **kwargs):
+    """Remove a deleted dataset's columnar files once the delete commits"""
+    dataset_id = instance.id
+    transaction.on_commit(lambda: remove_columns(dataset_id))
+
+@receiver(post_delete, sender=Token)
+def forget_deleted_token(sender, instance, **kwargs):
+    """Stop accepting a deleted token from this process's cache"""
+    forget_token(instance.key)
+
+@receiver(connection_created)
+def tune_sqlite_connection(sender, connection, **kwargs):
+    """Apply the SQLite pragmas (WAL, busy timeout, cache and mmap sizes) to each new connection"""
+    if connection.vendor == 'sqlite':
+        apply_pragmas(connection.connection)
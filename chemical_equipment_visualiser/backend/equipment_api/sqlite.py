@@ -0,0 +1,76 @@
+"""SQLite tuning: pragmas for every new connection and a lock that queues ingests.
+
+In WAL mode readers keep reading the last committed data while an ingest
+writes, instead of waiting on (and timing out behind) the writer as in the
+default rollback-journal mode. SQLite still allows one writer at a time, so
+no write may hold the lock for long: ingest commits its rows chunk by chunk
+(the dataset stays hidden until its last, short transaction) and retention
+deletes in batches. The other writes (uploads, job state, events) then wait
+at most about one chunk, well inside busy_timeout. Ingests also take
+ingest_lock() first: concurrent uploads, in threads of one server process,
+in other gunicorn workers or in job pool processes, run one after another
+rather than interleaving their chunks.
+"""
+import threading
+from contextlib import contextmanager
+from django.conf import settings
+from django.db import connection
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Applied in this order; settings.EQUIPMENT_SQLITE_PRAGMAS overrides single values (None skips one)
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    # Durable at checkpoints rather than at every commit; safe with WAL
+    'synchronous': 'NORMAL',
+    'busy_timeout': 30000,
+    # Negative sizes are KiB: a 64 MB page cache per connection
+    'cache_size': -64000,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+_ingest_lock = threading.Lock()
+
+def get_pragmas():
+    pragmas = dict(DEFAULT_PRAGMAS)
+    pragmas.update(getattr(settings, 'EQUIPMENT_SQLITE_PRAGMAS', {}))
+    return {name: value for name, value in pragmas.items() if value is not None}
+
+def apply_pragmas(sqlite_connection, pragmas=None):
+    """Run the pragmas on a raw sqlite3 connection"""
+    for name, value in (get_pragmas() if pragmas is None else pragmas).items():
+        sqlite_connection.execute(f"PRAGMA {name} = {value}")
+
+def is_file_database(database):
+    name = str(database.settings_dict['NAME'])
+    return database.vendor == 'sqlite' and name != ':memory:' and 'mode=memory' not in name
+
+def lock_path(database=None):
+    """File whose lock every process writing this database shares, or None when there is nothing to share"""
+    database = database or connection
+    if not getattr(settings, 'EQUIPMENT_INGEST_LOCK', True) or not is_file_database(database):
+        return None
+    return f"{database.settings_dict['NAME']}.ingest.lock"
+
+def ingest_lock_shared():
+    """Whether ingest_lock() also excludes ingests in other processes"""
+    return fcntl is not None and lock_path() is not None
+
+@contextmanager
+def ingest_lock(path=None):
+    """Hold the database's single ingest slot; waits for (rather than collides with) other ingests"""
+    path = path or lock_path()
+    with _ingest_lock:
+        if path is None or fcntl is None:
+            yield
+            return
+        with open(path, 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
@@ -0,0 +1,117 @@
+import math
+
+PARAMETERS = ['flowrate', 'pressure', 'temperature']
+
+class RunningStats:
+    """Single-pass mean/variance/min/max accumulator (Welford) that can merge partial results
+
+    count, min and max are exact. mean and std are not bit-identical to the
+    original sum(values) / len(values) and two-pass variance: the operations
+    are ordered differently, so the last few bits differ (around 1e-14
+    relative for means; for std up to about 1e-9 where a tiny spread sits on a
+    huge offset, a case where neither formula keeps more precision than that).
+    """
+
+    __slots__ = ('count', 'mean', 'm2', 'min', 'max')
+
+    def __init__(self, count=0, mean=0.0, m2=0.0, min=math.inf, max=-math.inf):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+        self.min = min
+        self.max = max
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        """Combine another accumulator into this one (Chan et al. parallel update)"""
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            self.count, self.mean, self.m2 = other.count, other.mean, other.m2
+            self.min, self.max = other.min, other.max
+            return self
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def variance(self):
+        """Population variance, as the original two-pass calculation defined it"""
+        return self.m2 / self.count if self.count else 0.0
+
+    def as_dict(self):
+        if not self.count:
+            return {'mean': 0.0, 'min': 0.0, 'max': 0.0, 'std': 0.0}
+        return {
+            'mean': self.mean,
+            'min': self.min,
+            'max': self.max,
+            'std': self.variance ** 0.5
+        }
+
+class DatasetStats:
+    """Accumulates summary_stats for a dataset, overall and per equipment type, in one pass"""
+
+    def __init__(self):
+        self.count = 0
+        self.parameters = {param: RunningStats() for param in PARAMETERS}
+        self.by_type = {}
+
+    def _type_stats(self, eq_type):
+        stats = self.by_type.get(eq_type)
+        if stats is None:
+            stats = self.by_type[eq_type] = {param: RunningStats() for param in PARAMETERS}
+        return stats
+
+    def add(self, eq_type, flowrate, pressure, temperature):
+        self.count += 1
+        type_stats = self._type_stats(eq_type)
+        for param, value in zip(PARAMETERS, (flowrate, pressure, temperature)):
+            self.parameters[param].add(value)
+            type_stats[param].add(value)
+
+    def add_rows(self, rows):
+        """Add (name, type, flowrate, pressure, temperature) tuples"""
+        for _, eq_type, flowrate, pressure, temperature in rows:
+            self.add(eq_type, flowrate, pressure, temperature)
+        return self
+
+    def merge(self, other):
+        self.count += other.count
+        for param in PARAMETERS:
+            self.parameters[param].merge(other.parameters[param])
+        for eq_type, other_stats in other.by_type.items():
+            type_stats = self._type_stats(eq_type)
+            for param in PARAMETERS:
+                type_stats[param].merge(other_stats[param])
+        return self
+
+    def summary(self):
+        """Return the summary_stats JSON stored on EquipmentDataset"""
+        return {
+            'total_count': self.count,
+            'equipment_type_distribution': {
+                eq_type: stats[PARAMETERS[0]].count for eq_type, stats in self.by_type.items()
+            },
+            'parameter_stats': {
+                param: stats.as_dict() for param, stats in self.parameters.items()
+            },
+            'type_parameter_stats': {
+                eq_type: {param: stats[param].as_dict() for param in PARAMETERS}
+                for eq_type, stats in self.by_type.items()
+            }
+        }
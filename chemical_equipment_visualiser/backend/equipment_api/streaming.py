@@ -0,0 +1,79 @@
+"""Streamed exports of a dataset's equipment rows.
+
+Rows are read in fixed-size chunks (from the columnar copy, or with a
+server-side database iterator) and each chunk is encoded and sent before
+the next is read, so memory stays flat and the first bytes go out before
+the dataset has been read. Under ASGI the same chunks are handed to the
+server through an async iterator (aiter_in_thread); Django would otherwise
+collect a sync iterator into a list before sending anything.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from django.conf import settings
+from django.db import connections
+from .columnar import EquipmentBlock, load_columns
+from .encoders import encode_block
+from .filters import has_filters
+from .pagination import EQUIPMENT_FIELDS, page_queryset
+from .renderers import NDJSONRenderer
+
+def get_export_chunk_size():
+    return getattr(settings, 'EQUIPMENT_EXPORT_CHUNK_SIZE', 2000)
+
+def iter_blocks(dataset, params, chunk_size):
+    """EquipmentBlocks covering the filtered, sorted rows of a dataset"""
+    columns = None if has_filters(params) or params.get('sort') else load_columns(dataset.id)
+    if columns is not None:
+        for start in range(0, len(columns), chunk_size):
+            yield columns.block(start, min(start + chunk_size, len(columns)))
+        return
+    rows = page_queryset(dataset, params).values_list(*EQUIPMENT_FIELDS).iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        yield EquipmentBlock.from_rows(chunk)
+
+def stream_json(blocks):
+    """One JSON array, byte-identical to rendering the whole list with JSONRenderer"""
+    yield b'['
+    separator = b''
+    for block in blocks:
+        if len(block):
+            # Encode the chunk as an array and drop its brackets
+            yield separator + encode_block(block)[1:-1]
+            separator = b','
+    yield b']'
+
+def stream_ndjson(blocks):
+    """One JSON object per line"""
+    renderer = NDJSONRenderer()
+    for block in blocks:
+        if len(block):
+            yield renderer.render(block.records())
+
+def _close(chunks):
+    chunks.close()
+    # The thread ends with the stream; don't leave its connection open
+    connections.close_all()
+
+async def aiter_in_thread(chunks):
+    """Async iterator over a blocking generator, advanced one chunk at a time on a thread of its own
+
+    One thread for the whole stream, because a database cursor belongs to the
+    connection of the thread that opened it.
+    """
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='equipment-export')
+    done = object()
+    try:
+        while True:
+            chunk = await loop.run_in_executor(executor, next, chunks, done)
+            if chunk is done:
+                return
+            yield chunk
+    finally:
+        # Also runs when the client disconnects mid-stream
+        await loop.run_in_executor(executor, _close, chunks)
+        executor.shutdown(wait=False)
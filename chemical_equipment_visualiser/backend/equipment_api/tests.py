@@ -0,0 +1,1483 @@
+import base64
+import bz2
+import gzip
+import hashlib
+import io
+import json
+import lzma
+import os
+import shutil
+import tempfile
+import unittest
+from datetime import timedelta
+from unittest.mock import patch
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
+from django.http import QueryDict
+from django.core.files.uploadedfile import SimpleUploadedFile, TemporaryUploadedFile
+from django.test import AsyncRequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient, APITestCase, APITransactionTestCase
+from equipment_api import async_views, views
+from equipment_api.analytics import chunk_stats, encode_rows
+from equipment_api.charts import BIN_RULES, bin_edges, get_max_bins
+from equipment_api.columnar import EquipmentBlock, dataset_dir, load_columns, write_dataset_columns
+from equipment_api.compare import added_equipment, changed_equipment
+from equipment_api.compression import zstandard
+from equipment_api.encoders import DECIMAL_RANGE, encode_block, encode_rows_orjson, encode_rows_template, orjson
+from equipment_api.events import EventStream, dataset_created, job_changed
+from equipment_api.jobs import (INTERRUPTED_ERROR, claim_file, get_job_dir, recover_jobs, release_file, run_job,
+                                submit_upload, write_progress)
+from equipment_api.management.commands.bench_analytics import legacy_calculate_stats
+from equipment_api.models import DatasetEvent, DatasetTypeAggregate, Equipment, EquipmentDataset, IngestJob, UploadSession
+from equipment_api.parallel import iter_parsed_ranges
+from equipment_api.pagination import decode_cursor, encode_cursor, page_queryset, paginate_equipment
+from equipment_api.renderers import ColumnarJSONRenderer, EquipmentJSONRenderer, MessagePackRenderer, msgpack
+from equipment_api.retention import RetentionPolicy, prune
+from equipment_api.serializers import EquipmentSerializer
+from equipment_api.stats import PARAMETERS, DatasetStats
+from equipment_api.utils import process_csv_file
+
+TYPES = ['Pump', 'Valve', 'Compressor']
+
+# Names and values that trip up hand-written JSON encoders
+EDGE_NAMES = ['plain', 'quote "q"', 'back\\slash', 'tab\tnew\nline', 'ctl\x00\x1f\x7f', '\u00e9 \u4e2d\u6587 \U0001f680',
+              'line\u2028sep\u2029para', '', '/slash', '\ud7ff\ue000']
+EDGE_VALUES = [0.0, -0.0, 1.0, -1.5, 0.1, 1e-4, 9.99e-5, 1e-7, 123.456, 1e15, 1e16, 1.5e17, 2.0 ** 53,
+               5e-324, 1.7976931348623157e308, 1 / 3]
+
+def create_dataset(name, rows):
+    return create_dataset_rows(name, [
+        (f"{TYPES[i % 3]}-{i}", TYPES[i % 3], 100 + i % 50, 1 + i % 10, 300 + i % 100) for i in range(rows)
+    ])
+
+def create_dataset_rows(name, rows):
+    """A dataset of (name, type, flowrate, pressure, temperature) rows, with a total_count summary"""
+    dataset = EquipmentDataset.objects.create(name=name, file_name=f"{name}.csv",
+                                              summary_stats={'total_count': len(rows)})
+    Equipment.objects.bulk_create([
+        Equipment(dataset=dataset, equipment_name=equipment_name, equipment_type=eq_type,
+                  flowrate=flowrate, pressure=pressure, temperature=temperature)
+        for equipment_name, eq_type, flowrate, pressure, temperature in rows
+    ])
+    return dataset
+
+class EquipmentStorageMixin:
+    """Authenticated client; columnar and job files go to a temporary directory and caches start empty"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.storage = tempfile.mkdtemp(prefix='equipment-tests-')
+        cls.storage_settings = override_settings(
+            EQUIPMENT_COLUMNAR_DIR=os.path.join(cls.storage, 'columnar'),
+            EQUIPMENT_JOB_DIR=os.path.join(cls.storage, 'uploads'),
+        )
+        cls.storage_settings.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.storage_settings.disable()
+        shutil.rmtree(cls.storage, ignore_errors=True)
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        # Dataset ids are reused once a test's transaction rolls back
+        shutil.rmtree(os.path.join(self.storage, 'columnar'), ignore_errors=True)
+        self.user = User.objects.create_user('tester', password='tester-password')
+        self.client.force_authenticate(self.user)
+
+class EquipmentAPITestCase(EquipmentStorageMixin, APITestCase):
+    pass
+
+class EquipmentAPITransactionTestCase(EquipmentStorageMixin, APITransactionTestCase):
+    """For code that reads the database from other threads, which can't see an open test transaction"""
+
+class QueryPlanTests(TestCase):
+    """The keyset, filter and compare queries are served by the (dataset, column) indexes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.before = create_dataset('before', 200)
+        cls.dataset = create_dataset('after', 210)
+
+    def setUp(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('Plans are checked against SQLite')
+
+    def page_plan(self, query, after_first=False):
+        """EXPLAIN QUERY PLAN of a page, or of the page after the first row when after_first"""
+        params = QueryDict(query)
+        position = None
+        if after_first:
+            sort = params.get('sort') or 'id'
+            row = page_queryset(self.dataset, params).values('id', sort.lstrip('-')).first()
+            position = {'id': row['id'], 'sort': sort, 'value': row[sort.lstrip('-')]}
+        return page_queryset(self.dataset, params, position)[:1000].explain()
+
+    def assertSearches(self, plan, index):
+        lines = [line for line in plan.splitlines() if 'equipment_api_equipment' in line]
+        self.assertTrue(lines, plan)
+        for line in lines:
+            self.assertIn('SEARCH', line, plan)
+            self.assertIn(f"USING INDEX {index}", line, plan)
+
+    def test_keyset_by_id(self):
+        plan = self.page_plan('', after_first=True)
+        self.assertIn('rowid>?', plan)
+        self.assertNotIn('SCAN', plan)
+
+    def test_keyset_by_column(self):
+        cases = [
+            ('sort=flowrate', 'equipment_dataset_flow_idx'),
+            ('sort=-temperature', 'equipment_dataset_temp_idx'),
+            ('sort=equipment_name', 'equipment_dataset_name_idx'),
+            ('sort=equipment_type', 'equipment_dataset_type_idx'),
+        ]
+        for query, index in cases:
+            with self.subTest(query=query):
+                plan = self.page_plan(query, after_first=True)
+                self.assertSearches(plan, index)
+                self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_filters(self):
+        cases = [
+            ('equipment_type=Pump', 'equipment_dataset_type_idx'),
+            ('flowrate_min=100&flowrate_max=120', 'equipment_dataset_flow_idx'),
+            ('pressure_min=5&pressure_max=6', 'equipment_dataset_pressure_idx'),
+            ('temperature_min=390', 'equipment_dataset_temp_idx'),
+            ('name_prefix=Pump-1', 'equipment_dataset_name_idx'),
+            ('flowrate_min=100&flowrate_max=120&sort=-flowrate', 'equipment_dataset_flow_idx'),
+        ]
+        for query, index in cases:
+            with self.subTest(query=query):
+                self.assertSearches(self.page_plan(query), index)
+
+    def test_compare(self):
+        cases = [
+            ('added', added_equipment(self.before.id, self.dataset.id)),
+            ('removed', added_equipment(self.dataset.id, self.before.id)),
+            ('changed', changed_equipment(self.before.id, self.dataset.id)),
+        ]
+        for description, queryset in cases:
+            with self.subTest(description):
+                plan = queryset.explain()
+                correlated = [line for line in plan.splitlines() if ' U0 ' in line]
+                self.assertTrue(correlated, plan)
+                for line in correlated:
+                    self.assertIn('equipment_dataset_name_idx', line, plan)
+                self.assertNotIn('SCAN', plan)
+
+class CursorTests(TestCase):
+    """Cursors that don't decode to a position for the requested sort are a 400, not a 500"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.dataset = create_dataset('cursor', 30)
+        cls.user = User.objects.create_user('cursor-user', password='cursor-password')
+
+    def test_round_trip(self):
+        for sort in ['id', '-id', 'flowrate', '-temperature', 'equipment_name']:
+            with self.subTest(sort=sort):
+                page = paginate_equipment(self.dataset, QueryDict(f"sort={sort}&page_size=7"))
+                self.assertIsInstance(decode_cursor(page['next_cursor'], sort), dict)
+
+    def test_malformed(self):
+        cursors = [
+            ('garbage', 'id'),
+            ('\u00e9', 'id'),
+            (encode_cursor([1, 2]), 'id'),
+            (encode_cursor('x'), 'id'),
+            (encode_cursor({}), 'id'),
+            (encode_cursor({'id': '5'}), 'id'),
+            (encode_cursor({'id': None}), 'id'),
+            (encode_cursor({'id': True}), 'id'),
+            (encode_cursor({'id': 5, 'sort': 'flowrate'}), 'flowrate'),
+            (encode_cursor({'id': 5, 'sort': 'flowrate', 'value': 'high'}), 'flowrate'),
+            (encode_cursor({'id': 5, 'sort': 'flowrate', 'value': [1]}), 'flowrate'),
+            (encode_cursor({'id': 5, 'sort': 'equipment_name', 'value': 3}), 'equipment_name'),
+            (encode_cursor({'id': 5, 'sort': 'pressure', 'value': 1.0}), 'flowrate'),
+            (encode_cursor({'id': 5}), '-temperature'),
+        ]
+        for cursor, sort in cursors:
+            with self.subTest(cursor=cursor, sort=sort):
+                with self.assertRaises(ValueError):
+                    decode_cursor(cursor, sort)
+
+    def test_malformed_cursor_is_bad_request(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        url = reverse('get-dataset-equipment', args=[self.dataset.id])
+        for cursor in [encode_cursor({'id': 5, 'sort': 'flowrate'}), encode_cursor(['id'])]:
+            with self.subTest(cursor=cursor):
+                response = client.get(url, {'sort': 'flowrate', 'cursor': cursor})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('cursor', response.json()['error'])
+
+class DuplicateUploadTests(TestCase):
+    """Uploading content that was already ingested brings that dataset back as the latest"""
+
+    def test_duplicate_becomes_latest(self):
+        content = b"Equipment Name,Type,Flowrate,Pressure,Temperature\nP-1,Pump,100,5,300\n"
+        original = create_dataset('original', 3)
+        original.content_hash = hashlib.sha256(content).hexdigest()
+        original.save(update_fields=['content_hash'])
+        newer = create_dataset('newer', 3)
+        user = User.objects.create_user('upload-user', password='upload-password')
+        client = APIClient()
+        client.force_authenticate(user)
+
+        response = client.post(reverse('upload-csv'), {'file': SimpleUploadedFile('again.csv', content)},
+                               format='multipart')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['deduplicated'])
+        self.assertEqual(response.json()['id'], original.id)
+        self.assertEqual(EquipmentDataset.objects.order_by('-uploaded_at').first().id, original.id)
+        self.assertGreater(EquipmentDataset.objects.get(id=original.id).uploaded_at, newer.uploaded_at)
+        event = DatasetEvent.objects.order_by('-id').first()
+        self.assertEqual(event.kind, 'dataset-created')
+
+def assert_summary_close(test, actual, expected, path='summary'):
+    """Same summary_stats up to float rounding, with keys in the same order so stored JSON keeps its layout"""
+    if isinstance(expected, dict):
+        test.assertEqual(list(actual), list(expected), path)
+        for key in expected:
+            assert_summary_close(test, actual[key], expected[key], f"{path}.{key}")
+    else:
+        test.assertAlmostEqual(actual, expected, delta=1e-9 * max(1.0, abs(expected)), msg=path)
+
+class IngestStatsTests(unittest.TestCase):
+    """summary_stats merged from vectorized chunk statistics match a row-by-row pass"""
+
+    def test_chunks_match_row_by_row(self):
+        rng = np.random.default_rng(3)
+        rows = [
+            (f"EQ-{i}", TYPES[int(t)], *np.round(rng.uniform([50, 1, 50], [300, 20, 400]), 2).tolist())
+            for i, t in enumerate(rng.integers(0, len(TYPES), 500))
+        ]
+        # A type that first appears in a later chunk
+        rows[400] = ('EQ-400', 'Reactor', 120.5, 3.25, 410.0)
+
+        merged = DatasetStats()
+        for start in range(0, len(rows), 64):
+            merged.merge(chunk_stats(*encode_rows(rows[start:start + 64])))
+
+        assert_summary_close(self, merged.summary(), DatasetStats().add_rows(rows).summary())
+
+@override_settings(EQUIPMENT_INGEST_BATCH_SIZE=500)
+class StreamingIngestTests(EquipmentAPITestCase):
+    """Ingest writes chunk by chunk under a hidden dataset that only appears once complete"""
+
+    def csv_file(self, rows, bad_line=None):
+        lines = [f"EQ-{i},{TYPES[i % 3]},{100 + i % 13},{i % 7},{300 + i % 11}" for i in range(rows)]
+        if bad_line is not None:
+            lines[bad_line - 2] = "EQ-bad,Pump,fast,1,300"
+        content = "Equipment Name,Type,Flowrate,Pressure,Temperature\n" + "\n".join(lines) + "\n"
+        return SimpleUploadedFile('stream.csv', content.encode())
+
+    def test_hidden_until_complete(self):
+        progress = []
+
+        def report(rows, position):
+            # Earlier chunks are committed but not visible
+            self.assertFalse(EquipmentDataset.objects.exists())
+            progress.append((rows, position, Equipment.objects.count()))
+
+        dataset = process_csv_file(self.csv_file(1800), 'streamed', progress=report)
+
+        self.assertEqual([rows for rows, _, _ in progress], [500, 1000, 1500, 1800])
+        self.assertEqual([stored for _, _, stored in progress], [500, 1000, 1500, 1800])
+        positions = [position for _, position, _ in progress]
+        self.assertEqual(positions, sorted(positions))
+        self.assertEqual(list(EquipmentDataset.objects.all()), [dataset])
+        self.assertEqual(dataset.summary_stats['total_count'], 1800)
+
+    def test_bad_row_leaves_nothing(self):
+        with self.assertRaisesMessage(ValueError, "Invalid numeric value on line 1203"):
+            process_csv_file(self.csv_file(1800, bad_line=1203), 'broken')
+        self.assertFalse(EquipmentDataset.all_objects.exists())
+        self.assertFalse(Equipment.objects.exists())
+
+    def test_prune_deletes_rows_of_crashed_ingest(self):
+        kept = create_dataset('kept', 10)
+        # What an ingest killed mid-file leaves: rows under a dataset that never became ready
+        crashed = create_dataset('crashed', 30)
+        EquipmentDataset.all_objects.filter(id=crashed.id).update(ready=False)
+
+        out = io.StringIO()
+        with patch('equipment_api.retention.ingest_lock_shared', return_value=True):
+            call_command('prune_datasets', stdout=out)
+
+        self.assertIn("Deleted 30 equipment rows left by interrupted ingests", out.getvalue())
+        self.assertFalse(EquipmentDataset.all_objects.filter(id=crashed.id).exists())
+        self.assertEqual(Equipment.objects.filter(dataset=kept).count(), 10)
+
+class LegacyStatsParityTests(EquipmentAPITestCase):
+    """Ingested summary_stats against the original pure-Python calculate_stats
+
+    Counts, min and max match exactly; means and standard deviations only up
+    to float rounding (see RunningStats).
+    """
+
+    def assert_matches_legacy(self, stats, values):
+        legacy = legacy_calculate_stats(values)
+        self.assertEqual((stats['min'], stats['max']), (legacy['min'], legacy['max']))
+        self.assertAlmostEqual(stats['mean'], legacy['mean'], delta=1e-12 * abs(legacy['mean']))
+        self.assertAlmostEqual(stats['std'], legacy['std'], delta=1e-9 * legacy['std'])
+
+    def test_ingest_matches_legacy(self):
+        rng = np.random.default_rng(5)
+        rows = [
+            (f"EQ-{i}", TYPES[i % 3], round(1e6 + rng.normal(0, 40), 2), round(rng.uniform(0.5, 20), 3),
+             round(rng.normal(350, 80), 1))
+            for i in range(12000)
+        ]
+        content = "Equipment Name,Type,Flowrate,Pressure,Temperature\n" + "".join(
+            ",".join(map(str, row)) + "\n" for row in rows)
+        # Several ingest chunks, merged
+        summary = process_csv_file(SimpleUploadedFile('parity.csv', content.encode()), 'parity').summary_stats
+
+        self.assertEqual(summary['total_count'], len(rows))
+        self.assertEqual(summary['equipment_type_distribution'], {name: 4000 for name in TYPES})
+        for index, param in enumerate(PARAMETERS, start=2):
+            self.assert_matches_legacy(summary['parameter_stats'][param], [row[index] for row in rows])
+            for eq_type in TYPES:
+                self.assert_matches_legacy(summary['type_parameter_stats'][eq_type][param],
+                                           [row[index] for row in rows if row[1] == eq_type])
+
+@override_settings(EQUIPMENT_ASYNC_UPLOADS=False)
+@patch('equipment_api.views.schedule_prune')
+class CompressedUploadTests(EquipmentAPITestCase):
+    """Compressed CSVs are decompressed as they are read and stored like the plain file"""
+
+    content = ("Equipment Name,Type,Flowrate,Pressure,Temperature\n"
+               + "".join(f"EQ-{i},{TYPES[i % 3]},{100 + i},{i % 9},{300 + i}\n" for i in range(2000))).encode()
+
+    def upload(self, name, data):
+        return self.client.post(reverse('upload-csv'), {'file': SimpleUploadedFile(name, data)}, format='multipart')
+
+    def stored_rows(self, dataset_id):
+        return list(Equipment.objects.filter(dataset_id=dataset_id).order_by('id').values_list(
+            'equipment_name', 'equipment_type', 'flowrate', 'pressure', 'temperature'))
+
+    def test_codecs_match_plain(self, schedule_prune):
+        plain = self.upload('plain.csv', self.content).json()
+        compressed = {
+            'data.csv.gz': gzip.compress(self.content),
+            'data.csv.bz2': bz2.compress(self.content),
+            'DATA.CSV.XZ': lzma.compress(self.content),
+        }
+        if zstandard is not None:
+            compressed['data.csv.zst'] = zstandard.ZstdCompressor().compress(self.content)
+        for name, data in compressed.items():
+            with self.subTest(name=name):
+                response = self.upload(name, data)
+                self.assertEqual(response.status_code, 201)
+                dataset = response.json()
+                self.assertEqual(dataset['file_name'], name)
+                self.assertEqual(self.stored_rows(dataset['id']), self.stored_rows(plain['id']))
+                self.assertEqual(dataset['summary_stats'], plain['summary_stats'])
+                # Hash of the bytes as uploaded, so the same archive deduplicates
+                stored = EquipmentDataset.objects.get(id=dataset['id'])
+                self.assertEqual(stored.content_hash, hashlib.sha256(data).hexdigest())
+                self.assertTrue(self.upload(name, data).json()['deduplicated'])
+
+    def test_rejected_uploads(self, schedule_prune):
+        self.assertEqual(self.upload('data.csv.zip', self.content).status_code, 400)
+        corrupt = gzip.compress(self.content)[:500]
+        response = self.upload('data.csv.gz', corrupt)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(EquipmentDataset.all_objects.exists())
+
+class ColumnarStoreTests(EquipmentAPITestCase):
+    """Column files are written beside the ingest and only published once its transaction commits"""
+
+    def csv_file(self, bad_line=None):
+        lines = [f'EQ-{i},{TYPES[i % 3]},{100 + i % 13}.25,{i % 7},{300 + i % 11}' for i in range(1200)]
+        lines[5] = '"Pump, \u00e9 \u4e2d",Pump,1.5,2,3'
+        if bad_line is not None:
+            lines[bad_line - 2] = "EQ-bad,Pump,fast,1,300"
+        content = "Equipment Name,Type,Flowrate,Pressure,Temperature\n" + "\n".join(lines) + "\n"
+        return SimpleUploadedFile('columns.csv', content.encode())
+
+    def stored_rows(self, dataset):
+        return [
+            {'id': row[0], 'equipment_name': row[1], 'equipment_type': row[2],
+             **dict(zip(PARAMETERS, row[3:]))}
+            for row in dataset.equipments.order_by('id').values_list(
+                'id', 'equipment_name', 'equipment_type', *PARAMETERS)
+        ]
+
+    def test_published_on_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            dataset = process_csv_file(self.csv_file(), 'columns')
+            # Written but not yet in place
+            self.assertIsNone(load_columns(dataset.id))
+            self.assertTrue(os.path.isdir(f"{dataset_dir(dataset.id)}.tmp"))
+        for callback in callbacks:
+            callback()
+
+        columns = load_columns(dataset.id)
+        self.assertIsNotNone(columns)
+        self.assertFalse(os.path.exists(f"{dataset_dir(dataset.id)}.tmp"))
+        self.assertEqual(columns.records(), self.stored_rows(dataset))
+        self.assertEqual(columns.names(5, 6), ['Pump, \u00e9 \u4e2d'])
+        self.assertEqual(self.client.get(reverse('get-equipment')).json(), self.stored_rows(dataset))
+
+    def test_failed_ingest_leaves_no_files(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(ValueError):
+                process_csv_file(self.csv_file(bad_line=1100), 'broken')
+        self.assertEqual(os.listdir(os.path.join(self.storage, 'columnar')), [])
+
+    def test_rolled_back_publish_is_not_served(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with patch('equipment_api.utils.dataset_created', side_effect=RuntimeError('event failed')):
+                with self.assertRaises(RuntimeError):
+                    process_csv_file(self.csv_file(), 'rolled back')
+        # The publish was registered inside the rolled-back transaction
+        self.assertEqual(callbacks, [])
+        dataset = EquipmentDataset.all_objects.get()
+        self.assertFalse(dataset.ready)
+        self.assertIsNone(load_columns(dataset.id))
+
+        # Clearing the abandoned dataset removes its unpublished files
+        with self.captureOnCommitCallbacks(execute=True):
+            dataset.delete()
+        self.assertFalse(os.path.exists(f"{dataset_dir(dataset.id)}.tmp"))
+
+    def test_database_fallback_and_rebuild(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            dataset = process_csv_file(self.csv_file(), 'columns')
+        os.remove(os.path.join(dataset_dir(dataset.id), 'meta.json'))
+        self.assertIsNone(load_columns(dataset.id))
+        self.assertEqual(self.client.get(reverse('get-equipment')).json(), self.stored_rows(dataset))
+
+        out = io.StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('build_columnar', stdout=out)
+        self.assertIn(f"dataset {dataset.id}: wrote 1,200 rows", out.getvalue())
+        self.assertEqual(load_columns(dataset.id).records(), self.stored_rows(dataset))
+
+@override_settings(EQUIPMENT_DELETE_BATCH_SIZE=7)
+class RetentionTests(EquipmentAPITestCase):
+    """Datasets outside the retention policy are hidden, announced and deleted in batches"""
+
+    def setUp(self):
+        super().setUp()
+        # Newest first: 40, 30, ... 10 and 0 rows, uploaded 0 to 5 days ago
+        now = timezone.now()
+        self.datasets = []
+        for age in range(6):
+            dataset = create_dataset(f"day-{age}", 40 - 10 * age if age < 5 else 0)
+            EquipmentDataset.objects.filter(id=dataset.id).update(uploaded_at=now - timedelta(days=age, hours=1))
+            self.datasets.append(dataset.id)
+
+    def test_policy_limits(self):
+        self.assertEqual(RetentionPolicy(max_datasets=4).expired_ids(), self.datasets[4:])
+        self.assertEqual(RetentionPolicy(max_datasets=None, max_age_days=2).expired_ids(), self.datasets[2:])
+        # 40 + 30 + 20 rows fit, the next 10 don't
+        self.assertEqual(RetentionPolicy(max_datasets=None, max_total_rows=95).expired_ids(), self.datasets[3:])
+        self.assertEqual(RetentionPolicy(max_datasets=None).expired_ids(), [])
+        # The newest dataset is kept whatever the limits
+        self.assertEqual(RetentionPolicy(max_datasets=1, max_age_days=0, max_total_rows=1).expired_ids(),
+                         self.datasets[1:])
+
+    def test_prune(self):
+        result = prune(RetentionPolicy(max_datasets=3))
+
+        self.assertEqual(result['datasets'], self.datasets[3:])
+        self.assertEqual(result['rows'], 10 + 0 + 0)
+        self.assertEqual(list(EquipmentDataset.all_objects.order_by('-uploaded_at').values_list('id', flat=True)),
+                         self.datasets[:3])
+        self.assertFalse(Equipment.objects.filter(dataset_id__in=self.datasets[3:]).exists())
+        self.assertEqual(Equipment.objects.count(), 40 + 30 + 20)
+        event = DatasetEvent.objects.get()
+        self.assertEqual((event.kind, event.data), ('dataset-pruned', {'dataset_ids': self.datasets[3:]}))
+        self.assertEqual(prune(RetentionPolicy(max_datasets=3))['datasets'], [])
+
+    @override_settings(EQUIPMENT_RETENTION={'MAX_DATASETS': 2})
+    def test_command(self):
+        out = io.StringIO()
+        call_command('prune_datasets', '--dry-run', stdout=out)
+        self.assertIn(f"Would delete 4 datasets {self.datasets[2:]} (30 equipment rows)", out.getvalue())
+        self.assertEqual(EquipmentDataset.objects.count(), 6)
+        self.assertFalse(DatasetEvent.objects.exists())
+
+        out = io.StringIO()
+        call_command('prune_datasets', '--max-datasets', '5', stdout=out)
+        self.assertIn(f"Deleted 1 datasets {self.datasets[5:]} (0 equipment rows)", out.getvalue())
+        self.assertEqual(EquipmentDataset.objects.count(), 5)
+
+class ConditionalGetTests(EquipmentAPITestCase):
+    """Latest-dataset reads carry strong ETags, answer If-None-Match with 304 and are cached"""
+
+    def setUp(self):
+        super().setUp()
+        self.dataset = create_dataset('first', 30)
+
+    def test_not_modified(self):
+        for name in ['get-summary', 'get-equipment', 'get-equipment-types']:
+            with self.subTest(name):
+                url = reverse(name)
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                etag = response['ETag']
+                self.assertEqual(response['Cache-Control'], 'private, no-cache')
+                self.assertIn('Accept', response['Vary'])
+
+                for header in [etag, f'"other", {etag}', '*']:
+                    again = self.client.get(url, HTTP_IF_NONE_MATCH=header)
+                    self.assertEqual(again.status_code, 304)
+                    self.assertEqual(again.content, b'')
+                    self.assertEqual(again['ETag'], etag)
+                self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH='"other"').status_code, 200)
+
+    def test_etag_per_query(self):
+        url = reverse('get-equipment')
+        etags = {self.client.get(url, params)['ETag'] for params in [{}, {'sort': 'flowrate'}, {'sort': '-flowrate'}]}
+        self.assertEqual(len(etags), 3)
+        # Parameter order doesn't matter
+        self.assertEqual(self.client.get(f"{url}?sort=flowrate&page_size=5")['ETag'],
+                         self.client.get(f"{url}?page_size=5&sort=flowrate")['ETag'])
+
+    def test_cached_body(self):
+        url = reverse('get-equipment')
+        body = self.client.get(url).content
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url).content, body)
+        self.assertFalse([query for query in queries if '"equipment_api_equipment"' in query['sql']])
+
+    def test_new_dataset_changes_etag(self):
+        url = reverse('get-summary')
+        etag = self.client.get(url)['ETag']
+        newer = create_dataset('second', 12)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['total_count'], 12)
+
+        # Once the newer dataset is deleted, a copy of the first is current again
+        newer.delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+
+@override_settings(EQUIPMENT_PARSE_WORKERS=2, EQUIPMENT_PARALLEL_MIN_BYTES=0)
+class ParallelIngestTests(EquipmentAPITestCase):
+    """Files parsed across processes are stored exactly as the serial parser stores them"""
+
+    def ingest(self, content, workers):
+        path = os.path.join(self.storage, f"upload-{workers}.csv")
+        with open(path, 'wb') as f:
+            f.write(content)
+        with override_settings(EQUIPMENT_PARSE_WORKERS=workers), open(path, 'rb') as f:
+            dataset = process_csv_file(f, f"workers {workers}", file_name='upload.csv')
+        rows = list(Equipment.objects.filter(dataset=dataset).order_by('id').values_list(
+            'equipment_name', 'equipment_type', 'flowrate', 'pressure', 'temperature'))
+        return dataset, rows
+
+    def assert_same_as_serial(self, content):
+        serial, serial_rows = self.ingest(content, 0)
+        parallel, parallel_rows = self.ingest(content, 2)
+        self.assertEqual(parallel_rows, serial_rows)
+        self.assertEqual(parallel.content_hash, serial.content_hash)
+        assert_summary_close(self, parallel.summary_stats, serial.summary_stats)
+        return parallel_rows
+
+    def test_matches_serial(self):
+        lines = [f"EQ-{i},{TYPES[i % 3]},{100 + i % 7}.5,{i % 11},{300 + i}" for i in range(3000)]
+        content = ("Equipment Name,Type,Flowrate,Pressure,Temperature\n" + "\n".join(lines) + "\n").encode()
+        with patch('equipment_api.utils.iter_parsed_ranges', wraps=iter_parsed_ranges) as parsed_ranges:
+            self.assertEqual(len(self.assert_same_as_serial(content)), 3000)
+        # Only the parallel ingest splits the file
+        self.assertEqual(parsed_ranges.call_count, 1)
+
+    def test_quoted_newline_parsed_serially(self):
+        lines = [f"EQ-{i},{TYPES[i % 3]},{100 + i % 7}.5,{i % 11},{300 + i}" for i in range(3000)]
+        # Around the middle of the file, where the parallel split falls: long names whose
+        # line break comes last, so the next newline after the split is inside quotes
+        for i in range(1000, 2000):
+            lines[i] = f'"Pump {i} {"x" * 200}\nspare, line 2",Pump,101.5,3,{300 + i}'
+        content = ("Equipment Name,Type,Flowrate,Pressure,Temperature\n" + "\n".join(lines) + "\n").encode()
+        with patch('equipment_api.utils.iter_parsed_ranges', wraps=iter_parsed_ranges) as parsed_ranges:
+            rows = self.assert_same_as_serial(content)
+        parsed_ranges.assert_not_called()
+        self.assertEqual(len(rows), 3000)
+        self.assertEqual(rows[1500][0], f"Pump 1500 {'x' * 200}\nspare, line 2")
+
+@override_settings(EQUIPMENT_ASYNC_UPLOADS=True)
+class IngestJobTests(EquipmentAPITransactionTestCase):
+    """Uploads answer 202 with a job the client polls; run_job does the work (in the pool in production)"""
+
+    def upload(self, content):
+        with patch('equipment_api.jobs.submit_job') as submit_job:
+            response = self.client.post(reverse('upload-csv'),
+                                        {'file': SimpleUploadedFile('queued.csv', content), 'name': 'queued'},
+                                        format='multipart')
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()['job_id']
+        submit_job.assert_called_once_with(job_id, IngestJob.objects.get(id=job_id).file_path)
+        return response.json()
+
+    def run_queued(self, job_id):
+        job = IngestJob.objects.get(id=job_id)
+        try:
+            return run_job(job_id)
+        finally:
+            release_file(job.file_path)
+
+    def job_states(self, job_id):
+        return [event.data['state'] for event in DatasetEvent.objects.filter(kind='job-progress').order_by('id')
+                if event.data['job_id'] == job_id]
+
+    def test_job_ingests_upload(self):
+        lines = [f"EQ-{i},{TYPES[i % 3]},{100 + i},{i % 9},{300 + i}" for i in range(120)]
+        queued = self.upload(("Equipment Name,Type,Flowrate,Pressure,Temperature\n"
+                              + "\n".join(lines) + "\n").encode())
+        self.assertEqual(queued['state'], 'queued')
+        self.assertTrue(queued['status_url'].endswith(reverse('get-job', args=[queued['job_id']])))
+        self.assertFalse(EquipmentDataset.objects.exists())
+
+        self.assertEqual(self.run_queued(queued['job_id']), 'succeeded')
+
+        job = self.client.get(reverse('get-job', args=[queued['job_id']])).json()
+        self.assertEqual(job['state'], 'succeeded')
+        self.assertEqual(job['rows_processed'], 120)
+        self.assertEqual(job['bytes_processed'], job['bytes_total'])
+        dataset = EquipmentDataset.objects.get(id=job['dataset_id'])
+        self.assertEqual(dataset.name, 'queued')
+        self.assertEqual(dataset.equipments.count(), 120)
+        self.assertEqual(self.job_states(queued['job_id']), ['queued', 'running', 'succeeded'])
+        self.assertEqual(os.listdir(get_job_dir()), [])
+
+    def test_failed_job_reports_error(self):
+        queued = self.upload(b"Equipment Name,Type,Flowrate,Pressure,Temperature\nP-1,Pump,fast,1,300\n")
+        self.assertEqual(self.run_queued(queued['job_id']), 'failed')
+
+        job = self.client.get(reverse('get-job', args=[queued['job_id']])).json()
+        self.assertEqual(job['error'], "Invalid numeric value on line 2")
+        self.assertIsNone(job['dataset_id'])
+        self.assertFalse(EquipmentDataset.all_objects.exists())
+        self.assertEqual(self.job_states(queued['job_id']), ['queued', 'running', 'failed'])
+
+    def test_unknown_job(self):
+        response = self.client.get(reverse('get-job', args=['00000000-0000-0000-0000-000000000000']))
+        self.assertEqual(response.status_code, 404)
+
+class JobRecoveryTests(EquipmentAPITestCase):
+    """Jobs whose server process is gone are failed; jobs a live process owns are left alone"""
+
+    def make_job(self, state):
+        path = os.path.join(get_job_dir(), f"{state}.upload")
+        with open(path, 'wb') as f:
+            f.write(b"Equipment Name,Type,Flowrate,Pressure,Temperature\n")
+        return IngestJob.objects.create(state=state, file_name='data.csv', file_path=path, bytes_total=52)
+
+    def test_abandoned_jobs_fail(self):
+        jobs = [self.make_job('queued'), self.make_job('running')]
+        finished = IngestJob.objects.create(state='succeeded', file_name='done.csv', file_path='/nonexistent')
+        # A partial dataset an interrupted ingest left behind
+        hidden = EquipmentDataset.all_objects.create(name='partial', file_name='data.csv', ready=False)
+
+        with patch('equipment_api.retention.ingest_lock_shared', return_value=True):
+            recovered = recover_jobs()
+
+        self.assertCountEqual(recovered, [str(job.id) for job in jobs])
+        for job in jobs:
+            job.refresh_from_db()
+            self.assertEqual(job.state, 'failed')
+            self.assertEqual(job.error, INTERRUPTED_ERROR)
+            self.assertIsNotNone(job.finished_at)
+            self.assertFalse(os.path.exists(job.file_path))
+        finished.refresh_from_db()
+        self.assertEqual(finished.state, 'succeeded')
+        self.assertFalse(EquipmentDataset.all_objects.filter(id=hidden.id).exists())
+        self.assertEqual(DatasetEvent.objects.filter(kind='job-progress').count(), 2)
+
+    def test_owned_jobs_left_alone(self):
+        job = self.make_job('running')
+        # As the process that queued it does
+        self.assertTrue(claim_file(job.file_path))
+        try:
+            self.assertEqual(recover_jobs(), [])
+        finally:
+            release_file(job.file_path)
+        job.refresh_from_db()
+        self.assertEqual(job.state, 'running')
+        self.assertTrue(os.path.exists(job.file_path))
+
+    def test_upload_on_disk_moved_into_job_dir(self):
+        content = b"Equipment Name,Type,Flowrate,Pressure,Temperature\nP-1,Pump,100,5,300\n"
+        upload = TemporaryUploadedFile('data.csv', 'text/csv', len(content), None)
+        upload.write(content)
+        temporary_path = upload.temporary_file_path()
+
+        job = submit_upload(upload, 'moved')
+        release_file(job.file_path)
+        upload.close()
+
+        self.assertFalse(os.path.exists(temporary_path))
+        self.assertEqual(os.path.dirname(job.file_path), get_job_dir())
+        with open(job.file_path, 'rb') as f:
+            self.assertEqual(f.read(), content)
+        self.assertEqual(job.bytes_total, len(content))
+
+@override_settings(EQUIPMENT_ASYNC_UPLOADS=False)
+class ChunkedUploadTests(EquipmentAPITestCase):
+    """Resumable uploads: chunks in any order, resends, limits and ownership"""
+
+    content = ("Equipment Name,Type,Flowrate,Pressure,Temperature\n"
+               + "".join(f"EQ-{i},{TYPES[i % 3]},{100 + i},{i % 9},{300 + i}\n" for i in range(40))).encode()
+
+    def start(self, client=None, **data):
+        data = {'file_name': 'chunked.csv', 'total_size': len(self.content), 'chunk_size': 256, **data}
+        return (client or self.client).post(reverse('create-upload'), data, format='json')
+
+    def put_chunk(self, upload_id, index, client=None, checksum=None):
+        data = self.content[index * 256:(index + 1) * 256]
+        return (client or self.client).put(
+            reverse('upload-chunk', args=[upload_id, index]), data, content_type='application/octet-stream',
+            HTTP_X_CHUNK_CHECKSUM=checksum or hashlib.sha256(data).hexdigest()
+        )
+
+    @patch('equipment_api.views.schedule_prune')
+    def test_resume_and_complete(self, schedule_prune):
+        upload = self.start().json()
+        total = upload['total_chunks']
+        self.assertGreater(total, 3)
+        for index in reversed(range(1, total)):
+            self.assertEqual(self.put_chunk(upload['upload_id'], index).status_code, 200)
+        self.assertEqual(self.put_chunk(upload['upload_id'], 0, checksum='0' * 64).status_code, 400)
+
+        # After an interruption the client asks what is still missing
+        status = self.client.get(reverse('get-upload', args=[upload['upload_id']])).json()
+        self.assertEqual(status['missing'], [0])
+        incomplete = self.client.post(reverse('complete-upload', args=[upload['upload_id']]))
+        self.assertEqual(incomplete.status_code, 400)
+
+        self.put_chunk(upload['upload_id'], 0)
+        self.put_chunk(upload['upload_id'], 1)
+        response = self.client.post(reverse('complete-upload', args=[upload['upload_id']]),
+                                    {'checksum': hashlib.sha256(self.content).hexdigest()}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Equipment.objects.filter(dataset_id=response.json()['id']).count(), 40)
+        self.assertFalse(os.path.exists(UploadSession.objects.get(id=upload['upload_id']).file_path))
+        schedule_prune.assert_called_once()
+
+    def test_size_limit(self):
+        with override_settings(EQUIPMENT_UPLOAD_MAX_SIZE=len(self.content) - 1):
+            response = self.start()
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(UploadSession.objects.exists())
+
+    def test_other_users_cannot_use_session(self):
+        upload_id = self.start().json()['upload_id']
+        other = APIClient()
+        other.force_authenticate(User.objects.create_user('other', password='other-password'))
+        self.assertEqual(other.get(reverse('get-upload', args=[upload_id])).status_code, 404)
+        self.assertEqual(self.put_chunk(upload_id, 0, client=other).status_code, 404)
+        self.assertEqual(other.post(reverse('complete-upload', args=[upload_id])).status_code, 404)
+        self.assertEqual(UploadSession.objects.get(id=upload_id).chunks.count(), 0)
+
+    def test_idle_sessions_expire(self):
+        idle = UploadSession.objects.get(id=self.start().json()['upload_id'])
+        active = UploadSession.objects.get(id=self.start().json()['upload_id'])
+        self.put_chunk(active.id, 0)
+        two_days_ago = timezone.now() - timedelta(days=2)
+        UploadSession.objects.filter(id__in=[idle.id, active.id]).update(created_at=two_days_ago)
+        # A partial file whose session row is gone
+        orphan = os.path.join(get_job_dir(), 'orphan.part')
+        with open(orphan, 'wb') as f:
+            f.truncate(1024)
+        os.utime(orphan, (two_days_ago.timestamp(), two_days_ago.timestamp()))
+
+        out = io.StringIO()
+        call_command('prune_datasets', stdout=out)
+
+        self.assertIn(str(idle.id), out.getvalue())
+        self.assertFalse(UploadSession.objects.filter(id=idle.id).exists())
+        self.assertFalse(os.path.exists(idle.file_path))
+        self.assertFalse(os.path.exists(orphan))
+        # Received a chunk within the expiry
+        self.assertTrue(os.path.exists(active.file_path))
+        self.assertTrue(UploadSession.objects.filter(id=active.id).exists())
+
+class TypeAggregateTests(EquipmentAPITestCase):
+    """Per-type statistics come from the aggregates stored at ingest, or rebuilt by a command"""
+
+    def setUp(self):
+        super().setUp()
+        lines = [f"EQ-{i},{TYPES[i % 3]},{100 + i % 17},{1 + i % 5}.5,{300 + i % 23}" for i in range(300)]
+        content = ("Equipment Name,Type,Flowrate,Pressure,Temperature\n" + "\n".join(lines) + "\n").encode()
+        self.dataset = process_csv_file(SimpleUploadedFile('typed.csv', content), 'typed')
+        self.url = reverse('get-dataset-by-type', args=[self.dataset.id])
+
+    def expected(self, types, param):
+        values = np.array(Equipment.objects.filter(dataset=self.dataset, equipment_type__in=types)
+                          .values_list(param, flat=True))
+        return len(values), values.mean(), values.std(), values.min(), values.max()
+
+    def assert_by_type(self, data):
+        self.assertEqual(set(data['types']), {'Pump', 'Valve'})
+        for eq_type in ['Pump', 'Valve']:
+            stats = data['types'][eq_type]['pressure']
+            count, mean, std, low, high = self.expected([eq_type], 'pressure')
+            self.assertEqual((stats['count'], stats['min'], stats['max']), (count, low, high))
+            self.assertAlmostEqual(stats['mean'], mean, places=9)
+            self.assertAlmostEqual(stats['std'], std, places=9)
+            self.assertNotIn('flowrate', data['types'][eq_type])
+        count, mean, std, _, _ = self.expected(['Pump', 'Valve'], 'pressure')
+        self.assertEqual(data['combined']['count'], count)
+        self.assertAlmostEqual(data['combined']['pressure']['mean'], mean, places=9)
+        self.assertAlmostEqual(data['combined']['pressure']['std'], std, places=9)
+
+    def test_by_type(self):
+        params = {'types': 'Pump,Valve', 'parameters': 'pressure'}
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, params)
+        self.assert_by_type(response.json())
+        # Answered from the aggregates, without reading equipment rows
+        self.assertFalse([query for query in queries if '"equipment_api_equipment"' in query['sql']])
+        self.assertEqual(self.client.get(self.url, {'parameters': 'density'}).status_code, 400)
+
+    def test_rebuild_command(self):
+        stored = list(DatasetTypeAggregate.objects.filter(dataset=self.dataset).values_list(
+            'equipment_type', 'parameter', 'count', 'min', 'max'))
+        DatasetTypeAggregate.objects.filter(dataset=self.dataset).delete()
+        out = io.StringIO()
+        call_command('build_type_aggregates', stdout=out)
+        self.assertIn(f"dataset {self.dataset.id}: 3 types, 300 rows", out.getvalue())
+        rebuilt = DatasetTypeAggregate.objects.filter(dataset=self.dataset).values_list(
+            'equipment_type', 'parameter', 'count', 'min', 'max')
+        self.assertCountEqual(rebuilt, stored)
+        self.assert_by_type(self.client.get(self.url, {'types': 'Pump,Valve', 'parameters': 'pressure'}).json())
+
+def edge_block(values=EDGE_VALUES):
+    rows = [
+        (index + 1, EDGE_NAMES[index % len(EDGE_NAMES)], ['Pump', 'Valve', '\u00dcmlaut Type'][index % 3],
+         values[index % len(values)], values[(index * 7) % len(values)], values[(index * 3) % len(values)])
+        for index in range(len(EDGE_NAMES) * len(values))
+    ]
+    return EquipmentBlock.from_rows(rows)
+
+def rows_from_columns(data, numeric):
+    """Row dicts from a columnar payload; numeric(name) decodes one numeric column"""
+    types = data['equipment_types']
+    ids, codes = numeric('id'), numeric('equipment_type')
+    values = {param: numeric(param) for param in PARAMETERS}
+    return [
+        {
+            'id': int(ids[index]),
+            'equipment_name': name,
+            'equipment_type': types[codes[index]],
+            **{param: float(values[param][index]) for param in PARAMETERS}
+        }
+        for index, name in enumerate(data['columns']['equipment_name'])
+    ]
+
+def decode_columns_json(body):
+    data = json.loads(body)
+    return rows_from_columns(data, lambda name: data['columns'][name])
+
+def decode_msgpack(body):
+    data = msgpack.unpackb(body)
+    return rows_from_columns(data, lambda name: np.frombuffer(data['columns'][name], dtype=data['dtypes'][name]))
+
+class EncoderParityTests(TestCase):
+    """Every equipment encoder carries the same rows as EquipmentSerializer + JSONRenderer"""
+
+    def assertRowsEqual(self, actual, expected):
+        # repr tells -0.0 from 0.0 and compares NaN with itself
+        self.assertEqual(len(actual), len(expected))
+        for got, want in zip(actual, expected):
+            self.assertEqual({key: repr(value) for key, value in got.items()},
+                             {key: repr(value) for key, value in want.items()})
+
+    def test_row_json_matches_renderer(self):
+        block = edge_block()
+        expected = JSONRenderer().render(block.records())
+        self.assertEqual(encode_block(block), expected)
+        self.assertEqual(encode_rows_template(block), expected)
+        self.assertEqual(EquipmentJSONRenderer().render(block), expected)
+
+    @unittest.skipIf(orjson is None, 'orjson is not installed')
+    def test_orjson_matches_renderer_when_used(self):
+        low, high = DECIMAL_RANGE
+        block = edge_block([value for value in EDGE_VALUES if value == 0 or low <= abs(value) < high])
+        self.assertEqual(encode_rows_orjson(block), JSONRenderer().render(block.records()))
+        self.assertEqual(encode_block(block), JSONRenderer().render(block.records()))
+
+    def test_none_in_payload(self):
+        block = edge_block()
+        data = {'dataset_id': 1, 'next_cursor': None, 'results': block, 'pages': [None, block]}
+        expected = JSONRenderer().render({
+            'dataset_id': 1, 'next_cursor': None, 'results': block.records(), 'pages': [None, block.records()]
+        })
+        self.assertEqual(EquipmentJSONRenderer().render(data), expected)
+        self.assertEqual(EquipmentJSONRenderer().render({'results': None}), b'{"results":null}')
+
+    def test_columnar_json_decodes_to_same_rows(self):
+        block = edge_block()
+        body = ColumnarJSONRenderer().render(block.columns())
+        self.assertRowsEqual(decode_columns_json(body), json.loads(encode_block(block)))
+
+    @unittest.skipIf(msgpack is None, 'msgpack is not installed')
+    def test_msgpack_decodes_to_same_rows(self):
+        block = edge_block()
+        body = MessagePackRenderer().render(block.columns(binary=True))
+        self.assertRowsEqual(decode_msgpack(body), json.loads(encode_block(block)))
+
+    def test_nan(self):
+        block = EquipmentBlock.from_rows([
+            (1, 'x', 'Pump', float('nan'), 1.0, 1.0),
+            (2, 'y', 'Valve', 2.0, float('inf'), -float('inf')),
+        ])
+        # JSON has no NaN: the fast encoder fails exactly where JSONRenderer does
+        with self.assertRaises(ValueError):
+            JSONRenderer().render(block.records())
+        with self.assertRaises(ValueError):
+            encode_block(block)
+        with self.assertRaises(ValueError):
+            ColumnarJSONRenderer().render(block.columns())
+        if msgpack is not None:
+            # Raw float64 bytes carry NaN and infinities through unchanged
+            body = MessagePackRenderer().render(block.columns(binary=True))
+            self.assertRowsEqual(decode_msgpack(body), block.records())
+
+    def test_stored_rows_match_serializer(self):
+        dataset = EquipmentDataset.objects.create(name='unicode', file_name='unicode.csv')
+        Equipment.objects.bulk_create([
+            Equipment(dataset=dataset, equipment_name=EDGE_NAMES[i % len(EDGE_NAMES)].replace('\x00', ''),
+                      equipment_type=TYPES[i % 3], flowrate=EDGE_VALUES[i % len(EDGE_VALUES)],
+                      pressure=EDGE_VALUES[(i * 7) % len(EDGE_VALUES)], temperature=i / 7)
+            for i in range(50)
+        ])
+        equipment = dataset.equipments.order_by('id')
+        expected = JSONRenderer().render(EquipmentSerializer(equipment, many=True).data)
+        block = EquipmentBlock.from_rows(list(equipment.values_list(
+            'id', 'equipment_name', 'equipment_type', *PARAMETERS
+        )))
+        self.assertEqual(encode_block(block), expected)
+        self.assertRowsEqual(decode_columns_json(ColumnarJSONRenderer().render(block.columns())), json.loads(expected))
+        if msgpack is not None:
+            body = MessagePackRenderer().render(block.columns(binary=True))
+            self.assertRowsEqual(decode_msgpack(body), json.loads(expected))
+
+class ChartTests(EquipmentAPITestCase):
+    """Chart endpoints reduce a dataset to display-sized data; rule-based bins never exceed the cap"""
+
+    def outlier_values(self):
+        rng = np.random.default_rng(0)
+        return np.concatenate([rng.normal(5, 1, 10_000), [1e7, -1e7, 1e9]])
+
+    def test_rule_bins_are_capped_before_edges_are_built(self):
+        values = self.outlier_values()
+        for rule in BIN_RULES:
+            with self.subTest(rule=rule):
+                edges = bin_edges(values, rule)
+                self.assertLessEqual(len(edges) - 1, get_max_bins())
+                self.assertEqual((edges[0], edges[-1]), (values.min(), values.max()))
+
+    def test_rule_bins_match_numpy_below_the_cap(self):
+        values = np.random.default_rng(1).normal(100, 10, 5000)
+        # 'auto' changed between numpy releases; the others are stable
+        for rule in [rule for rule in BIN_RULES if rule != 'auto']:
+            with self.subTest(rule=rule):
+                np.testing.assert_array_equal(bin_edges(values, rule), np.histogram_bin_edges(values, bins=rule))
+        np.testing.assert_array_equal(bin_edges(values, 'fd', (90, 110)),
+                                      np.histogram_bin_edges(values, bins='fd', range=(90, 110)))
+
+    def test_histogram_endpoint_with_outliers(self):
+        values = self.outlier_values()
+        dataset = create_dataset_rows('outliers', [
+            (f"P-{i}", 'Pump', value, 1.0, 300.0) for i, value in enumerate(values.tolist())
+        ])
+        url = reverse('get-dataset-chart-data', args=[dataset.id, 'histogram'])
+        for rule in ['fd', 'auto', 'stone']:
+            with self.subTest(rule=rule):
+                response = self.client.get(url, {'parameter': 'flowrate', 'bins': rule})
+                self.assertEqual(response.status_code, 200)
+                data = response.json()
+                self.assertLessEqual(len(data['counts']), get_max_bins())
+                self.assertEqual(sum(data['counts']), len(values))
+
+    def chart(self, kind, params, dataset=None):
+        if dataset is None:
+            return self.client.get(reverse('get-chart-data', args=[kind]), params)
+        return self.client.get(reverse('get-dataset-chart-data', args=[dataset.id, kind]), params)
+
+    def test_histogram_by_type(self):
+        create_dataset('charts', 600)
+        data = self.chart('histogram', {'parameter': 'temperature', 'bins': 10, 'min': 300, 'max': 350,
+                                        'by_type': 'true'}).json()
+        values = np.array(Equipment.objects.values_list('temperature', flat=True))
+        counts, edges = np.histogram(values, bins=10, range=(300, 350))
+        self.assertEqual(data['counts'], counts.tolist())
+        self.assertEqual(data['edges'], edges.tolist())
+        self.assertEqual(data['total'], 600)
+        self.assertEqual(set(data['by_type']), set(TYPES))
+        self.assertEqual(np.sum(list(data['by_type'].values()), axis=0).tolist(), data['counts'])
+
+    def test_histogram2d_and_series(self):
+        dataset = create_dataset('charts', 600)
+        data = self.chart('histogram2d', {'x': 'flowrate', 'y': 'pressure', 'x_bins': 5, 'y_bins': 'sturges'},
+                          dataset).json()
+        self.assertEqual((len(data['counts']), len(data['x_edges'])), (5, 6))
+        self.assertEqual(sum(map(sum, data['counts'])), 600)
+
+        data = self.chart('series', {'parameter': 'flowrate', 'points': 50}, dataset).json()
+        self.assertEqual(len(data['x_values']), 50)
+        self.assertEqual((data['x_values'][0], data['x_values'][-1]), (0, 599))
+        flowrates = list(Equipment.objects.order_by('id').values_list('flowrate', flat=True))
+        self.assertEqual(data['y_values'], [flowrates[int(x)] for x in data['x_values']])
+
+        data = self.chart('series', {'parameter': 'temperature', 'x': 'pressure', 'points': 20}, dataset).json()
+        self.assertEqual(data['x_values'], sorted(data['x_values']))
+
+    def test_bad_requests(self):
+        self.assertEqual(self.chart('histogram', {'parameter': 'flowrate'}).status_code, 404)
+        dataset = create_dataset('charts', 30)
+        for kind, params in [('pie', {}), ('histogram', {'parameter': 'density'}),
+                             ('histogram', {'parameter': 'flowrate', 'bins': get_max_bins() + 1}),
+                             ('histogram', {'parameter': 'flowrate', 'min': 5}),
+                             ('histogram2d', {'x': 'flowrate'}), ('series', {'parameter': 'flowrate', 'points': 2})]:
+            with self.subTest(kind=kind, params=params):
+                response = self.chart(kind, params, dataset)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.json())
+        self.assertEqual(self.chart('histogram', {'parameter': 'flowrate'},
+                                    EquipmentDataset(id=dataset.id + 1000)).status_code, 404)
+
+class TokenAuthTests(EquipmentAPITestCase):
+    """Clients log in once for a token, which is checked against the database then cached until revoked"""
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(None)
+
+    def login(self, password='tester-password'):
+        return self.client.post(reverse('login'), {'username': 'tester', 'password': password}, format='json')
+
+    def get_history(self, key):
+        return self.client.get(reverse('get-history'), HTTP_AUTHORIZATION=f"Token {key}")
+
+    def token_queries(self, queries):
+        return [query for query in queries if '"authtoken_token"' in query['sql']]
+
+    def test_login(self):
+        response = self.login()
+        self.assertEqual(response.status_code, 200)
+        key = response.json()['token']
+        self.assertEqual(response.json()['username'], 'tester')
+        self.assertEqual(Token.objects.get(user=self.user).key, key)
+        # Logging in again returns the same token
+        self.assertEqual(self.login().json()['token'], key)
+
+        self.assertEqual(self.login('wrong').status_code, 401)
+        self.assertEqual(self.client.post(reverse('login'), {'username': 'tester'}, format='json').status_code, 400)
+        self.assertEqual(self.client.get(reverse('get-history')).status_code, 401)
+        self.assertEqual(self.get_history('not-a-token').status_code, 401)
+
+    def test_token_is_cached(self):
+        key = self.login().json()['token']
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.get_history(key).status_code, 200)
+        self.assertEqual(len(self.token_queries(queries)), 1)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.get_history(key).status_code, 200)
+        self.assertEqual(self.token_queries(queries), [])
+
+    def test_logout_revokes(self):
+        key = self.login().json()['token']
+        self.assertEqual(self.get_history(key).status_code, 200)
+        response = self.client.post(reverse('logout'), HTTP_AUTHORIZATION=f"Token {key}")
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Token.objects.filter(key=key).exists())
+        # Evicted from the cache, not only deleted
+        self.assertEqual(self.get_history(key).status_code, 401)
+        self.assertNotEqual(self.login().json()['token'], key)
+
+    def test_deleted_token_is_evicted(self):
+        key = self.login().json()['token']
+        self.assertEqual(self.get_history(key).status_code, 200)
+        Token.objects.get(key=key).delete()
+        self.assertEqual(self.get_history(key).status_code, 401)
+
+    def test_basic_auth(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Basic ' + base64.b64encode(b'tester:tester-password').decode())
+        self.assertEqual(self.client.get(reverse('get-history')).status_code, 200)
+
+@override_settings(EQUIPMENT_BATCH_MAX_REQUESTS=5)
+class BatchTests(EquipmentAPITestCase):
+    """A batch answers each sub-request as its endpoint would, from one dataset snapshot"""
+
+    def setUp(self):
+        super().setUp()
+        self.older = create_dataset('older', 20)
+        self.latest = create_dataset('latest', 35)
+
+    def batch(self, data):
+        return self.client.post(reverse('batch'), data, format='json')
+
+    def test_results_match_endpoints(self):
+        response = self.batch({'requests': [
+            {'type': 'summary'},
+            {'type': 'types'},
+            {'id': 'rows', 'type': 'equipment_page', 'params': {'page_size': 10, 'sort': '-flowrate'}},
+            {'type': 'equipment', 'params': {'equipment_type': 'Pump'}},
+            {'type': 'history', 'params': {'fields': 'id,name'}},
+        ]})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['dataset_id'], self.latest.id)
+        results = data['results']
+        self.assertEqual(set(results), {'summary', 'types', 'rows', 'equipment', 'history'})
+        self.assertTrue(all(item['status'] == 200 for item in results.values()))
+
+        self.assertEqual(results['summary']['data'], self.client.get(reverse('get-summary')).json())
+        self.assertEqual(results['types']['data'], self.client.get(reverse('get-equipment-types')).json())
+        page = self.client.get(reverse('get-dataset-equipment', args=[self.latest.id]),
+                               {'page_size': 10, 'sort': '-flowrate'}).json()
+        # The next links carry the same parameters, not necessarily in the same order
+        self.assertEqual(QueryDict(results['rows']['data'].pop('next').split('?')[1]),
+                         QueryDict(page.pop('next').split('?')[1]))
+        self.assertEqual(results['rows']['data'], page)
+        self.assertEqual(results['equipment']['data'],
+                         self.client.get(reverse('get-equipment'), {'equipment_type': 'Pump'}).json())
+        self.assertEqual(results['history']['data'],
+                         [{'id': self.latest.id, 'name': 'latest'}, {'id': self.older.id, 'name': 'older'}])
+
+    def test_named_datasets(self):
+        data = self.batch({'dataset_id': self.older.id, 'requests': [
+            {'type': 'summary'},
+            {'id': 'other', 'type': 'dataset', 'dataset_id': self.latest.id, 'params': {'fields': 'id,name'}},
+        ]}).json()
+        self.assertEqual(data['dataset_id'], self.older.id)
+        self.assertEqual(data['results']['summary']['data'], {'total_count': 20})
+        self.assertEqual(data['results']['other'], {'status': 200, 'data': {'id': self.latest.id, 'name': 'latest'}})
+
+        self.assertEqual(self.batch({'dataset_id': self.latest.id + 1000, 'requests': [{'type': 'summary'}]})
+                         .status_code, 404)
+
+    def test_upload_midway(self):
+        summary = views.BATCH_HANDLERS['summary']
+
+        def summary_then_upload(request, dataset, params):
+            create_dataset('newer', 5)
+            return summary(request, dataset, params)
+
+        with patch.dict(views.BATCH_HANDLERS, summary=summary_then_upload):
+            data = self.batch({'requests': [{'type': 'summary'}, {'type': 'equipment'}]}).json()
+        # Both from the dataset that was latest when the batch started
+        self.assertEqual(data['dataset_id'], self.latest.id)
+        self.assertEqual(data['results']['summary']['data'], {'total_count': 35})
+        self.assertEqual(len(data['results']['equipment']['data']), 35)
+
+    def test_errors_per_request(self):
+        results = self.batch({'requests': [
+            {'type': 'summary'},
+            {'id': 'bad sort', 'type': 'equipment_page', 'params': {'sort': 'density'}},
+            {'id': 'missing', 'type': 'summary', 'dataset_id': self.latest.id + 1000},
+            {'id': 'bad fields', 'type': 'history', 'params': {'fields': 'colour'}},
+        ]}).json()['results']
+        self.assertEqual(results['summary']['status'], 200)
+        self.assertEqual(results['bad sort']['status'], 400)
+        self.assertIn('sort must be one of', results['bad sort']['data']['error'])
+        self.assertEqual(results['missing'], {'status': 404, 'data': {'error': 'Dataset not found'}})
+        self.assertEqual(results['bad fields']['status'], 400)
+
+    def test_invalid_batches(self):
+        for data, error in [
+            ({'requests': []}, 'requests must be a non-empty list'),
+            ([{'type': 'summary'}], 'Send a JSON object'),
+            ({'requests': [{'type': 'summary'}] * 6}, 'at most 5 requests'),
+            ({'requests': [{'type': 'delete'}]}, 'requests[0].type must be one of'),
+            ({'requests': [{'type': 'summary'}, {'type': 'summary'}]}, "Duplicate request id 'summary'"),
+            ({'dataset_id': '12', 'requests': [{'type': 'summary'}]}, 'dataset_id must be an integer'),
+            ({'requests': [{'type': 'summary', 'params': [1]}]}, 'params must be an object'),
+        ]:
+            with self.subTest(data=data):
+                response = self.batch(data)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(error, response.json()['error'])
+
+    def test_no_datasets(self):
+        EquipmentDataset.objects.all().delete()
+        data = self.batch({'requests': [{'type': 'summary'}, {'type': 'history'}]}).json()
+        self.assertIsNone(data['dataset_id'])
+        self.assertEqual(data['results']['summary'], {'status': 404, 'data': {'error': 'No data available'}})
+        self.assertEqual(data['results']['history'], {'status': 200, 'data': []})
+
+@override_settings(EQUIPMENT_EXPORT_CHUNK_SIZE=7)
+class ExportTests(EquipmentAPITestCase):
+    """Exports stream every matching row, in chunks, as one JSON array or as NDJSON"""
+
+    def setUp(self):
+        super().setUp()
+        self.dataset = create_dataset_rows('export', [
+            (EDGE_NAMES[i % len(EDGE_NAMES)], TYPES[i % 3], 100 + i * 0.5, i % 9, EDGE_VALUES[i % len(EDGE_VALUES)])
+            for i in range(40)
+        ])
+        self.url = reverse('export-dataset-equipment', args=[self.dataset.id])
+
+    def export(self, params=None):
+        response = self.client.get(self.url, params or {})
+        self.assertTrue(response.streaming)
+        return response, list(response.streaming_content)
+
+    def expected(self, queryset):
+        return EquipmentSerializer(queryset, many=True).data
+
+    def test_json(self):
+        response, chunks = self.export()
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(response['Content-Disposition'], f'attachment; filename="equipment_{self.dataset.id}.json"')
+        self.assertGreater(len(chunks), 5)
+        expected = self.expected(self.dataset.equipments.order_by('id'))
+        # Byte for byte what rendering the whole list at once gives
+        self.assertEqual(b''.join(chunks), JSONRenderer().render(expected))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            write_dataset_columns(self.dataset)
+        self.assertIsNotNone(load_columns(self.dataset.id))
+        self.assertEqual(b''.join(self.export()[1]), JSONRenderer().render(expected))
+
+    def test_ndjson_with_filters(self):
+        response, chunks = self.export({'format': 'ndjson', 'equipment_type': 'Valve', 'sort': '-flowrate'})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        self.assertTrue(response['Content-Disposition'].endswith('.ndjson"'))
+        lines = b''.join(chunks).decode().splitlines()
+        expected = self.expected(self.dataset.equipments.filter(equipment_type='Valve').order_by('-flowrate', '-id'))
+        self.assertEqual([json.loads(line) for line in lines], json.loads(JSONRenderer().render(expected)))
+
+    def test_empty_and_errors(self):
+        self.assertEqual(b''.join(self.export({'flowrate_min': 1000})[1]), b'[]')
+        self.assertEqual(b''.join(self.export({'format': 'ndjson', 'flowrate_min': 1000})[1]), b'')
+        response = self.client.get(self.url, {'sort': 'density'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('sort must be one of', response.json()['error'])
+        missing = self.client.get(reverse('export-dataset-equipment', args=[self.dataset.id + 1000]))
+        self.assertEqual(missing.status_code, 404)
+
+def parse_events(body):
+    """(id, event, data) of each Server-Sent Event message; comments and retry lines are skipped"""
+    events = []
+    for message in body.strip().split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in message.split('\n') if not line.startswith((':', 'retry')))
+        if fields:
+            events.append((fields.get('id'), fields['event'], json.loads(fields['data'])))
+    return events
+
+@override_settings(EQUIPMENT_EVENTS_STREAM_SECONDS=0)
+class EventStreamTests(EquipmentAPITransactionTestCase):
+    """Clients get the current state, then the events recorded since the last one they saw"""
+
+    def setUp(self):
+        super().setUp()
+        self.first = create_dataset('first', 10)
+        self.created = dataset_created(self.first)
+        self.second = create_dataset('second', 10)
+        dataset_created(self.second)
+        prune(RetentionPolicy(max_datasets=1))
+        self.token = Token.objects.create(user=self.user)
+
+    def stream(self, **headers):
+        response = self.client.get(reverse('events'), headers={'Accept': 'text/event-stream', **headers})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+        return parse_events(b''.join(response.streaming_content).decode())
+
+    def test_ready_then_replay(self):
+        version = DatasetEvent.objects.latest('id').id
+        ready = (None, 'ready', {'version': version, 'latest_dataset_id': self.second.id, 'running_jobs': []})
+        # A new client starts from the current state
+        self.assertEqual(self.stream(), [ready])
+
+        events = self.stream(**{'Last-Event-ID': str(self.created.id)})
+        self.assertEqual(events[0], ready)
+        self.assertEqual([(kind, data['version']) for _, kind, data in events[1:]],
+                         [('dataset-created', self.created.id + 1), ('dataset-pruned', version)])
+        self.assertEqual(events[1][2]['dataset_id'], self.second.id)
+        self.assertEqual(events[2][2]['dataset_ids'], [self.first.id])
+        self.assertEqual([event_id for event_id, _, _ in events[1:]], [str(self.created.id + 1), str(version)])
+
+        # An id from before a database reset is treated as current
+        self.assertEqual(self.stream(**{'Last-Event-ID': str(version + 50)}), [ready])
+        response = self.client.get(reverse('events'), {'last_event_id': 'abc'}, headers={'Accept': 'application/json'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_polls_new_events_and_job_progress(self):
+        stream = EventStream()
+        stream.open()
+        self.assertEqual(stream.poll(), [])
+
+        job = IngestJob.objects.create(file_name='big.csv', file_path='big.csv', bytes_total=1000, state='running')
+        job_changed(job)
+        write_progress(job.id, 250, 400)
+        events = parse_events(''.join(stream.poll()))
+        self.assertEqual([(kind, data['state']) for _, kind, data in events],
+                         [('job-progress', 'running'), ('job-progress', 'running')])
+        # Live row counts aren't stored, so they carry no id
+        self.assertIsNone(events[1][0])
+        self.assertEqual((events[1][2]['rows_processed'], events[1][2]['bytes_total']), (250, 1000))
+        self.assertEqual(stream.poll(), [])
+
+        IngestJob.objects.filter(id=job.id).update(state='succeeded', rows_processed=600)
+        job.refresh_from_db()
+        job_changed(job)
+        write_progress(job.id, 600, 1000)
+        events = parse_events(''.join(stream.poll()))
+        self.assertEqual([(kind, data['state']) for _, kind, data in events], [('job-progress', 'succeeded')])
+
+    @override_settings(EQUIPMENT_EVENTS_HEARTBEAT_SECONDS=0)
+    def test_heartbeat(self):
+        stream = EventStream()
+        stream.open()
+        self.assertEqual(stream.poll(), [': keep-alive\n\n'])
+
+    @override_settings(EQUIPMENT_EVENTS_KEPT=2)
+    def test_old_events_are_dropped(self):
+        dataset_created(create_dataset('third', 5))
+        self.assertEqual(DatasetEvent.objects.count(), 2)
+
+    async def test_async_stream(self):
+        request = AsyncRequestFactory().get(reverse('events'), headers={
+            'Authorization': f"Token {self.token.key}", 'Accept': 'text/event-stream',
+            'Last-Event-ID': str(self.created.id)})
+        response = await async_views.events(request)
+        self.assertTrue(response.is_async)
+        body = b''.join([chunk async for chunk in response.streaming_content]).decode()
+        self.assertEqual([kind for _, kind, _ in parse_events(body)], ['ready', 'dataset-created', 'dataset-pruned'])
+
+class AsyncViewTests(EquipmentAPITransactionTestCase):
+    """The coroutine views answer like the sync views they replace under ASGI"""
+
+    def setUp(self):
+        super().setUp()
+        self.dataset = create_dataset('async', 60)
+        self.token = Token.objects.create(user=self.user)
+
+    async def call(self, view, path, method='get', data=None, headers=None, **kwargs):
+        headers = {'Authorization': f"Token {self.token.key}", 'Accept': 'application/json', **(headers or {})}
+        request = getattr(AsyncRequestFactory(), method)(path, data, headers=headers)
+        response = await view(request, **kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+        return response
+
+    def sync_get(self, path, params, headers):
+        response = self.client.get(path, params, headers={'Accept': 'application/json', **headers})
+        return response.status_code, response.content, response.get('ETag')
+
+    async def assert_same(self, view, name, args=(), params=None, headers=None, **kwargs):
+        path = reverse(name, args=args)
+        response = await self.call(view, path, data=params, headers=headers, **kwargs)
+        expected = await sync_to_async(self.sync_get)(path, params or {}, headers or {})
+        self.assertEqual((response.status_code, response.content, response.get('ETag')), expected)
+        return response
+
+    async def test_reads_match_sync_views(self):
+        await self.assert_same(async_views.get_summary, 'get-summary')
+        await self.assert_same(async_views.get_equipment_types, 'get-equipment-types')
+        await self.assert_same(async_views.get_equipment_data, 'get-equipment',
+                               params={'equipment_type': 'Valve', 'sort': '-temperature'})
+        await self.assert_same(async_views.get_chart_data, 'get-chart-data', args=['histogram'],
+                               params={'parameter': 'pressure', 'bins': 5}, kind='histogram')
+        await self.assert_same(async_views.get_chart_data, 'get-dataset-chart-data',
+                               args=[self.dataset.id, 'series'], params={'parameter': 'flowrate', 'points': 10},
+                               kind='series', dataset_id=self.dataset.id)
+        await self.assert_same(async_views.get_history, 'get-history', params={'fields': 'id,name'})
+
+    async def test_errors_match_sync_views(self):
+        await self.assert_same(async_views.get_equipment_data, 'get-equipment', params={'sort': 'density'})
+        await self.assert_same(async_views.get_chart_data, 'get-chart-data', args=['pie'], kind='pie')
+        missing = self.dataset.id + 1000
+        await self.assert_same(async_views.get_chart_data, 'get-dataset-chart-data', args=[missing, 'series'],
+                               kind='series', dataset_id=missing)
+        await self.assert_same(async_views.get_history, 'get-history', params={'fields': 'colour'})
+        await EquipmentDataset.objects.all().adelete()
+        response = await self.assert_same(async_views.get_summary, 'get-summary')
+        self.assertEqual(response.status_code, 404)
+
+    async def test_not_modified(self):
+        response = await self.assert_same(async_views.get_summary, 'get-summary')
+        again = await self.assert_same(async_views.get_summary, 'get-summary',
+                                       headers={'If-None-Match': response['ETag']})
+        self.assertEqual(again.status_code, 304)
+
+    async def test_authentication(self):
+        path = reverse('get-summary')
+        for headers in [{'Authorization': 'Token not-a-token'}, {'Authorization': ''}]:
+            with self.subTest(headers=headers):
+                response = await self.call(async_views.get_summary, path, headers=headers)
+                self.assertEqual(response.status_code, 401)
+                self.assertEqual(response['WWW-Authenticate'], 'Token')
+        response = await self.call(async_views.get_summary, path, headers={
+            'Authorization': 'Basic ' + base64.b64encode(b'tester:tester-password').decode()})
+        self.assertEqual(response.status_code, 200)
+        response = await self.call(async_views.get_summary, path, method='post')
+        self.assertEqual(response.status_code, 405)
+
+    @override_settings(EQUIPMENT_ASYNC_UPLOADS=False)
+    async def test_upload(self):
+        content = ("Equipment Name,Type,Flowrate,Pressure,Temperature\n"
+                   + "".join(f"EQ-{i},{TYPES[i % 3]},{i},{i % 4},{300 + i}\n" for i in range(25))).encode()
+        with patch('equipment_api.views.schedule_prune'):
+            response = await self.call(async_views.upload_csv, reverse('upload-csv'), method='post',
+                                       data={'file': SimpleUploadedFile('async.csv', content), 'name': 'uploaded'})
+        self.assertEqual(response.status_code, 201)
+        data = json.loads(response.content)
+        self.assertEqual((data['name'], data['summary_stats']['total_count']), ('uploaded', 25))
+        self.assertEqual(await Equipment.objects.filter(dataset_id=data['id']).acount(), 25)
+
+@override_settings(EQUIPMENT_EXPORT_CHUNK_SIZE=7)
+class AsyncExportTests(EquipmentAPITransactionTestCase):
+    """The ASGI export streams an async iterator with the same bytes as the WSGI one"""
+
+    def setUp(self):
+        super().setUp()
+        self.dataset = create_dataset('export', 90)
+        self.token = Token.objects.create(user=self.user)
+
+    def export_request(self, dataset_id, **params):
+        return AsyncRequestFactory().get(f"/api/datasets/{dataset_id}/export/", params,
+                                         headers={'Authorization': f"Token {self.token.key}"})
+
+    async def async_export(self, dataset_id, **params):
+        response = await async_views.export_dataset_equipment(self.export_request(dataset_id, **params),
+                                                              dataset_id=dataset_id)
+        if not response.streaming:
+            return response, None
+        return response, [chunk async for chunk in response.streaming_content]
+
+    def sync_export(self, params):
+        response = self.client.get(reverse('export-dataset-equipment', args=[self.dataset.id]), params)
+        return response['Content-Type'], b''.join(response.streaming_content)
+
+    async def test_streams_same_bytes_as_sync_view(self):
+        for params in [{}, {'sort': '-flowrate'}, {'format': 'ndjson', 'equipment_type': 'Pump'}]:
+            with self.subTest(params=params):
+                response, chunks = await self.async_export(self.dataset.id, **params)
+                self.assertTrue(response.is_async)
+                # Sent chunk by chunk, not collected first
+                self.assertGreater(len(chunks), 3)
+                content_type, body = await sync_to_async(self.sync_export)(params)
+                self.assertEqual(b''.join(chunks), body)
+                self.assertEqual(response['Content-Type'], content_type)
+
+    async def test_errors_before_streaming(self):
+        response, _ = await self.async_export(self.dataset.id, flowrate_min='abc')
+        self.assertEqual(response.status_code, 400)
+        response, _ = await self.async_export(self.dataset.id + 1000)
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,24 @@
+import hashlib
+from django.core.files.uploadhandler import FileUploadHandler
+
+class HashingUploadHandler(FileUploadHandler):
+    """Compute each uploaded file's SHA-256 while the request body streams in.
+
+    Must come first in FILE_UPLOAD_HANDLERS; it passes every chunk through
+    unchanged so the regular memory/temporary-file handlers still store it.
+    Digests end up in request.upload_hashes keyed by form field name.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.digest = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.digest.update(raw_data)
+        return raw_data
+
+    def file_complete(self, file_size):
+        if not hasattr(self.request, 'upload_hashes'):
+            self.request.upload_hashes = {}
+        self.request.upload_hashes[self.field_name] = self.digest.hexdigest()
+        return None
@@ -0,0 +1,149 @@
+import hashlib
+import os
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import Max
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from .models import IngestJob, UploadChunk, UploadSession
+from .jobs import get_job_dir
+
+def get_default_chunk_size():
+    return getattr(settings, 'EQUIPMENT_UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024)
+
+def get_max_chunk_size():
+    return getattr(settings, 'EQUIPMENT_UPLOAD_MAX_CHUNK_SIZE', 64 * 1024 * 1024)
+
+def get_max_upload_size():
+    return getattr(settings, 'EQUIPMENT_UPLOAD_MAX_SIZE', 2 * 1024 * 1024 * 1024)
+
+def get_upload_expiry():
+    """How long an unfinished session may go without receiving a chunk"""
+    return timedelta(hours=getattr(settings, 'EQUIPMENT_UPLOAD_EXPIRY_HOURS', 24))
+
+def create_session(file_name, total_size, dataset_name, chunk_size=None, owner=None):
+    """Start a resumable upload and preallocate the target file"""
+    total_size = int(total_size)
+    chunk_size = int(chunk_size or get_default_chunk_size())
+    if not 0 < total_size <= get_max_upload_size():
+        raise ValueError(f"total_size must be between 1 and {get_max_upload_size()} bytes")
+    if not 0 < chunk_size <= get_max_chunk_size():
+        raise ValueError(f"chunk_size must be between 1 and {get_max_chunk_size()} bytes")
+
+    session = UploadSession(
+        file_name=file_name,
+        dataset_name=dataset_name,
+        total_size=total_size,
+        chunk_size=chunk_size,
+        owner=owner
+    )
+    session.file_path = os.path.join(get_job_dir(), f"{session.id}.part")
+    with open(session.file_path, 'wb') as f:
+        f.truncate(total_size)
+    session.save()
+    return session
+
+def get_session(upload_id, user):
+    """The user's upload session; raises UploadSession.DoesNotExist for anyone else's"""
+    return UploadSession.objects.get(id=upload_id, owner=user)
+
+def write_chunk(session, index, data, checksum):
+    """Verify a chunk against its SHA-256 checksum and write it at its byte offset"""
+    if session.completed_at is not None:
+        raise ValueError("Upload already completed")
+    if not 0 <= index < session.total_chunks:
+        raise ValueError(f"Chunk index must be between 0 and {session.total_chunks - 1}")
+    if len(data) != session.chunk_length(index):
+        raise ValueError(f"Chunk {index} must be {session.chunk_length(index)} bytes, got {len(data)}")
+    digest = hashlib.sha256(data).hexdigest()
+    if not checksum or digest != checksum.lower():
+        raise ValueError(f"Checksum mismatch for chunk {index}")
+
+    with open(session.file_path, 'r+b') as f:
+        f.seek(index * session.chunk_size)
+        f.write(data)
+
+    # Single-statement upsert: re-sending a chunk (e.g. after a timeout) simply overwrites it,
+    # and parallel chunk requests don't contend on a read-then-write transaction
+    UploadChunk.objects.bulk_create(
+        [UploadChunk(session=session, index=index, size=len(data), checksum=digest)],
+        update_conflicts=True,
+        unique_fields=['session', 'index'],
+        update_fields=['size', 'checksum', 'received_at']
+    )
+
+def received_chunks(session):
+    return list(session.chunks.order_by('index').values_list('index', flat=True))
+
+def session_status(session):
+    if session.completed_at is not None:
+        received = list(range(session.total_chunks))
+    else:
+        received = received_chunks(session)
+    received_set = set(received)
+    return {
+        'upload_id': str(session.id),
+        'file_name': session.file_name,
+        'total_size': session.total_size,
+        'chunk_size': session.chunk_size,
+        'total_chunks': session.total_chunks,
+        'received': received,
+        'missing': [index for index in range(session.total_chunks) if index not in received_set],
+        'completed': session.completed_at is not None,
+        'job_id': str(session.job_id) if session.job_id else None,
+    }
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def complete_session(session, checksum=None):
+    """Check that every chunk arrived (and the optional whole-file checksum) before ingest
+
+    Returns the SHA-256 of the assembled file.
+    """
+    if session.completed_at is not None:
+        raise ValueError("Upload already completed")
+    missing = session_status(session)['missing']
+    if missing:
+        raise ValueError(f"Upload incomplete, missing chunks: {missing[:20]}")
+    content_hash = file_sha256(session.file_path)
+    if checksum and content_hash != checksum.lower():
+        raise ValueError("Checksum mismatch for assembled file")
+    session.completed_at = timezone.now()
+    session.save(update_fields=['completed_at'])
+    session.chunks.all().delete()
+    return content_hash
+
+def expire_sessions(dry_run=False):
+    """Delete sessions idle longer than the expiry and partial files no session or job still needs
+
+    An unfinished session's file goes with it; a completed one's belongs to its
+    job (or was already removed). Returns the ids of the unfinished sessions.
+    """
+    cutoff = timezone.now() - get_upload_expiry()
+    expired = list(
+        UploadSession.objects.filter(completed_at__isnull=True)
+        .annotate(last_activity=Coalesce(Max('chunks__received_at'), 'created_at'))
+        .filter(last_activity__lt=cutoff)
+    )
+    if dry_run:
+        return [str(session.id) for session in expired]
+    for session in expired:
+        if os.path.exists(session.file_path):
+            os.remove(session.file_path)
+    UploadSession.objects.filter(id__in=[session.id for session in expired]).delete()
+    UploadSession.objects.filter(completed_at__lt=cutoff).delete()
+
+    # Files whose session row is gone (e.g. the database was reset); only old ones,
+    # so a session being created right now keeps its file
+    needed = set(UploadSession.objects.values_list('file_path', flat=True))
+    needed.update(IngestJob.objects.filter(state__in=['queued', 'running']).values_list('file_path', flat=True))
+    for entry in os.scandir(get_job_dir()):
+        if (entry.name.endswith('.part') and entry.path not in needed
+                and entry.stat().st_mtime < cutoff.timestamp()):
+            os.remove(entry.path)
+    return [str(session.id) for session in expired]
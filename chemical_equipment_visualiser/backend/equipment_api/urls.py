@@ -1,12 +1,34 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
+# Under ASGI the read endpoints and uploads run as coroutines (see async_views)
+if getattr(settings, 'EQUIPMENT_ASYNC_VIEWS', False):
+    from . import async_views as endpoint_views
+else:
+    endpoint_views = views
+
 urlpatterns = [
-    path('upload/', views.upload_csv, name='upload-csv'),
-    path('summary/', views.get_summary, name='get-summary'),
-    path('equipment/', views.get_equipment_data, name='get-equipment'),
-    path('equipment-types/', views.get_equipment_types, name='get-equipment-types'),
-    path('history/', views.get_history, name='get-history'),
+    path('auth/login/', views.login, name='login'),
+    path('auth/logout/', views.logout, name='logout'),
+    path('upload/', endpoint_views.upload_csv, name='upload-csv'),
+    path('uploads/', views.create_upload, name='create-upload'),
+    path('uploads/<uuid:upload_id>/', views.get_upload, name='get-upload'),
+    path('uploads/<uuid:upload_id>/chunks/<int:index>/', views.upload_chunk, name='upload-chunk'),
+    path('uploads/<uuid:upload_id>/complete/', views.complete_upload, name='complete-upload'),
+    path('jobs/<uuid:job_id>/', views.get_job, name='get-job'),
+    path('summary/', endpoint_views.get_summary, name='get-summary'),
+    path('equipment/', endpoint_views.get_equipment_data, name='get-equipment'),
+    path('equipment-types/', endpoint_views.get_equipment_types, name='get-equipment-types'),
+    path('charts/<str:kind>/', endpoint_views.get_chart_data, name='get-chart-data'),
+    path('history/', endpoint_views.get_history, name='get-history'),
     path('history/<int:dataset_id>/', views.get_dataset_detail, name='get-dataset-detail'),
-    path('generate-pdf/', views.generate_pdf, name='generate-pdf'),
+    path('batch/', views.batch, name='batch'),
+    path('events/', endpoint_views.events, name='events'),
+    path('compare/', views.compare_datasets, name='compare-datasets'),
+    path('datasets/<int:dataset_id>/equipment/', views.get_dataset_equipment, name='get-dataset-equipment'),
+    path('datasets/<int:dataset_id>/by-type/', views.get_dataset_by_type, name='get-dataset-by-type'),
+    path('datasets/<int:dataset_id>/export/', endpoint_views.export_dataset_equipment, name='export-dataset-equipment'),
+    path('datasets/<int:dataset_id>/charts/<str:kind>/', endpoint_views.get_chart_data, name='get-dataset-chart-data'),
+    path('generate-pdf/', endpoint_views.generate_pdf, name='generate-pdf'),
 ]
\ No newline at end of file
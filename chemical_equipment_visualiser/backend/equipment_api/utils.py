@@ -1,85 +1,244 @@
 import csv
+import hashlib
+import io
 import json
+import os
 from io import TextIOWrapper
+from itertools import islice
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.utils import timezone
 from .models import Equipment, EquipmentDataset
+from .stats import DatasetStats
+from .analytics import QuantileBuilder, add_quantiles, chunk_stats, encode_rows
+from .columnar import ColumnarWriter
+from .events import dataset_created
+from .aggregates import store_type_aggregates
+from .sqlite import ingest_lock, ingest_lock_shared
+from .retention import delete_abandoned_datasets, delete_hidden_datasets
+from .compression import compression_for, open_decompressed
+from .parallel import has_quotes, iter_parsed_ranges
+from .parsing import iter_parsed_chunks, validate_fieldnames
 
-def analyze_equipment_data(data):
-    """Perform analytics on equipment data and return summary statistics"""
-    
-    flowrates = [float(row['Flowrate']) for row in data]
-    pressures = [float(row['Pressure']) for row in data]
-    temperatures = [float(row['Temperature']) for row in data]
-    types = [row['Type'] for row in data]
-    
-    # Calculate type distribution
-    type_distribution = {}
-    for eq_type in types:
-        type_distribution[eq_type] = type_distribution.get(eq_type, 0) + 1
-    
-    # Calculate statistics manually
-    def calculate_stats(values):
-        mean = sum(values) / len(values)
-        variance = sum((x - mean) ** 2 for x in values) / len(values)
-        std_dev = variance ** 0.5
-        return {
-            'mean': mean,
-            'min': min(values),
-            'max': max(values),
-            'std': std_dev
-        }
-    
-    summary = {
-        'total_count': len(data),
-        'equipment_type_distribution': type_distribution,
-        'parameter_stats': {
-            'flowrate': calculate_stats(flowrates),
-            'pressure': calculate_stats(pressures),
-            'temperature': calculate_stats(temperatures)
-        }
-    }
-    
-    return summary
-
-def process_csv_file(file, dataset_name="Uploaded Dataset"):
-    """Process uploaded CSV file and store in database"""
-    
-    # Read CSV file using built-in csv module
-    csv_reader = csv.DictReader(TextIOWrapper(file, encoding='utf-8'))
-    data = list(csv_reader)
-    
-    # Validate required columns
-    required_columns = ['Equipment Name', 'Type', 'Flowrate', 'Pressure', 'Temperature']
-    if not all(col in data[0].keys() for col in required_columns):
-        raise ValueError("CSV file missing required columns")
-    
-    # Perform analysis
-    summary_stats = analyze_equipment_data(data)
-    
-    # Create dataset record
-    dataset = EquipmentDataset.objects.create(
-        name=dataset_name,
-        file_name=file.name,
-        summary_stats=summary_stats
-    )
-    
-    # Create equipment records
-    equipment_objects = []
-    for row in data:
-        equipment_objects.append(Equipment(
+def get_batch_size():
+    """Number of rows parsed and inserted per chunk during ingest"""
+    return getattr(settings, 'EQUIPMENT_INGEST_BATCH_SIZE', 5000)
+
+def extended_stats_enabled():
+    """Whether ingest also computes percentiles (streaming sketches, memory independent of row count)"""
+    return getattr(settings, 'EQUIPMENT_EXTENDED_STATS', True)
+
+class HashingReader(io.RawIOBase):
+    """Read-through wrapper that hashes and counts the bytes consumed from a file"""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.digest = hashlib.sha256()
+        self.position = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self.raw.read(len(buffer))
+        size = len(data)
+        buffer[:size] = data
+        self.digest.update(data)
+        self.position += size
+        return size
+
+    def tell(self):
+        return self.position
+
+    def hexdigest(self):
+        return self.digest.hexdigest()
+
+def hash_file(file):
+    """SHA-256 of an uploaded or opened file, read in chunks"""
+    digest = hashlib.sha256()
+    if hasattr(file, 'chunks'):
+        for chunk in file.chunks():
+            digest.update(chunk)
+    else:
+        file.seek(0)
+        for block in iter(lambda: file.read(1024 * 1024), b''):
+            digest.update(block)
+    file.seek(0)
+    return digest.hexdigest()
+
+def find_duplicate(content_hash):
+    """Most recent dataset ingested from byte-identical content, if any"""
+    if not content_hash:
+        return None
+    return EquipmentDataset.objects.filter(content_hash=content_hash).order_by('-uploaded_at').first()
+
+def make_latest(dataset):
+    """Re-upload of identical content: bump an existing dataset to latest, as ingesting it again would"""
+    with transaction.atomic():
+        dataset.uploaded_at = timezone.now()
+        dataset.save(update_fields=['uploaded_at'])
+        # Clients and retention see it like a fresh upload
+        dataset_created(dataset)
+    return dataset
+
+def open_csv_reader(file, codec=None):
+    """Wrap an uploaded file (in memory or spooled to disk) in a hashing CSV reader
+
+    The hash and byte position cover the bytes as uploaded; compressed files are
+    decompressed as a stream behind the hashing layer.
+    """
+    raw = getattr(file, 'file', file)
+    if hasattr(raw, 'seek'):
+        raw.seek(0)
+    source = HashingReader(raw)
+    stream = open_decompressed(source, codec) if codec else io.BufferedReader(source)
+    text = TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    return source, text, csv.DictReader(text)
+
+def get_parse_workers():
+    """Processes used to parse large files in parallel; 0 or 1 parses in the request/job process"""
+    return getattr(settings, 'EQUIPMENT_PARSE_WORKERS', 0)
+
+def parallel_source_path(file):
+    """Path of a file on disk large enough to be worth parsing in parallel and safe to split, else None"""
+    if get_parse_workers() < 2:
+        return None
+    if hasattr(file, 'temporary_file_path'):
+        path = file.temporary_file_path()
+    elif hasattr(file, 'fileno') and os.path.isabs(getattr(file, 'name', '')):
+        path = file.name
+    else:
+        return None
+    min_bytes = getattr(settings, 'EQUIPMENT_PARALLEL_MIN_BYTES', 32 * 1024 * 1024)
+    if os.path.getsize(path) < min_bytes:
+        return None
+    # Ranges split on raw newlines, which would cut a quoted field that spans lines
+    return None if has_quotes(path) else path
+
+def store_rows(dataset, rows, batch_size):
+    """Insert rows as Equipment records and return their primary keys"""
+    objects = Equipment.objects.bulk_create([
+        Equipment(
             dataset=dataset,
-            equipment_name=row['Equipment Name'],
-            equipment_type=row['Type'],
-            flowrate=float(row['Flowrate']),
-            pressure=float(row['Pressure']),
-            temperature=float(row['Temperature'])
-        ))
-    
-    Equipment.objects.bulk_create(equipment_objects)
-    
-    # Enforce 5 dataset limit
-    datasets = EquipmentDataset.objects.all().order_by('-uploaded_at')
-    if len(datasets) > 5:
-        for old_dataset in datasets[5:]:
-            old_dataset.delete()
-    
-    return dataset
\ No newline at end of file
+            equipment_name=name,
+            equipment_type=eq_type,
+            flowrate=flowrate,
+            pressure=pressure,
+            temperature=temperature
+        )
+        for name, eq_type, flowrate, pressure, temperature in rows
+    ], batch_size=batch_size)
+    return [obj.pk for obj in objects]
+
+def ingest_serial(file, dataset, batch_size, quantiles, writer, progress, codec=None):
+    """Parse and store rows in this process; returns (stats, sha256 of the bytes read)"""
+    source, text, csv_reader = open_csv_reader(file, codec)
+    try:
+        validate_fieldnames(csv_reader.fieldnames)
+        stats = DatasetStats()
+        # Create equipment records chunk by chunk so memory stays bounded
+        for chunk in iter_parsed_chunks(csv_reader, batch_size):
+            columns = encode_rows(chunk)
+            stats.merge(chunk_stats(*columns))
+            if quantiles is not None:
+                quantiles.add_columns(*columns)
+            ids = store_rows(dataset, chunk, batch_size)
+            if writer is not None:
+                writer.append(ids, [row[0] for row in chunk], *columns)
+            if progress is not None:
+                progress(stats.count, source.tell())
+        return stats, source.hexdigest()
+    finally:
+        # Closing stops at the hashing layer, leaving the uploaded file open for Django to clean up
+        text.close()
+
+def ingest_parallel(path, dataset, batch_size, quantiles, writer, progress):
+    """Parse byte ranges in a process pool and store them in file order; returns stats"""
+    stats = DatasetStats()
+    line = 2
+    for parsed in iter_parsed_ranges(path, get_parse_workers()):
+        if parsed.error is not None:
+            reason, local_line = parsed.error
+            raise ValueError(f"{reason} on line {line + local_line - 1}")
+        stats.merge(parsed.stats)
+        if quantiles is not None:
+            quantiles.add_columns(parsed.type_names, parsed.type_codes, parsed.values)
+        rows = parsed.rows()
+        ids = []
+        while True:
+            chunk = list(islice(rows, batch_size))
+            if not chunk:
+                break
+            ids.extend(store_rows(dataset, chunk, batch_size))
+        if writer is not None:
+            writer.append(ids, parsed.names, parsed.type_names, parsed.type_codes, parsed.values)
+        line += parsed.row_count
+        if progress is not None:
+            progress(stats.count, parsed.end)
+    return stats
+
+def process_csv_file(file, dataset_name="Uploaded Dataset", file_name=None, progress=None, content_hash=None):
+    """Process uploaded CSV file and store in database
+
+    progress, if given, is called as progress(rows_processed, bytes_read) after each chunk.
+    content_hash is computed while streaming when not supplied.
+    """
+
+    batch_size = get_batch_size()
+    file_name = file_name or file.name
+    codec = compression_for(file_name)
+    # Compressed streams can't be split into byte ranges
+    parallel_path = None if codec else parallel_source_path(file)
+    if parallel_path and not content_hash:
+        content_hash = hash_file(file)
+
+    quantiles = QuantileBuilder() if extended_stats_enabled() else None
+    # SQLite takes one writer at a time: queue behind other ingests rather than interleave with them
+    with ingest_lock():
+        if ingest_lock_shared():
+            # No other ingest can be running, so hidden datasets are leftovers of one that died
+            delete_abandoned_datasets()
+
+        # Hidden until it's complete, so each chunk of rows commits on its own and
+        # other writers get the write lock in between instead of waiting out the whole file
+        dataset = EquipmentDataset.all_objects.create(
+            name=dataset_name,
+            file_name=file_name,
+            ready=False
+        )
+
+        writer = ColumnarWriter.open(dataset.id)
+        try:
+            if parallel_path:
+                stats = ingest_parallel(parallel_path, dataset, batch_size, quantiles, writer, progress)
+            else:
+                stats, digest = ingest_serial(file, dataset, batch_size, quantiles, writer, progress, codec)
+                content_hash = content_hash or digest
+
+            if stats.count == 0:
+                raise ValueError("CSV file contains no data rows")
+        except Exception:
+            if writer is not None:
+                writer.discard()
+            try:
+                delete_hidden_datasets([dataset.id])
+            except DatabaseError:
+                # Still hidden; the next ingest deletes it
+                pass
+            raise
+
+        dataset.summary_stats = stats.summary()
+        dataset.content_hash = content_hash
+        if quantiles is not None:
+            add_quantiles(dataset.summary_stats, quantiles)
+        with transaction.atomic():
+            # Latest by the time it became visible
+            dataset.uploaded_at = timezone.now()
+            dataset.ready = True
+            dataset.save(update_fields=['summary_stats', 'content_hash', 'uploaded_at', 'ready'])
+            store_type_aggregates(dataset, stats)
+            if writer is not None:
+                writer.finish()
+            dataset_created(dataset)
+
+    return dataset
@@ -1,62 +1,332 @@
 from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.decorators import (api_view, authentication_classes, parser_classes, permission_classes,
+                                       renderer_classes)
+from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
-from django.http import HttpResponse
-from .models import Equipment, EquipmentDataset
-from .serializers import EquipmentSerializer, EquipmentDatasetSerializer
-from .utils import process_csv_file
+from rest_framework.utils.urls import replace_query_param
+from django.contrib.auth import authenticate
+from django.db import transaction
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from django.urls import reverse
+from .models import Equipment, EquipmentDataset, IngestJob, UploadSession
+from .authentication import issue_token, revoke_tokens
+from .serializers import EquipmentDatasetSummarySerializer
+from .utils import process_csv_file, hash_file, find_duplicate, make_latest
+from .jobs import async_uploads_enabled, enqueue_file, submit_upload, job_status
+from .parsers import ChunkParser
+from .compression import is_csv_upload, supported_suffixes
+from .columnar import EquipmentBlock, dataset_columns, load_columns
+from .charts import chart_data
+from .aggregates import by_type_data
+from .compare import compare_datasets as compare_dataset_history, parse_ids, parse_limit
+from .batch import DATASET_TYPES, batch_key, parse_batch, run_batch
+from .renderers import EventStreamRenderer, NDJSONRenderer, equipment_payload, equipment_renderers, json_renderers
+from .streaming import get_export_chunk_size, iter_blocks, stream_json, stream_ndjson
+from .retention import schedule_prune
+from .events import EventStream, parse_last_event_id
+from .cache import cached_response
+from .pagination import EQUIPMENT_FIELDS, page_queryset, paginate_equipment
+from .filters import filter_equipment, get_sort, has_filters, sort_equipment
+from .uploads import create_session, get_session, write_chunk, session_status, complete_session
+import os
 from .pdf_generator import generate_pdf_report
 import json
 
+DATASET_FIELDS = list(EquipmentDatasetSummarySerializer.Meta.fields)
+
+def equipment_block(dataset):
+    """All equipment rows of a dataset as an EquipmentBlock"""
+    columns = load_columns(dataset.id)
+    if columns is not None:
+        return columns.block()
+    return EquipmentBlock.from_rows(list(dataset.equipments.order_by('id').values_list(*EQUIPMENT_FIELDS)))
+
+def dataset_data(dataset):
+    """Same output as EquipmentDatasetSerializer without instantiating an Equipment per row"""
+    data = EquipmentDatasetSummarySerializer(dataset).data
+    data['equipments'] = equipment_block(dataset)
+    return data
+
+def parse_sparse_fields(params):
+    """Dataset fields from ?fields=id,name,... and whether ?include=equipments asked for rows"""
+    include = [name for name in params.get('include', '').split(',') if name]
+    fields = None
+    if params.get('fields'):
+        fields = [name for name in params['fields'].split(',') if name]
+        if 'equipments' in fields:
+            fields.remove('equipments')
+            include.append('equipments')
+        unknown = set(fields) - set(DATASET_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}; choose from {', '.join(DATASET_FIELDS)}")
+    if set(include) - {'equipments'}:
+        raise ValueError("include only accepts: equipments")
+    return fields, 'equipments' in include
+
+def sparse_dataset_data(request, dataset, fields, include_equipments, params):
+    """Summary fields of a dataset, plus one page of its equipment when requested"""
+    data = EquipmentDatasetSummarySerializer(dataset, fields=fields).data
+    if include_equipments:
+        page = paginate_equipment(dataset, params)
+        data['equipments'] = page['results']
+        data['equipments_next'] = None
+        if page['next_cursor']:
+            next_params = params.copy()
+            for name in ('fields', 'include'):
+                next_params.pop(name, None)
+            next_params['cursor'] = page['next_cursor']
+            url = request.build_absolute_uri(reverse('get-dataset-equipment', args=[dataset.id]))
+            data['equipments_next'] = f"{url}?{next_params.urlencode()}"
+    return data
+
+def filtered_equipment_block(dataset, params):
+    """All of a dataset's equipment rows, filtered and sorted when params ask for it"""
+    if has_filters(params) or params.get('sort'):
+        field, descending = get_sort(params)
+        equipment = sort_equipment(filter_equipment(dataset.equipments.all(), params), field, descending)
+        return EquipmentBlock.from_rows(list(equipment.values_list(*EQUIPMENT_FIELDS)))
+    return equipment_block(dataset)
+
+def equipment_page_data(request, dataset, params):
+    """One page of a dataset's equipment with a link to the next, as /api/datasets/<id>/equipment/ returns it"""
+    page = paginate_equipment(dataset, params)
+    page['next'] = None
+    if page['next_cursor']:
+        next_params = params.copy()
+        next_params['cursor'] = page['next_cursor']
+        url = request.build_absolute_uri(reverse('get-dataset-equipment', args=[dataset.id]))
+        page['next'] = f"{url}?{next_params.urlencode()}"
+    return page
+
+def history_data(request, params):
+    """Summaries of the last 5 datasets, newest first, each with its first equipment page when asked"""
+    fields, include_equipments = parse_sparse_fields(params)
+    # Each dataset starts from its first page of equipment
+    params = params.copy()
+    params.pop('cursor', None)
+    datasets = EquipmentDataset.objects.order_by('-uploaded_at')
+    if fields is not None:
+        datasets = datasets.only(*fields)
+    return [
+        sparse_dataset_data(request, dataset, fields, include_equipments, params)
+        for dataset in datasets[:5]
+    ]
+
+def dataset_refs():
+    """Datasets, newest first, with just the fields that identify their cached responses"""
+    return EquipmentDataset.objects.order_by('-uploaded_at').only('id', 'content_hash')
+
+def latest_dataset_ref():
+    return dataset_refs().first()
+
+def deduplicated_response(dataset):
+    """Response for an upload whose content matches an existing dataset, which becomes the latest"""
+    data = EquipmentDatasetSummarySerializer(make_latest(dataset)).data
+    data['deduplicated'] = True
+    return Response(data, status=status.HTTP_200_OK)
+
+def csv_suffix_error():
+    return f"File must be a CSV ({', '.join(supported_suffixes())})"
+
+@api_view(['POST'])
+@authentication_classes([])
+@permission_classes([AllowAny])
+@renderer_classes(json_renderers())
+def login(request):
+    """Exchange a username and password for an API token; send it as "Authorization: Token <key>" """
+    username = request.data.get('username')
+    password = request.data.get('password')
+    if not username or not password:
+        return Response({'error': 'username and password are required'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    # The only request that pays for the password hash
+    user = authenticate(request, username=username, password=password)
+    if user is None:
+        return Response({'error': 'Invalid username or password'}, status=status.HTTP_401_UNAUTHORIZED)
+    
+    token = issue_token(user)
+    return Response({'token': token.key, 'username': user.get_username()})
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
+@renderer_classes(json_renderers())
+def logout(request):
+    """Revoke the user's API token"""
+    revoke_tokens(request.user)
+    return Response(status=status.HTTP_204_NO_CONTENT)
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@renderer_classes(json_renderers())
 def upload_csv(request):
     """Handle CSV file upload and processing"""
+    return handle_upload(request)
+
+def handle_upload(request):
+    """Upload a CSV from a DRF request: dedupe, then queue it as a job or ingest it now"""
     try:
         if 'file' not in request.FILES:
             return Response({'error': 'No file provided'}, status=status.HTTP_400_BAD_REQUEST)
         
         file = request.FILES['file']
-        if not file.name.endswith('.csv'):
-            return Response({'error': 'File must be a CSV'}, status=status.HTTP_400_BAD_REQUEST)
+        if not is_csv_upload(file.name):
+            return Response({'error': csv_suffix_error()}, status=status.HTTP_400_BAD_REQUEST)
         
         dataset_name = request.data.get('name', 'Uploaded Dataset')
-        dataset = process_csv_file(file, dataset_name)
         
-        serializer = EquipmentDatasetSerializer(dataset)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        # Identical content was already ingested: return that dataset instead
+        upload_hashes = getattr(request._request, 'upload_hashes', {})
+        content_hash = upload_hashes.get('file') or hash_file(file)
+        duplicate = find_duplicate(content_hash)
+        if duplicate:
+            return deduplicated_response(duplicate)
+        
+        if async_uploads_enabled():
+            # Hand the file to the worker pool and let the client poll the job
+            job = submit_upload(file, dataset_name, content_hash)
+            data = job_status(job)
+            data['status_url'] = request.build_absolute_uri(reverse('get-job', args=[job.id]))
+            return Response(data, status=status.HTTP_202_ACCEPTED)
+        
+        dataset = process_csv_file(file, dataset_name, content_hash=content_hash)
+        schedule_prune()
+        
+        return Response(dataset_data(dataset), status=status.HTTP_201_CREATED)
+        
+    except Exception as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def create_upload(request):
+    """Start a resumable chunked upload"""
+    try:
+        file_name = request.data.get('file_name', '')
+        if not is_csv_upload(file_name):
+            return Response({'error': csv_suffix_error()}, status=status.HTTP_400_BAD_REQUEST)
+        if 'total_size' not in request.data:
+            return Response({'error': 'total_size is required'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        session = create_session(
+            file_name,
+            request.data['total_size'],
+            request.data.get('name', 'Uploaded Dataset'),
+            request.data.get('chunk_size'),
+            owner=request.user
+        )
+        return Response(session_status(session), status=status.HTTP_201_CREATED)
+        
+    except (TypeError, ValueError) as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_upload(request, upload_id):
+    """Get which chunks of a resumable upload have been received"""
+    try:
+        session = get_session(upload_id, request.user)
+    except UploadSession.DoesNotExist:
+        return Response({'error': 'Upload not found'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(session_status(session))
+
+@api_view(['PUT'])
+@permission_classes([IsAuthenticated])
+@parser_classes([ChunkParser])
+def upload_chunk(request, upload_id, index):
+    """Store one numbered chunk; the X-Chunk-Checksum header carries its SHA-256"""
+    try:
+        session = get_session(upload_id, request.user)
+    except UploadSession.DoesNotExist:
+        return Response({'error': 'Upload not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    try:
+        write_chunk(session, index, request.data, request.headers.get('X-Chunk-Checksum'))
+        return Response({'upload_id': str(session.id), 'index': index, 'received': True})
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@renderer_classes(json_renderers())
+def complete_upload(request, upload_id):
+    """Assemble a finished chunked upload and ingest it like a regular upload"""
+    try:
+        session = get_session(upload_id, request.user)
+    except UploadSession.DoesNotExist:
+        return Response({'error': 'Upload not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    try:
+        content_hash = complete_session(session, request.data.get('checksum'))
+        
+        duplicate = find_duplicate(content_hash)
+        if duplicate:
+            os.remove(session.file_path)
+            return deduplicated_response(duplicate)
+        
+        if async_uploads_enabled():
+            job = enqueue_file(session.file_path, session.file_name, session.dataset_name,
+                               session.total_size, content_hash)
+            session.job = job
+            session.save(update_fields=['job'])
+            data = job_status(job)
+            data['status_url'] = request.build_absolute_uri(reverse('get-job', args=[job.id]))
+            return Response(data, status=status.HTTP_202_ACCEPTED)
+        
+        try:
+            with open(session.file_path, 'rb') as f:
+                dataset = process_csv_file(f, session.dataset_name, file_name=session.file_name,
+                                           content_hash=content_hash)
+        finally:
+            os.remove(session.file_path)
+        schedule_prune()
+        return Response(dataset_data(dataset), status=status.HTTP_201_CREATED)
         
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_job(request, job_id):
+    """Get state, progress and throughput of a background ingestion job"""
+    try:
+        job = IngestJob.objects.get(id=job_id)
+    except IngestJob.DoesNotExist:
+        return Response({'error': 'Job not found'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(job_status(job))
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_summary(request):
     """Get summary statistics from the latest dataset"""
     try:
-        latest_dataset = EquipmentDataset.objects.order_by('-uploaded_at').first()
+        latest_dataset = latest_dataset_ref()
         if not latest_dataset:
             return Response({'error': 'No data available'}, status=status.HTTP_404_NOT_FOUND)
         
-        return Response(latest_dataset.summary_stats)
+        return cached_response(request, 'summary', latest_dataset, lambda dataset: dataset.summary_stats)
         
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@renderer_classes(equipment_renderers())
 def get_equipment_data(request):
-    """Get all equipment data from the latest dataset"""
+    """Get all equipment data from the latest dataset, optionally filtered and sorted"""
     try:
-        latest_dataset = EquipmentDataset.objects.order_by('-uploaded_at').first()
+        latest_dataset = latest_dataset_ref()
         if not latest_dataset:
             return Response({'error': 'No data available'}, status=status.HTTP_404_NOT_FOUND)
         
-        equipment = latest_dataset.equipments.all()
-        serializer = EquipmentSerializer(equipment, many=True)
-        return Response(serializer.data)
+        return cached_response(
+            request, 'equipment', latest_dataset,
+            lambda dataset: equipment_payload(filtered_equipment_block(dataset, request.query_params), request)
+        )
         
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -65,34 +335,247 @@ def get_equipment_data(request):
 def get_equipment_types(request):
     """Get equipment type distribution"""
     try:
-        latest_dataset = EquipmentDataset.objects.order_by('-uploaded_at').first()
+        latest_dataset = latest_dataset_ref()
         if not latest_dataset:
             return Response({'error': 'No data available'}, status=status.HTTP_404_NOT_FOUND)
         
-        distribution = latest_dataset.summary_stats.get('equipment_type_distribution', {})
-        return Response(distribution)
+        return cached_response(
+            request, 'equipment-types', latest_dataset,
+            lambda dataset: dataset.summary_stats.get('equipment_type_distribution', {})
+        )
+        
+    except Exception as e:
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_chart_data(request, kind, dataset_id=None):
+    """Display-sized chart data (histogram, histogram2d or series) for the latest or a given dataset"""
+    try:
+        if dataset_id is None:
+            dataset = latest_dataset_ref()
+            if not dataset:
+                return Response({'error': 'No data available'}, status=status.HTTP_404_NOT_FOUND)
+        else:
+            dataset = EquipmentDataset.objects.only('id', 'content_hash').filter(id=dataset_id).first()
+            if not dataset:
+                return Response({'error': 'Dataset not found'}, status=status.HTTP_404_NOT_FOUND)
+        
+        return cached_response(
+            request, f'chart-{kind}', dataset,
+            lambda dataset: chart_data(kind, dataset_columns(dataset), request.query_params)
+        )
         
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@renderer_classes(json_renderers())
 def get_history(request):
-    """Get upload history (last 5 datasets)"""
-    datasets = EquipmentDataset.objects.all().order_by('-uploaded_at')[:5]
-    serializer = EquipmentDatasetSerializer(datasets, many=True)
-    return Response(serializer.data)
+    """Get upload history (last 5 datasets), summaries only unless ?include=equipments"""
+    try:
+        return Response(history_data(request, request.query_params))
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@renderer_classes(json_renderers())
 def get_dataset_detail(request, dataset_id):
-    """Get specific dataset details"""
+    """Get specific dataset details; ?include=equipments adds the first page of its equipment"""
+    try:
+        fields, include_equipments = parse_sparse_fields(request.query_params)
+        datasets = EquipmentDataset.objects.all() if fields is None else EquipmentDataset.objects.only(*fields)
+        dataset = datasets.get(id=dataset_id)
+        return Response(sparse_dataset_data(request, dataset, fields, include_equipments, request.query_params))
+    except EquipmentDataset.DoesNotExist:
+        return Response({'error': 'Dataset not found'}, status=status.HTTP_404_NOT_FOUND)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+BATCH_HANDLERS = {
+    'summary': lambda request, dataset, params: dataset.summary_stats,
+    'types': lambda request, dataset, params: dataset.summary_stats.get('equipment_type_distribution', {}),
+    'equipment': lambda request, dataset, params: filtered_equipment_block(dataset, params),
+    'equipment_page': equipment_page_data,
+    'dataset': lambda request, dataset, params: sparse_dataset_data(
+        request, dataset, *parse_sparse_fields(params), params
+    ),
+    'history': lambda request, dataset, params: history_data(request, params),
+    'by_type': lambda request, dataset, params: by_type_data(dataset, params),
+}
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@renderer_classes(json_renderers())
+def batch(request):
+    """Run several read sub-requests against one dataset snapshot and return all results together"""
+    try:
+        dataset_id, subrequests = parse_batch(request.data)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        # One read transaction: every sub-request sees the same datasets
+        with transaction.atomic():
+            if dataset_id is None:
+                snapshot = EquipmentDataset.objects.order_by('-uploaded_at').first()
+            else:
+                snapshot = EquipmentDataset.objects.filter(id=dataset_id).first()
+                if snapshot is None:
+                    return Response({'error': 'Dataset not found'}, status=status.HTTP_404_NOT_FOUND)
+            named = {
+                other_id for _, kind, other_id, _ in subrequests
+                if kind in DATASET_TYPES and other_id is not None
+            }
+            datasets = EquipmentDataset.objects.in_bulk(named) if named else {}
+            
+            def build(snapshot):
+                return {
+                    'dataset_id': snapshot.id if snapshot else None,
+                    'results': run_batch(request, subrequests, snapshot, datasets, BATCH_HANDLERS),
+                }
+            
+            if snapshot is None:
+                return Response(build(None))
+            # Other named datasets are in the key; uploads and retention bump its generation
+            return cached_response(request, 'batch', snapshot, build, batch_key(subrequests))
+        
+    except Exception as e:
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@renderer_classes(json_renderers())
+def compare_datasets(request):
+    """Compare ?ids=1,2,3 in order: statistic and type deltas plus equipment added, removed or changed by name"""
+    try:
+        ids = parse_ids(request.query_params.get('ids'))
+        limit = parse_limit(request.query_params)
+        found = EquipmentDataset.objects.in_bulk(ids)
+        missing = [dataset_id for dataset_id in ids if dataset_id not in found]
+        if missing:
+            return Response(
+                {'error': f"Dataset not found: {', '.join(map(str, missing))}"}, status=status.HTTP_404_NOT_FOUND
+            )
+        datasets = [found[dataset_id] for dataset_id in ids]
+        
+        # Keyed on the last dataset; the ids are in the query string and uploads/retention bump the generation
+        return cached_response(
+            request, 'compare', datasets[-1], lambda dataset: compare_dataset_history(datasets, limit)
+        )
+        
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@renderer_classes(equipment_renderers())
+def get_dataset_equipment(request, dataset_id):
+    """Get one page of a dataset's equipment ordered by id; follow next_cursor for the rest"""
     try:
         dataset = EquipmentDataset.objects.get(id=dataset_id)
-        serializer = EquipmentDatasetSerializer(dataset)
-        return Response(serializer.data)
     except EquipmentDataset.DoesNotExist:
         return Response({'error': 'Dataset not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    try:
+        page = paginate_equipment(dataset, request.query_params)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    
+    page['next'] = None
+    if page['next_cursor']:
+        page['next'] = replace_query_param(request.build_absolute_uri(), 'cursor', page['next_cursor'])
+    page['results'] = equipment_payload(page['results'], request)
+    response = Response(page)
+    patch_vary_headers(response, ['Accept'])
+    return response
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@renderer_classes(json_renderers())
+def get_dataset_by_type(request, dataset_id):
+    """Get per-type parameter statistics of a dataset from its stored aggregates (?types=, ?parameters=)"""
+    try:
+        dataset = EquipmentDataset.objects.only('id', 'content_hash').get(id=dataset_id)
+    except EquipmentDataset.DoesNotExist:
+        return Response({'error': 'Dataset not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    try:
+        return cached_response(
+            request, 'by-type', dataset, lambda dataset: by_type_data(dataset, request.query_params)
+        )
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@renderer_classes([JSONRenderer, NDJSONRenderer])
+def export_dataset_equipment(request, dataset_id):
+    """Stream all of a dataset's equipment as one JSON array or as NDJSON (?format=ndjson)"""
+    try:
+        dataset = EquipmentDataset.objects.only('id').get(id=dataset_id)
+    except EquipmentDataset.DoesNotExist:
+        return Response({'error': 'Dataset not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    try:
+        return export_response(dataset, request)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+def export_response(dataset, request, stream=None):
+    """Streamed export of a dataset in the negotiated format; stream, if given, wraps the chunk iterator
+
+    Bad filters raise ValueError here, before streaming starts and the status is fixed.
+    """
+    params = request.query_params
+    page_queryset(dataset, params)
+    blocks = iter_blocks(dataset, params, get_export_chunk_size())
+    fmt = request.accepted_renderer.format
+    if fmt == NDJSONRenderer.format:
+        chunks, content_type = stream_ndjson(blocks), NDJSONRenderer.media_type
+    else:
+        chunks, content_type = stream_json(blocks), JSONRenderer.media_type
+    response = StreamingHttpResponse(stream(chunks) if stream else chunks, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="equipment_{dataset.id}.{fmt}"'
+    return response
+
+def event_stream_response(messages):
+    response = StreamingHttpResponse(messages, content_type=EventStreamRenderer.media_type)
+    response['Cache-Control'] = 'no-cache'
+    # Tell nginx-style proxies not to buffer the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+def request_event_stream(request):
+    """EventStream resuming after the Last-Event-ID header (or ?last_event_id=); raises ValueError"""
+    return EventStream(parse_last_event_id(
+        request.headers.get('Last-Event-ID', request.query_params.get('last_event_id'))
+    ))
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@renderer_classes([EventStreamRenderer, JSONRenderer])
+def events(request):
+    """Stream dataset-created, dataset-pruned and job-progress events as Server-Sent Events"""
+    try:
+        stream = request_event_stream(request)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return event_stream_response(stream.messages())
+
+def pdf_response(dataset):
+    pdf_buffer = generate_pdf_report(dataset)
+    response = HttpResponse(pdf_buffer.getvalue(), content_type='application/pdf')
+    response['Content-Disposition'] = f'attachment; filename="equipment_report_{dataset.id}.pdf"'
+    return response
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
@@ -103,11 +586,7 @@ def generate_pdf(request):
         if not latest_dataset:
             return Response({'error': 'No data available'}, status=status.HTTP_404_NOT_FOUND)
         
-        pdf_buffer = generate_pdf_report(latest_dataset)
-        
-        response = HttpResponse(pdf_buffer.getvalue(), content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="equipment_report_{latest_dataset.id}.pdf"'
-        return response
+        return pdf_response(latest_dataset)
         
     except Exception as e:
         return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file
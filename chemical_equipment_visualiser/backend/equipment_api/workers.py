@@ -0,0 +1,14 @@
+"""Entry points for pool processes.
+
+Kept free of model imports so a freshly spawned process can unpickle them
+before Django has been set up.
+"""
+
+def init_worker():
+    """Set up Django inside a pool process"""
+    import django
+    django.setup()
+
+def run_ingest_job(job_id):
+    from .jobs import run_job
+    return run_job(job_id)
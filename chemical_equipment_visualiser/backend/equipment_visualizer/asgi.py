@@ -0,0 +1,14 @@
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'equipment_visualizer.settings')
+# Coroutine views for the read endpoints and uploads; set it to False to serve the sync views
+os.environ.setdefault('EQUIPMENT_ASYNC_VIEWS', 'True')
+
+application = get_asgi_application()
+
+# Fail ingest jobs a previous server process left queued or running
+from equipment_api.jobs import recover_jobs_in_background
+
+recover_jobs_in_background()
@@ -20,6 +20,7 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'rest_framework',
+    'rest_framework.authtoken',
     'corsheaders',
     'equipment_api',
 ]
@@ -59,11 +60,27 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Keep connections (and their page cache and mmap) across requests; checked before reuse
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', '600')),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# SQLite pragmas run on every new connection (see equipment_api/sqlite.py for the defaults);
+# EQUIPMENT_SQLITE_JOURNAL_MODE=DELETE goes back to rollback-journal mode
+EQUIPMENT_SQLITE_PRAGMAS = {
+    'journal_mode': os.getenv('EQUIPMENT_SQLITE_JOURNAL_MODE', 'WAL'),
+    'busy_timeout': int(os.getenv('EQUIPMENT_SQLITE_BUSY_TIMEOUT_MS', '30000')),
+    'cache_size': -int(os.getenv('EQUIPMENT_SQLITE_CACHE_KB', '64000')),
+    'mmap_size': int(os.getenv('EQUIPMENT_SQLITE_MMAP_BYTES', str(256 * 1024 * 1024))),
+}
+
+# Queue ingests behind a lock file next to the database so concurrent uploads don't collide
+EQUIPMENT_INGEST_LOCK = os.getenv('EQUIPMENT_INGEST_LOCK', 'True') == 'True'
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
+        'equipment_api.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.BasicAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
@@ -74,6 +91,120 @@ REST_FRAMEWORK = {
 
 CORS_ALLOW_ALL_ORIGINS = True  # For development only
 
+# Serve the read endpoints and uploads from coroutine views (asgi.py turns this on)
+EQUIPMENT_ASYNC_VIEWS = os.getenv('EQUIPMENT_ASYNC_VIEWS', 'False') == 'True'
+
+# Seconds a verified API token is trusted without a database lookup (0 checks every request)
+EQUIPMENT_TOKEN_CACHE_SECONDS = int(os.getenv('EQUIPMENT_TOKEN_CACHE_SECONDS', '60'))
+
+# Hash uploads while they stream in so identical re-uploads can be deduplicated
+FILE_UPLOAD_HANDLERS = [
+    'equipment_api.upload_handlers.HashingUploadHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
+# Rows parsed and written per chunk while ingesting CSV uploads; each chunk commits separately
+EQUIPMENT_INGEST_BATCH_SIZE = int(os.getenv('EQUIPMENT_INGEST_BATCH_SIZE', '5000'))
+
+# Add median, percentiles and IQR to summary_stats (needs numpy); streaming sketches, exact up to
+# 8192 values per column and within ~0.01% of rank beyond, in memory that does not grow with the file
+EQUIPMENT_EXTENDED_STATS = os.getenv('EQUIPMENT_EXTENDED_STATS', 'True') == 'True'
+
+# Background ingestion: uploads return 202 and are processed by a local process pool
+EQUIPMENT_ASYNC_UPLOADS = os.getenv('EQUIPMENT_ASYNC_UPLOADS', 'True') == 'True'
+EQUIPMENT_JOB_WORKERS = int(os.getenv('EQUIPMENT_JOB_WORKERS', '2'))
+EQUIPMENT_JOB_DIR = os.getenv('EQUIPMENT_JOB_DIR', os.path.join(BASE_DIR, 'uploads'))
+
+# Parse files on disk above the size threshold across several processes (0 disables);
+# files containing quotes are parsed in one process, since a quoted field may span lines
+EQUIPMENT_PARSE_WORKERS = int(os.getenv('EQUIPMENT_PARSE_WORKERS', str(min(os.cpu_count() or 1, 4))))
+EQUIPMENT_PARALLEL_MIN_BYTES = int(os.getenv('EQUIPMENT_PARALLEL_MIN_BYTES', str(32 * 1024 * 1024)))
+
+# Keep a memory-mapped columnar copy of each dataset for the read endpoints
+EQUIPMENT_COLUMNAR_STORAGE = os.getenv('EQUIPMENT_COLUMNAR_STORAGE', 'True') == 'True'
+EQUIPMENT_COLUMNAR_DIR = os.getenv('EQUIPMENT_COLUMNAR_DIR', os.path.join(BASE_DIR, 'columnar'))
+
+# Dataset retention, applied after each upload and by `manage.py prune_datasets`; 0 turns a limit off
+EQUIPMENT_RETENTION = {
+    'MAX_DATASETS': int(os.getenv('EQUIPMENT_RETENTION_MAX_DATASETS', '5')) or None,
+    'MAX_AGE_DAYS': int(os.getenv('EQUIPMENT_RETENTION_MAX_AGE_DAYS', '0')) or None,
+    'MAX_TOTAL_ROWS': int(os.getenv('EQUIPMENT_RETENTION_MAX_TOTAL_ROWS', '0')) or None,
+}
+
+# Equipment rows removed per DELETE when a dataset is deleted, so no write holds SQLite's lock for long
+EQUIPMENT_DELETE_BATCH_SIZE = int(os.getenv('EQUIPMENT_DELETE_BATCH_SIZE', '20000'))
+
+# Rows per page of /api/datasets/<id>/equipment/ (clients may ask for up to the maximum)
+EQUIPMENT_PAGE_SIZE = int(os.getenv('EQUIPMENT_PAGE_SIZE', '1000'))
+EQUIPMENT_MAX_PAGE_SIZE = int(os.getenv('EQUIPMENT_MAX_PAGE_SIZE', '10000'))
+
+# Rows read and encoded per step of a streamed /api/datasets/<id>/export/
+EQUIPMENT_EXPORT_CHUNK_SIZE = int(os.getenv('EQUIPMENT_EXPORT_CHUNK_SIZE', '2000'))
+
+# Upper bounds on chart data from /api/charts/: histogram bins per axis and downsampled series points
+EQUIPMENT_CHART_MAX_BINS = int(os.getenv('EQUIPMENT_CHART_MAX_BINS', '200'))
+EQUIPMENT_CHART_MAX_POINTS = int(os.getenv('EQUIPMENT_CHART_MAX_POINTS', '5000'))
+
+# Most datasets one /api/compare/ request may compare
+EQUIPMENT_COMPARE_MAX_DATASETS = int(os.getenv('EQUIPMENT_COMPARE_MAX_DATASETS', '10'))
+
+# Most sub-requests one /api/batch/ request may carry
+EQUIPMENT_BATCH_MAX_REQUESTS = int(os.getenv('EQUIPMENT_BATCH_MAX_REQUESTS', '20'))
+
+# /api/events/ (Server-Sent Events): seconds between polls of the event table, how long one
+# stream lasts before the client reconnects (keep it under the gunicorn timeout for sync
+# workers), idle seconds before a keep-alive comment, and how many events are kept for replay
+EQUIPMENT_EVENTS_POLL_SECONDS = float(os.getenv('EQUIPMENT_EVENTS_POLL_SECONDS', '1'))
+EQUIPMENT_EVENTS_STREAM_SECONDS = int(os.getenv('EQUIPMENT_EVENTS_STREAM_SECONDS', '60'))
+EQUIPMENT_EVENTS_HEARTBEAT_SECONDS = int(os.getenv('EQUIPMENT_EVENTS_HEARTBEAT_SECONDS', '15'))
+EQUIPMENT_EVENTS_KEPT = int(os.getenv('EQUIPMENT_EVENTS_KEPT', '1000'))
+
+# Response cache for summary/equipment/types: an in-process LRU per server process, plus an
+# optional cache shared by all processes (EQUIPMENT_SHARED_CACHE=file, or db after
+# `manage.py createcachetable`) so gunicorn workers share rendered bodies
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'equipment_responses': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'equipment-responses',
+        'TIMEOUT': None,
+        'OPTIONS': {'MAX_ENTRIES': int(os.getenv('EQUIPMENT_CACHE_ENTRIES', '64'))},
+    },
+    'equipment_tokens': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'equipment-tokens',
+        'OPTIONS': {'MAX_ENTRIES': int(os.getenv('EQUIPMENT_TOKEN_CACHE_ENTRIES', '1000'))},
+    },
+}
+EQUIPMENT_SHARED_CACHE = os.getenv('EQUIPMENT_SHARED_CACHE', '')
+if EQUIPMENT_SHARED_CACHE == 'file':
+    CACHES['equipment_shared'] = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv('EQUIPMENT_SHARED_CACHE_DIR', os.path.join(BASE_DIR, 'cache')),
+        'TIMEOUT': None,
+        'OPTIONS': {'MAX_ENTRIES': int(os.getenv('EQUIPMENT_SHARED_CACHE_ENTRIES', '256'))},
+    }
+elif EQUIPMENT_SHARED_CACHE == 'db':
+    CACHES['equipment_shared'] = {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'equipment_response_cache',
+        'TIMEOUT': None,
+        'OPTIONS': {'MAX_ENTRIES': int(os.getenv('EQUIPMENT_SHARED_CACHE_ENTRIES', '256'))},
+    }
+# Responses larger than this are rendered on every request instead of cached
+EQUIPMENT_CACHE_MAX_BYTES = int(os.getenv('EQUIPMENT_CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+
+# Resumable chunked uploads
+EQUIPMENT_UPLOAD_CHUNK_SIZE = int(os.getenv('EQUIPMENT_UPLOAD_CHUNK_SIZE', str(8 * 1024 * 1024)))
+EQUIPMENT_UPLOAD_MAX_CHUNK_SIZE = int(os.getenv('EQUIPMENT_UPLOAD_MAX_CHUNK_SIZE', str(64 * 1024 * 1024)))
+# Largest file a session may announce; its space is reserved up front
+EQUIPMENT_UPLOAD_MAX_SIZE = int(os.getenv('EQUIPMENT_UPLOAD_MAX_SIZE', str(2 * 1024 * 1024 * 1024)))
+# Unfinished sessions idle this long are deleted, with their partial files, by `manage.py prune_datasets`
+EQUIPMENT_UPLOAD_EXPIRY_HOURS = int(os.getenv('EQUIPMENT_UPLOAD_EXPIRY_HOURS', '24'))
+
 LANGUAGE_CODE = 'en-us'
 TIME_ZONE = 'UTC'
 USE_I18N = True
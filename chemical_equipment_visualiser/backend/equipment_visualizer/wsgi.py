@@ -4,4 +4,9 @@ from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'equipment_visualizer.settings')
 
-application = get_wsgi_application()
\ No newline at end of file
+application = get_wsgi_application()
+
+# Fail ingest jobs a previous server process left queued or running
+from equipment_api.jobs import recover_jobs_in_background
+
+recover_jobs_in_background()
@@ -0,0 +1,23 @@
+# gunicorn settings, read from the backend directory: `gunicorn` (or `gunicorn -c gunicorn.conf.py`)
+#
+# The default threaded (gthread) workers serve the WSGI app; each /api/events/ stream holds one
+# thread for up to EQUIPMENT_EVENTS_STREAM_SECONDS, so a worker needs threads to spare for other
+# requests. GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker serves equipment_visualizer.asgi
+# instead (async read/upload views, one event loop per worker).
+# With more than one worker, EQUIPMENT_SHARED_CACHE lets the workers share cached responses.
+import multiprocessing
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+workers = int(os.getenv('GUNICORN_WORKERS', str(min(multiprocessing.cpu_count() * 2 + 1, 8))))
+# Requests each gthread worker handles at once, event streams included
+threads = int(os.getenv('GUNICORN_THREADS', '8'))
+# Uploads are parsed in the request unless EQUIPMENT_ASYNC_UPLOADS hands them to the job pool
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '120'))
+keepalive = 5
+
+if 'uvicorn' in worker_class.lower():
+    wsgi_app = 'equipment_visualizer.asgi:application'
+else:
+    wsgi_app = 'equipment_visualizer.wsgi:application'
@@ -1,8 +1,20 @@
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
                              QComboBox, QGroupBox, QGridLayout, QTextEdit)
 from PyQt5.QtCore import Qt
+from services.api_client import APIWorker
 import json
 
+PARAMETERS = ['flowrate', 'pressure', 'temperature']
+HISTOGRAM_BINS = 20
+DENSITY_BINS = 20
+
+def fetch_histograms(api_client):
+    """Server-binned histograms of every parameter (runs in an APIWorker)"""
+    return {
+        param: api_client.get_chart_data('histogram', parameter=param, bins=HISTOGRAM_BINS)
+        for param in PARAMETERS
+    }
+
 class ChartsTab(QWidget):
     def __init__(self, main_window):
         super().__init__()
@@ -19,6 +31,8 @@ class ChartsTab(QWidget):
         self.view_selector.addItems([
             "Equipment Type Distribution",
             "Parameter Statistics", 
+            "Parameter Histograms",
+            "Pressure vs Temperature Density",
             "Data Summary"
         ])
         self.view_selector.currentTextChanged.connect(self.update_display)
@@ -65,6 +79,15 @@ class ChartsTab(QWidget):
             self.show_type_distribution()
         elif view_type == "Parameter Statistics":
             self.show_parameter_stats()
+        elif view_type == "Parameter Histograms":
+            self.load_chart_data(fetch_histograms, self.show_histograms)
+        elif view_type == "Pressure vs Temperature Density":
+            self.load_chart_data(
+                lambda api_client: api_client.get_chart_data(
+                    'histogram2d', x='pressure', y='temperature', bins=DENSITY_BINS
+                ),
+                self.show_density
+            )
         elif view_type == "Data Summary":
             self.show_data_summary()
             
@@ -143,6 +166,75 @@ class ChartsTab(QWidget):
         
         self.display_area.setHtml(html)
         
+    def load_chart_data(self, fetch, show):
+        """Fetch display-sized chart data from the server in the background, then render it"""
+        api_client = self.main_window.api_client
+        if api_client is None:
+            return
+        view_type = self.view_selector.currentText()
+        self.display_area.setHtml("""
+        <div style="text-align: center; padding: 50px; color: #888; font-size: 16px;">Loading chart data...</div>
+        """)
+        worker = APIWorker(fetch, api_client)
+        self.main_window.register_thread(worker)
+        # Ignore results that arrive after the user switched to another view
+        worker.finished.connect(lambda data: show(data) if self.view_selector.currentText() == view_type else None)
+        worker.error.connect(lambda e: self.main_window.show_status(f"Error loading chart data: {e}"))
+        worker.start()
+        self.chart_worker = worker
+        
+    def show_histograms(self, histograms):
+        """Show one horizontal bar per histogram bin for each parameter"""
+        html = """
+        <div style="font-family: Arial, sans-serif; color: white;">
+            <h2 style="color: #4BC0C0; text-align: center;">Parameter Histograms</h2>
+        """
+        colors = ['#FF6384', '#36A2EB', '#FFCE56']
+        for color, (param, histogram) in zip(colors, histograms.items()):
+            edges, counts = histogram['edges'], histogram['counts']
+            peak = max(counts) if counts and max(counts) > 0 else 1
+            html += f"""
+            <h3 style="color: {color}; text-transform: capitalize;">{param}</h3>
+            <table width="100%" cellspacing="1" cellpadding="1" style="font-size: 11px;">
+            """
+            for low, high, count in zip(edges, edges[1:], counts):
+                width = max(int(count * 100 / peak), 1)
+                html += f"""
+                <tr>
+                    <td width="20%" style="color: #b0b0b0;">{low:.1f} - {high:.1f}</td>
+                    <td width="70%"><table width="{width}%" cellspacing="0" cellpadding="0">
+                        <tr><td bgcolor="{color}">&nbsp;</td></tr></table></td>
+                    <td width="10%" style="color: white;">{count}</td>
+                </tr>
+                """
+            html += "</table>"
+        html += "</div>"
+        self.display_area.setHtml(html)
+        
+    def show_density(self, density):
+        """Show a binned pressure/temperature density as a heat map table"""
+        counts = density['counts']
+        peak = max((max(row) for row in counts), default=0) or 1
+        x_edges, y_edges = density['x_edges'], density['y_edges']
+        html = f"""
+        <div style="font-family: Arial, sans-serif; color: white;">
+            <h2 style="color: #4BC0C0; text-align: center;">Pressure vs Temperature Density</h2>
+            <p style="color: #b0b0b0; text-align: center;">{density['total']} records; rows are temperature bins, columns pressure bins</p>
+            <table cellspacing="0" cellpadding="0" align="center" style="font-size: 9px;">
+        """
+        # Highest temperature at the top
+        for j in reversed(range(len(y_edges) - 1)):
+            html += f'<tr><td style="color: #b0b0b0; padding-right: 4px;">{y_edges[j]:.0f}</td>'
+            for i in range(len(x_edges) - 1):
+                shade = int(255 * counts[i][j] / peak)
+                html += f'<td width="16" height="16" bgcolor="#{shade // 4:02x}{shade // 2:02x}{shade:02x}"></td>'
+            html += "</tr>"
+        html += '<tr><td></td>' + "".join(
+            f'<td style="color: #b0b0b0;">{x_edges[i]:.0f}</td>' if i % 5 == 0 else '<td></td>'
+            for i in range(len(x_edges) - 1)
+        ) + "</tr></table></div>"
+        self.display_area.setHtml(html)
+        
     def show_data_summary(self):
         """Show comprehensive data summary"""
         html = """
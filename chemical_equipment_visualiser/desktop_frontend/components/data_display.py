@@ -93,59 +93,39 @@ class DataDisplayTab(QWidget):
         self.debug_label.setText("Debug: Starting refresh...")
         self.main_window.show_status("Refreshing data...")
         
-        # Load equipment data
-        equipment_worker = APIWorker(self.main_window.api_client.get_equipment)
-        self.main_window.register_thread(equipment_worker)  # Register for cleanup
-        equipment_worker.finished.connect(self.on_equipment_refreshed)
-        equipment_worker.error.connect(self.on_refresh_error)
-        equipment_worker.start()
+        # Equipment and summary of the same dataset in one request
+        data_worker = APIWorker(self.main_window.api_client.get_latest_data)
+        self.main_window.register_thread(data_worker)  # Register for cleanup
+        data_worker.finished.connect(self.on_data_refreshed)
+        data_worker.error.connect(self.on_refresh_error)
+        data_worker.start()
         
     def force_load_data(self):
         """Force load both equipment and summary data"""
         self.debug_label.setText("Debug: Force loading all data...")
         
-        # Load equipment data
-        equipment_worker = APIWorker(self.main_window.api_client.get_equipment)
-        self.main_window.register_thread(equipment_worker)  # Register for cleanup
-        equipment_worker.finished.connect(self.on_equipment_force_loaded)
-        equipment_worker.error.connect(self.on_refresh_error)
-        equipment_worker.start()
+        data_worker = APIWorker(self.main_window.api_client.get_latest_data)
+        self.main_window.register_thread(data_worker)  # Register for cleanup
+        data_worker.finished.connect(self.on_data_force_loaded)
+        data_worker.error.connect(self.on_refresh_error)
+        data_worker.start()
 
-    def on_equipment_refreshed(self, equipment_data):
-        self.debug_label.setText(f"Debug: Equipment data loaded: {len(equipment_data) if equipment_data else 0} items")
+    def on_data_refreshed(self, data):
+        equipment_data, summary_data = data
+        self.debug_label.setText(f"Debug: Data loaded: {len(equipment_data) if equipment_data else 0} items")
         self.main_window.current_data = equipment_data
-        self.main_window.show_status("Equipment data refreshed")
-        
-        # Now load summary data
-        summary_worker = APIWorker(self.main_window.api_client.get_summary)
-        self.main_window.register_thread(summary_worker)  # Register for cleanup
-        summary_worker.finished.connect(self.on_summary_refreshed)
-        summary_worker.error.connect(self.on_refresh_error)
-        summary_worker.start()
-
-    def on_equipment_force_loaded(self, equipment_data):
-        self.debug_label.setText(f"Debug: Equipment data force loaded: {len(equipment_data) if equipment_data else 0} items")
-        self.main_window.current_data = equipment_data
-        
-        # Now load summary data
-        summary_worker = APIWorker(self.main_window.api_client.get_summary)
-        self.main_window.register_thread(summary_worker)  # Register for cleanup
-        summary_worker.finished.connect(self.on_summary_force_loaded)
-        summary_worker.error.connect(self.on_refresh_error)
-        summary_worker.start()
-
-    def on_summary_refreshed(self, summary_data):
-        self.debug_label.setText("Debug: Summary data loaded")
         self.main_window.current_summary = summary_data
-        self.main_window.show_status("Summary data refreshed")
+        self.main_window.show_status("Data refreshed")
         # Update display with new data
-        self.update_data(self.main_window.current_data, summary_data)
+        self.update_data(equipment_data, summary_data)
 
-    def on_summary_force_loaded(self, summary_data):
-        self.debug_label.setText("Debug: Summary data force loaded")
+    def on_data_force_loaded(self, data):
+        equipment_data, summary_data = data
+        self.debug_label.setText(f"Debug: Data force loaded: {len(equipment_data) if equipment_data else 0} items")
+        self.main_window.current_data = equipment_data
         self.main_window.current_summary = summary_data
         # Update display with new data
-        self.update_data(self.main_window.current_data, summary_data)
+        self.update_data(equipment_data, summary_data)
         QMessageBox.information(self, "Success", "Data loaded successfully!")
 
     def on_refresh_error(self, error_message):
@@ -2,8 +2,15 @@ import os
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
                              QPushButton, QLineEdit, QFileDialog, QProgressBar,
                              QTextEdit, QGroupBox, QMessageBox)
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QTimer
 from services.api_client import APIWorker
+from utils.helpers import format_file_size
+
+# Files above this size are sent as resumable chunks instead of one POST
+CHUNKED_UPLOAD_THRESHOLD = 32 * 1024 * 1024
+# Plain CSVs above this size are gzipped before sending
+COMPRESS_UPLOAD_THRESHOLD = 1024 * 1024
+CSV_FILE_FILTER = "CSV Files (*.csv *.csv.gz *.csv.bz2 *.csv.xz *.csv.zst)"
 
 class FileUploadTab(QWidget):
     def __init__(self, main_window):
@@ -49,6 +56,17 @@ class FileUploadTab(QWidget):
         self.progress_bar.setVisible(False)
         file_layout.addWidget(self.progress_bar)
         
+        # Job status (rows processed and throughput while the server ingests)
+        self.job_label = QLabel()
+        self.job_label.setVisible(False)
+        file_layout.addWidget(self.job_label)
+        
+        # Poll the job endpoint one request at a time
+        self.job_id = None
+        self.poll_timer = QTimer(self)
+        self.poll_timer.setSingleShot(True)
+        self.poll_timer.timeout.connect(self.poll_job)
+        
         file_group.setLayout(file_layout)
         layout.addWidget(file_group)
         
@@ -83,12 +101,12 @@ Compressor-1,Compressor,95,8.4,95
         
     def browse_file(self):
         file_path, _ = QFileDialog.getOpenFileName(
-            self, "Select CSV File", "", "CSV Files (*.csv)"
+            self, "Select CSV File", "", CSV_FILE_FILTER
         )
         if file_path:
             self.file_path.setText(file_path)
             # Set default dataset name from filename
-            base_name = os.path.splitext(os.path.basename(file_path))[0]
+            base_name = os.path.basename(file_path).split('.csv')[0]
             self.dataset_name.setText(base_name)
             self.upload_btn.setEnabled(True)
             
@@ -114,19 +132,84 @@ Compressor-1,Compressor,95,8.4,95
         self.progress_bar.setRange(0, 0)  # Indeterminate progress
         self.upload_btn.setEnabled(False)
         
-        # Start upload in background thread
-        self.worker = APIWorker(self.main_window.api_client.upload_csv, file_path, dataset_name)
+        # Start upload in background thread; large files go through the resumable chunked API
+        api_client = self.main_window.api_client
+        file_size = os.path.getsize(file_path)
+        if file_size > CHUNKED_UPLOAD_THRESHOLD:
+            self.worker = APIWorker(api_client.upload_csv_chunked, file_path, dataset_name)
+        elif file_size > COMPRESS_UPLOAD_THRESHOLD and file_path.lower().endswith('.csv'):
+            self.worker = APIWorker(api_client.upload_csv, file_path, dataset_name, compress='gzip')
+        else:
+            self.worker = APIWorker(api_client.upload_csv, file_path, dataset_name)
         self.main_window.register_thread(self.worker)  # Register for cleanup
         self.worker.finished.connect(self.on_upload_success)
         self.worker.error.connect(self.on_upload_error)
         self.worker.start()
         
     def on_upload_success(self, result):
+        # Large uploads are accepted with a job id and processed in the background
+        if isinstance(result, dict) and result.get('job_id'):
+            self.job_id = result['job_id']
+            self.progress_bar.setRange(0, 100)
+            self.progress_bar.setValue(0)
+            self.job_label.setText("Queued for processing...")
+            self.job_label.setVisible(True)
+            self.poll_timer.start(500)
+            return
+        if isinstance(result, dict) and result.get('deduplicated'):
+            self.finish_upload("This file was already uploaded; showing the existing dataset.")
+            return
+        self.finish_upload()
+        
+    def poll_job(self):
+        """Request the current state of the ingestion job"""
+        if self.job_id is None:
+            return
+        worker = APIWorker(self.main_window.api_client.get_job, self.job_id)
+        self.main_window.register_thread(worker)
+        worker.finished.connect(self.on_job_status)
+        worker.error.connect(self.on_upload_error)
+        worker.start()
+        self.job_worker = worker
+        
+    def on_job_status(self, job):
+        """Update the progress bar from a job status response"""
+        if self.job_id is None or job['job_id'] != self.job_id:
+            # A poll and a pushed event can both report the end of the same job
+            return
+        if job['state'] == 'failed':
+            self.on_upload_error(job.get('error') or "Processing failed")
+            return
+        
+        if job.get('bytes_total'):
+            self.progress_bar.setValue(int(job['bytes_processed'] * 100 / job['bytes_total']))
+        rate = job.get('rows_per_second')
+        rate_text = f" ({rate:,.0f} rows/s)" if rate else ""
+        self.job_label.setText(
+            f"{job['state'].title()}: {job['rows_processed']:,} rows, "
+            f"{format_file_size(job['bytes_processed'])} of {format_file_size(job['bytes_total'])}{rate_text}"
+        )
+        
+        if job['state'] == 'succeeded':
+            self.finish_upload()
+        elif not self.main_window.events_connected:
+            self.poll_timer.start(500)
+        
+    def on_job_event(self, event):
+        """Progress of the current job pushed by /api/events/ (replaces polling while connected)"""
+        if self.job_id is None or event['job_id'] != self.job_id:
+            return
+        done = event['bytes_total'] if event['state'] == 'succeeded' else 0
+        self.on_job_status(dict(event, bytes_processed=event.get('bytes_processed', done)))
+        
+    def finish_upload(self, message="CSV file uploaded successfully!"):
+        self.job_id = None
+        self.job_label.setVisible(False)
         self.progress_bar.setVisible(False)
         self.upload_btn.setEnabled(True)
         
         # Show success message
-        QMessageBox.information(self, "Success", "CSV file uploaded successfully!")
+        QMessageBox.information(self, "Success", message)
         
         # Clear form
         self.file_path.clear()
@@ -142,38 +225,24 @@ Compressor-1,Compressor,95,8.4,95
         self.load_current_data()
         
     def on_upload_error(self, error_message):
+        self.job_id = None
+        self.poll_timer.stop()
+        self.job_label.setVisible(False)
         self.progress_bar.setVisible(False)
         self.upload_btn.setEnabled(True)
         QMessageBox.critical(self, "Upload Failed", f"Error uploading file:\n{error_message}")
         
     def load_current_data(self):
-        """Load current equipment data and summary after upload"""
-        # Load equipment data
-        equipment_worker = APIWorker(self.main_window.api_client.get_equipment)
-        self.main_window.register_thread(equipment_worker)  # Register for cleanup
-        equipment_worker.finished.connect(self.on_equipment_loaded)
-        equipment_worker.error.connect(lambda e: self.main_window.show_status(f"Error loading equipment: {e}"))
-        equipment_worker.start()
-        
-        # Load summary data
-        summary_worker = APIWorker(self.main_window.api_client.get_summary)
-        self.main_window.register_thread(summary_worker)  # Register for cleanup
-        summary_worker.finished.connect(self.on_summary_loaded)
-        summary_worker.error.connect(lambda e: self.main_window.show_status(f"Error loading summary: {e}"))
-        summary_worker.start()
-        
-    def on_equipment_loaded(self, equipment_data):
-        self.main_window.current_data = equipment_data
-        # If summary is already loaded, update the display
-        if hasattr(self.main_window, 'current_summary') and self.main_window.current_summary:
-            self.main_window.update_data(equipment_data, self.main_window.current_summary)
-        self.main_window.show_status("Equipment data loaded")
-    
-    def on_summary_loaded(self, summary_data):
-        self.main_window.current_summary = summary_data
-        # If equipment data is already loaded, update the display
-        if hasattr(self.main_window, 'current_data') and self.main_window.current_data:
-            self.main_window.update_data(self.main_window.current_data, summary_data)
-        # Refresh history
-        self.main_window.update_history()
-        self.main_window.show_status("Summary data loaded")
\ No newline at end of file
+        """Load current equipment data, summary and history after upload in one request"""
+        data_worker = APIWorker(self.main_window.api_client.get_latest_data, include_history=True)
+        self.main_window.register_thread(data_worker)  # Register for cleanup
+        data_worker.finished.connect(self.on_data_loaded)
+        data_worker.error.connect(lambda e: self.main_window.show_status(f"Error loading data: {e}"))
+        data_worker.start()
+        
+    def on_data_loaded(self, data):
+        equipment_data, summary_data, history_data = data
+        self.main_window.update_data(equipment_data, summary_data)
+        # Refresh history from the same response
+        self.main_window.history_tab.on_history_loaded(history_data)
+        self.main_window.show_status("Data loaded")
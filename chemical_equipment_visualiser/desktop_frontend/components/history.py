@@ -30,6 +30,8 @@ class HistoryTab(QWidget):
         
         # History list
         self.history_list = QListWidget()
+        # Ctrl/Shift-click selects several datasets to compare
+        self.history_list.setSelectionMode(QListWidget.ExtendedSelection)
         self.history_list.itemSelectionChanged.connect(self.on_dataset_selected)
         splitter.addWidget(self.history_list)
         
@@ -53,6 +55,11 @@ class HistoryTab(QWidget):
         self.load_btn.setEnabled(False)
         details_layout.addWidget(self.load_btn)
         
+        self.compare_btn = QPushButton("Compare Selected")
+        self.compare_btn.clicked.connect(self.compare_selected_datasets)
+        self.compare_btn.setEnabled(False)
+        details_layout.addWidget(self.compare_btn)
+        
         details_layout.addStretch()
         splitter.addWidget(self.details_panel)
         
@@ -111,6 +118,7 @@ class HistoryTab(QWidget):
         
     def on_dataset_selected(self):
         """Handle dataset selection"""
+        self.compare_btn.setEnabled(len(self.selected_dataset_ids()) >= 2)
         current_item = self.history_list.currentItem()
         if not current_item or not hasattr(current_item, 'data'):
             self.load_btn.setEnabled(False)
@@ -121,6 +129,12 @@ class HistoryTab(QWidget):
             self.load_btn.setEnabled(False)
             return
             
+        # The history response already carries each dataset's details
+        for dataset in self.main_window.history_data or []:
+            if dataset['id'] == dataset_id and 'summary_stats' in dataset:
+                self.on_dataset_details_loaded(dataset)
+                return
+            
         # Load dataset details
         self.worker = APIWorker(self.main_window.api_client.get_dataset, dataset_id)
         self.main_window.register_thread(self.worker)
@@ -178,9 +192,24 @@ class HistoryTab(QWidget):
         if not hasattr(self, 'selected_dataset'):
             return
             
+        # Dataset details are summary-only; fetch the equipment rows page by page
+        self.load_btn.setEnabled(False)
+        self.equipment_worker = APIWorker(
+            self.main_window.api_client.get_dataset_equipment,
+            self.selected_dataset['id']
+        )
+        self.main_window.register_thread(self.equipment_worker)
+        self.equipment_worker.finished.connect(self.on_dataset_equipment_loaded)
+        self.equipment_worker.error.connect(self.on_dataset_details_error)
+        self.equipment_worker.start()
+        
+    def on_dataset_equipment_loaded(self, equipment):
+        """Make the selected dataset the current data once its rows have arrived"""
+        self.load_btn.setEnabled(True)
+        
         # Update main window with selected dataset data
         self.main_window.update_data(
-            self.selected_dataset['equipments'],
+            equipment,
             self.selected_dataset['summary_stats']
         )
         
@@ -189,4 +218,73 @@ class HistoryTab(QWidget):
                                f"Dataset '{self.selected_dataset['name']}' has been loaded successfully!")
         
         # Switch to data display tab
-        self.main_window.tabs.setCurrentIndex(1)  # Data Summary tab
\ No newline at end of file
+        self.main_window.tabs.setCurrentIndex(1)  # Data Summary tab
+        
+    def selected_dataset_ids(self):
+        """Ids of the selected datasets, oldest first (the list shows the newest first)"""
+        items = sorted(self.history_list.selectedItems(), key=self.history_list.row, reverse=True)
+        return [item.data(Qt.UserRole) for item in items if item.data(Qt.UserRole)]
+        
+    def compare_selected_datasets(self):
+        """Compare the selected datasets, each against the one uploaded before it"""
+        dataset_ids = self.selected_dataset_ids()
+        if len(dataset_ids) < 2:
+            return
+            
+        self.compare_btn.setEnabled(False)
+        self.compare_worker = APIWorker(self.main_window.api_client.compare_datasets, dataset_ids, 20)
+        self.main_window.register_thread(self.compare_worker)
+        self.compare_worker.finished.connect(self.on_comparison_loaded)
+        self.compare_worker.error.connect(self.on_comparison_error)
+        self.compare_worker.start()
+        
+    def on_comparison_loaded(self, comparison):
+        """Show statistic deltas and the equipment diff for each compared pair"""
+        self.compare_btn.setEnabled(len(self.selected_dataset_ids()) >= 2)
+        names = {dataset['id']: dataset['name'] for dataset in comparison['datasets']}
+        
+        info_html = '<div style="font-family: Arial, sans-serif; color: white;">'
+        for pair in comparison['comparisons']:
+            total = pair['total_count']
+            equipment = pair['equipment']
+            info_html += f"""
+            <h3 style="color: #4BC0C0;">{names[pair['from']]} (#{pair['from']}) &rarr; {names[pair['to']]} (#{pair['to']})</h3>
+            <p><b>Total Records:</b> {total['from']} &rarr; {total['to']} ({total['delta']:+d})</p>
+            <h4 style="color: #FFCE56;">Equipment Distribution:</h4>
+            """
+            for eq_type, count in pair['type_distribution'].items():
+                info_html += (f"<p style='margin-left: 20px;'>• {eq_type}: {count['from']} &rarr; "
+                              f"<b>{count['to']}</b> ({count['delta']:+d})</p>")
+                
+            info_html += '<h4 style="color: #FFCE56;">Parameter Statistics:</h4>'
+            for param, stats in pair['parameter_stats'].items():
+                deltas = ' | '.join(
+                    f"{name.title()}: {stats[name]['to']:.2f} ({stats[name]['delta']:+.2f})"
+                    for name in ('mean', 'min', 'max', 'std') if name in stats
+                )
+                info_html += f"<p style='margin-left: 20px;'><b>{param.title()}:</b> {deltas}</p>"
+                
+            info_html += f"""
+            <h4 style="color: #FFCE56;">Equipment by Name:</h4>
+            <p style='margin-left: 20px;'>Added: <b>{equipment['added_count']}</b> |
+               Removed: <b>{equipment['removed_count']}</b> |
+               Changed: <b>{equipment['changed_count']}</b></p>
+            """
+            for label, rows in (('Added', equipment['added']), ('Removed', equipment['removed'])):
+                if rows:
+                    listed = ', '.join(row['equipment_name'] for row in rows)
+                    info_html += f"<p style='margin-left: 20px;'>{label}: {listed}</p>"
+            for row in equipment['changed']:
+                changes = ', '.join(
+                    f"{field}: {row['from'][field]} &rarr; {row['to'][field]}"
+                    for field in row['to'] if row['from'][field] != row['to'][field]
+                )
+                info_html += f"<p style='margin-left: 20px;'>Changed {row['equipment_name']}: {changes}</p>"
+                
+        info_html += "</div>"
+        self.dataset_info.setHtml(info_html)
+        
+    def on_comparison_error(self, error_message):
+        """Handle comparison error"""
+        self.compare_btn.setEnabled(len(self.selected_dataset_ids()) >= 2)
+        self.dataset_info.setHtml(f"<div style='color: red;'>Error comparing datasets: {error_message}</div>")
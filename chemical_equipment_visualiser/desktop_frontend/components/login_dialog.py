@@ -1,6 +1,7 @@
 from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, 
                              QLineEdit, QPushButton, QMessageBox)
 from PyQt5.QtCore import Qt
+from services.api_client import APIClient, APIWorker
 
 class LoginDialog(QDialog):
     def __init__(self, parent=None):
@@ -8,6 +9,8 @@ class LoginDialog(QDialog):
         self.setWindowTitle("API Authentication")
         self.setModal(True)
         self.setFixedSize(300, 200)
+        self.api_client = None
+        self.worker = None
         
         self.init_ui()
         
@@ -38,7 +41,7 @@ class LoginDialog(QDialog):
         # Buttons
         button_layout = QHBoxLayout()
         self.login_btn = QPushButton("Login")
-        self.login_btn.clicked.connect(self.accept)
+        self.login_btn.clicked.connect(self.attempt_login)
         self.login_btn.setStyleSheet("""
             QPushButton {
                 background-color: #2a82da;
@@ -74,4 +77,32 @@ class LoginDialog(QDialog):
         self.setLayout(layout)
         
     def get_credentials(self):
-        return self.username_input.text(), self.password_input.text()
\ No newline at end of file
+        return self.username_input.text(), self.password_input.text()
+    
+    def attempt_login(self):
+        """Log in for an API token in a background thread, so the dialog stays responsive"""
+        username, password = self.get_credentials()
+        client = APIClient(username=username, password=password)
+        self.login_btn.setEnabled(False)
+        self.login_btn.setText("Logging in...")
+        
+        self.worker = APIWorker(client.login)
+        self.worker.finished.connect(lambda token: self.on_login_succeeded(client))
+        self.worker.error.connect(self.on_login_failed)
+        self.worker.start()
+        
+    def on_login_succeeded(self, client):
+        self.api_client = client
+        self.accept()
+        
+    def on_login_failed(self, error_message):
+        """Stay open with an error if the backend refuses"""
+        QMessageBox.warning(self, "Login Failed", error_message)
+        self.login_btn.setEnabled(True)
+        self.login_btn.setText("Login")
+        
+    def reject(self):
+        # Cancelled mid-login: drop the result instead of accepting later
+        if self.worker is not None:
+            self.worker.stop()
+        super().reject()
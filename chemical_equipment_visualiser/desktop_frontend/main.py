@@ -11,7 +11,7 @@ from components.data_display import DataDisplayTab
 from components.charts import ChartsTab
 from components.history import HistoryTab
 from components.login_dialog import LoginDialog
-from services.api_client import APIClient
+from services.api_client import EventListener
 
 class MainWindow(QMainWindow):
     def __init__(self):
@@ -21,6 +21,8 @@ class MainWindow(QMainWindow):
         self.current_summary = None
         self.history_data = []
         self.active_threads = []  # Track active threads
+        self.events_connected = False
+        self.latest_dataset_id = None
         
         self.init_ui()
         self.show_login_dialog()
@@ -29,10 +31,11 @@ class MainWindow(QMainWindow):
         """Show login dialog to get API credentials"""
         dialog = LoginDialog(self)
         if dialog.exec_() == QDialog.Accepted:
-            username, password = dialog.get_credentials()
-            self.api_client = APIClient(username=username, password=password)
+            # The dialog has already exchanged the credentials for an API token
+            self.api_client = dialog.api_client
             if self.check_backend_connection():
                 self.status_bar.showMessage("Connected to backend")
+                self.start_event_listener()
             else:
                 self.show_login_dialog()  # Retry if connection fails
         else:
@@ -116,6 +119,41 @@ class MainWindow(QMainWindow):
                             f"Make sure Django backend is running on http://localhost:8000")
             return False
     
+    def start_event_listener(self):
+        """Follow server events so data is refetched only when something changed"""
+        listener = EventListener(self.api_client)
+        self.register_thread(listener)
+        listener.event_received.connect(self.on_server_event)
+        listener.connection_changed.connect(self.on_events_connection)
+        listener.start()
+        
+    def on_events_connection(self, connected):
+        self.events_connected = connected
+        if not connected:
+            self.show_status("Lost connection to server events, retrying...")
+            
+    def on_server_event(self, kind, data):
+        """Refetch what a server event says has changed"""
+        if kind == 'ready':
+            # (Re)connected: catch up if the latest dataset changed while we weren't listening
+            changed = self.latest_dataset_id is not None and data['latest_dataset_id'] != self.latest_dataset_id
+            self.latest_dataset_id = data['latest_dataset_id']
+            if changed:
+                self.reload_latest()
+        elif kind == 'dataset-created':
+            self.latest_dataset_id = data['dataset_id']
+            self.show_status(f"New dataset: {data['name']} ({data['total_count']:,} records)")
+            self.reload_latest()
+        elif kind == 'dataset-pruned':
+            if self.history_tab.loaded:
+                self.update_history()
+        elif kind == 'job-progress':
+            self.file_upload_tab.on_job_event(data)
+            
+    def reload_latest(self):
+        """Load the latest dataset and history (revalidated, so unchanged responses cost a 304)"""
+        self.file_upload_tab.load_current_data()
+        
     def register_thread(self, thread):
         """Register a thread for proper cleanup"""
         self.active_threads.append(thread)
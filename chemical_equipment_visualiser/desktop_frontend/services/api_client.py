@@ -1,17 +1,120 @@
 import requests
 import base64
+import bz2
+import sys
+from array import array
+import gzip
+import hashlib
+import lzma
+import os
+import shutil
+import socket
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from PyQt5.QtCore import QThread, pyqtSignal
 import json
 
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+CHUNK_SIZE = 8 * 1024 * 1024
+
+# Responses kept for If-None-Match revalidation; each may hold a whole dataset's rows
+ETAG_CACHE_ENTRIES = 32
+
+# Client-side compression: suffix added to the file name and a writer wrapping a binary file.
+# Output must depend only on the content, so re-uploads hash the same and the server dedupes
+# them: gzip gets no timestamp or file name in its header
+COMPRESSORS = {
+    'gzip': ('.gz', lambda f: gzip.GzipFile(filename='', fileobj=f, mode='wb', compresslevel=6, mtime=0)),
+    'bz2': ('.bz2', lambda f: bz2.BZ2File(f, mode='wb')),
+    'xz': ('.xz', lambda f: lzma.LZMAFile(f, mode='wb')),
+}
+
+# array typecodes of the columnar wire format's numeric column dtypes
+ARRAY_TYPECODES = {'<i8': 'q', '<i2': 'h', '<f8': 'd'}
+COLUMN_DTYPES = {'id': '<i8', 'equipment_type': '<i2', 'flowrate': '<f8', 'pressure': '<f8', 'temperature': '<f8'}
+
+def decode_columns(data):
+    """Decode a columnar equipment payload (columns or msgpack format) into typed arrays
+
+    Returns {'count', 'equipment_types', 'columns'}; columns holds array.array
+    for the numeric columns (equipment_type as indexes into equipment_types)
+    and a list of str for equipment_name.
+    """
+    columns = {'equipment_name': data['columns']['equipment_name']}
+    for name, dtype in data.get('dtypes', COLUMN_DTYPES).items():
+        values = array(ARRAY_TYPECODES[dtype])
+        raw = data['columns'][name]
+        if isinstance(raw, bytes):
+            values.frombytes(raw)
+            if sys.byteorder == 'big':
+                values.byteswap()
+        else:
+            values.extend(raw)
+        columns[name] = values
+    return {'count': data['count'], 'equipment_types': data['equipment_types'], 'columns': columns}
+
+def concat_columns(blocks):
+    """Join decoded column blocks (e.g. pages), re-indexing each block's equipment types"""
+    type_index = {}
+    columns = {'equipment_name': []}
+    columns.update({name: array(ARRAY_TYPECODES[dtype]) for name, dtype in COLUMN_DTYPES.items()})
+    for block in blocks:
+        mapping = [type_index.setdefault(name, len(type_index)) for name in block['equipment_types']]
+        for name, values in block['columns'].items():
+            if name == 'equipment_type':
+                columns[name].extend(mapping[code] for code in values)
+            else:
+                columns[name].extend(values)
+    return {'count': len(columns['id']), 'equipment_types': list(type_index), 'columns': columns}
+
+# Seconds without a byte from /api/events/ before the connection counts as dead (the server
+# sends a keep-alive comment every 15s)
+EVENT_READ_TIMEOUT = 45
+
+def iter_sse(response):
+    """Yield (event, data, id) for each Server-Sent Event in a streamed response"""
+    kind, data, event_id = 'message', [], None
+    # Byte at a time: the events are small and must not wait for a read buffer to fill
+    for line in response.iter_lines(chunk_size=1, decode_unicode=True):
+        if not line:
+            if data:
+                yield kind, json.loads('\n'.join(data)), event_id
+            kind, data, event_id = 'message', [], None
+        elif not line.startswith(':'):
+            field, _, value = line.partition(':')
+            value = value[1:] if value.startswith(' ') else value
+            if field == 'event':
+                kind = value
+            elif field == 'data':
+                data.append(value)
+            elif field == 'id':
+                event_id = int(value)
+
 class APIClient:
     def __init__(self, base_url="http://localhost:8000/api", username="api_user", password="api_password123"):
         self.base_url = base_url
         self.username = username
         self.password = password
+        # API token from login(); requests use Basic Auth until then
+        self.token = None
         self.auth_header = self._get_auth_header()
+        # Unfinished chunked uploads by local file path, so a retry resumes them
+        self.resumable_uploads = {}
+        # Last body and ETag per endpoint and parameters, revalidated with If-None-Match;
+        # least recently used entries are dropped beyond ETAG_CACHE_ENTRIES
+        self.etag_cache = OrderedDict()
+        self.etag_lock = threading.Lock()
         
     def _get_auth_header(self):
-        """Create Basic Auth header"""
+        """Create Token header once logged in, else Basic Auth header"""
+        if self.token:
+            return {"Authorization": f"Token {self.token}"}
         credentials = f"{self.username}:{self.password}"
         encoded_credentials = base64.b64encode(credentials.encode()).decode()
         return {"Authorization": f"Basic {encoded_credentials}"}
@@ -28,38 +131,303 @@ class APIClient:
             
         try:
             response = requests.request(method, url, **kwargs)
+            if response.status_code == 401 and self.token and 'files' not in kwargs:
+                # Token revoked (e.g. logged out elsewhere): log in again and retry once
+                self.login()
+                kwargs['headers'].update(self.auth_header)
+                response = requests.request(method, url, **kwargs)
             response.raise_for_status()
             return response
         except requests.exceptions.RequestException as e:
             raise Exception(f"API request failed: {str(e)}")
     
+    def login(self):
+        """Exchange the username and password for an API token, which later requests send instead"""
+        try:
+            response = requests.post(f"{self.base_url}/auth/login/",
+                                     json={'username': self.username, 'password': self.password})
+        except requests.exceptions.RequestException as e:
+            raise Exception(f"API request failed: {str(e)}")
+        if response.status_code != 200:
+            try:
+                message = response.json().get('error')
+            except ValueError:
+                message = None
+            raise Exception(f"Login failed: {message or response.status_code}")
+        self.token = response.json()['token']
+        self.auth_header = self._get_auth_header()
+        return self.token
+    
+    def logout(self):
+        """Revoke the API token; it is shared by every client logged in as this user"""
+        if self.token:
+            self._make_request('POST', '/auth/logout/')
+        self.token = None
+        self.auth_header = self._get_auth_header()
+    
+    def _cached_response(self, key):
+        """(etag, data) stored for a request, or None"""
+        # Workers in several threads share the cache
+        with self.etag_lock:
+            cached = self.etag_cache.get(key)
+            if cached:
+                self.etag_cache.move_to_end(key)
+            return cached
+    
+    def _cache_response(self, key, response, data):
+        etag = response.headers.get('ETag')
+        if not etag:
+            return
+        with self.etag_lock:
+            self.etag_cache[key] = (etag, data)
+            self.etag_cache.move_to_end(key)
+            while len(self.etag_cache) > ETAG_CACHE_ENTRIES:
+                self.etag_cache.popitem(last=False)
+    
+    def _get_revalidated(self, endpoint, params=None, decode=None):
+        """GET an endpoint; an unchanged resource costs a 304 instead of the full body"""
+        key = (endpoint, tuple(sorted((params or {}).items())))
+        cached = self._cached_response(key)
+        headers = {'If-None-Match': cached[0]} if cached else {}
+        response = self._make_request('GET', endpoint, headers=headers, params=params)
+        if response.status_code == 304 and cached:
+            return cached[1]
+        data = decode(response) if decode else response.json()
+        self._cache_response(key, response, data)
+        return data
+    
+    def _post_revalidated(self, endpoint, payload):
+        """POST a read-only JSON request, revalidated with its ETag like _get_revalidated"""
+        key = (endpoint, json.dumps(payload, sort_keys=True))
+        cached = self._cached_response(key)
+        headers = {'If-None-Match': cached[0]} if cached else {}
+        response = self._make_request('POST', endpoint, headers=headers, json=payload)
+        if response.status_code == 304 and cached:
+            return cached[1]
+        data = response.json()
+        self._cache_response(key, response, data)
+        return data
+    
+    def _columnar_params(self, params):
+        """Ask for MessagePack when it can be decoded here, else the columnar JSON format"""
+        params = dict(params)
+        params['format'] = 'msgpack' if msgpack is not None else 'columns'
+        return params
+    
+    def _decode_body(self, response):
+        if response.headers.get('Content-Type', '').startswith('application/x-msgpack'):
+            return msgpack.unpackb(response.content)
+        return response.json()
+    
     def get_api_root(self):
         """Get API root information"""
         response = self._make_request('GET', '/')
         return response.json()
     
-    def upload_csv(self, file_path, dataset_name="Uploaded Dataset"):
-        """Upload CSV file"""
+    def upload_csv(self, file_path, dataset_name="Uploaded Dataset", compress=None):
+        """Upload CSV file, optionally compressing it on the fly ('gzip', 'bz2' or 'xz')"""
+        if compress:
+            return self._upload_compressed(file_path, dataset_name, compress)
         with open(file_path, 'rb') as file:
             files = {'file': (file_path, file, 'text/csv')}
             data = {'name': dataset_name}
             response = self._make_request('POST', '/upload/', files=files, data=data)
             return response.json()
     
+    def _upload_compressed(self, file_path, dataset_name, compress):
+        """Compress a CSV block by block into a spooled temp file and upload that"""
+        if compress not in COMPRESSORS:
+            raise ValueError(f"Unsupported compression: {compress}")
+        suffix, open_writer = COMPRESSORS[compress]
+        with tempfile.SpooledTemporaryFile(max_size=CHUNK_SIZE * 8) as compressed:
+            with open(file_path, 'rb') as source, open_writer(compressed) as writer:
+                shutil.copyfileobj(source, writer, CHUNK_SIZE)
+            compressed.seek(0)
+            files = {'file': (file_path + suffix, compressed, 'application/octet-stream')}
+            data = {'name': dataset_name}
+            response = self._make_request('POST', '/upload/', files=files, data=data)
+            return response.json()
+    
+    def upload_csv_chunked(self, file_path, dataset_name="Uploaded Dataset", chunk_size=CHUNK_SIZE,
+                           workers=4, retries=3, progress=None):
+        """Upload a CSV in checksummed chunks, several in parallel, resuming a previous attempt"""
+        total_size = os.path.getsize(file_path)
+        upload_id = self.resumable_uploads.get(file_path)
+        status = None
+        if upload_id:
+            try:
+                status = self._make_request('GET', f'/uploads/{upload_id}/').json()
+            except Exception:
+                status = None
+            if status and (status['completed'] or status['total_size'] != total_size):
+                status = None
+        if status is None:
+            status = self._make_request('POST', '/uploads/', json={
+                'file_name': os.path.basename(file_path),
+                'total_size': total_size,
+                'chunk_size': chunk_size,
+                'name': dataset_name
+            }).json()
+            self.resumable_uploads[file_path] = status['upload_id']
+        
+        upload_id = status['upload_id']
+        chunk_size = status['chunk_size']
+        missing = status['missing']
+        done = [status['total_chunks'] - len(missing)]
+        lock = threading.Lock()
+        
+        def send_chunk(index):
+            with open(file_path, 'rb') as f:
+                f.seek(index * chunk_size)
+                data = f.read(chunk_size)
+            headers = {
+                'Content-Type': 'application/octet-stream',
+                'X-Chunk-Checksum': hashlib.sha256(data).hexdigest()
+            }
+            for attempt in range(retries):
+                try:
+                    self._make_request('PUT', f'/uploads/{upload_id}/chunks/{index}/',
+                                       data=data, headers=headers)
+                    break
+                except Exception:
+                    if attempt == retries - 1:
+                        raise
+            with lock:
+                done[0] += 1
+                if progress is not None:
+                    progress(done[0], status['total_chunks'])
+        
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # Consume results so the first failure propagates; finished chunks stay on the server
+            list(executor.map(send_chunk, missing))
+        
+        response = self._make_request('POST', f'/uploads/{upload_id}/complete/')
+        self.resumable_uploads.pop(file_path, None)
+        return response.json()
+    
+    def get_job(self, job_id):
+        """Get background ingestion job status"""
+        response = self._make_request('GET', f'/jobs/{job_id}/')
+        return response.json()
+    
+    def batch(self, subrequests, dataset_id=None):
+        """Run several read requests in one round trip, all against the same dataset
+        
+        subrequests are dicts with a 'type' (summary, types, equipment, equipment_page, dataset
+        or history) and optionally an 'id', a 'dataset_id' and query 'params'. The dataset is
+        the latest unless dataset_id is given. Returns {id: {'status': ..., 'data': ...}}.
+        """
+        payload = {'requests': subrequests}
+        if dataset_id is not None:
+            payload['dataset_id'] = dataset_id
+        return self._post_revalidated('/batch/', payload)['results']
+    
+    def get_latest_data(self, include_history=False):
+        """Equipment rows and summary of the latest dataset (plus history), from one request"""
+        subrequests = [{'type': 'equipment'}, {'type': 'summary'}]
+        if include_history:
+            subrequests.append({'type': 'history'})
+        results = self.batch(subrequests)
+        for name, result in results.items():
+            if result['status'] != 200:
+                raise Exception(f"Loading {name} failed: {result['data'].get('error', result['status'])}")
+        data = (results['equipment']['data'], results['summary']['data'])
+        if include_history:
+            data += (results['history']['data'],)
+        return data
+    
     def get_summary(self):
         """Get data summary"""
-        response = self._make_request('GET', '/summary/')
-        return response.json()
+        return self._get_revalidated('/summary/')
     
     def get_equipment(self):
         """Get equipment data"""
-        response = self._make_request('GET', '/equipment/')
-        return response.json()
+        return self._get_revalidated('/equipment/')
     
+    def iter_equipment(self, dataset_id, page_size=None, **filters):
+        """Lazily iterate a dataset's equipment rows, fetching one page at a time
+
+        filters are passed as query parameters, e.g. equipment_type='Pump', flowrate_min=100,
+        name_prefix='P-', sort='-temperature'.
+        """
+        params = dict(filters)
+        if page_size:
+            params['page_size'] = page_size
+        while True:
+            response = self._make_request('GET', f'/datasets/{dataset_id}/equipment/', params=params)
+            page = response.json()
+            yield from page['results']
+            if not page['next_cursor']:
+                return
+            params['cursor'] = page['next_cursor']
+    
+    def get_dataset_equipment(self, dataset_id):
+        """Get every equipment row of a dataset, page by page"""
+        return list(self.iter_equipment(dataset_id, page_size=10000))
+    
+    def get_equipment_columns(self, **filters):
+        """Get the latest dataset's equipment as typed columns (see decode_columns)"""
+        return self._get_revalidated(
+            '/equipment/', params=self._columnar_params(filters),
+            decode=lambda response: decode_columns(self._decode_body(response))
+        )
+    
+    def iter_equipment_columns(self, dataset_id, page_size=None, **filters):
+        """Lazily iterate a dataset's equipment as one block of typed columns per page"""
+        params = self._columnar_params(filters)
+        if page_size:
+            params['page_size'] = page_size
+        while True:
+            response = self._make_request('GET', f'/datasets/{dataset_id}/equipment/', params=params)
+            page = self._decode_body(response)
+            yield decode_columns(page['results'])
+            if not page['next_cursor']:
+                return
+            params['cursor'] = page['next_cursor']
+    
+    def get_dataset_equipment_columns(self, dataset_id, **filters):
+        """Get every equipment row of a dataset as typed columns"""
+        return concat_columns(self.iter_equipment_columns(dataset_id, page_size=10000, **filters))
+    
+    def iter_export(self, dataset_id, **filters):
+        """Stream a dataset's equipment rows as NDJSON, yielding each row as it arrives"""
+        params = dict(filters, format='ndjson')
+        response = self._make_request('GET', f'/datasets/{dataset_id}/export/', params=params, stream=True)
+        with response:
+            for line in response.iter_lines():
+                if line:
+                    yield json.loads(line)
+
+    def export_equipment(self, dataset_id, save_path, fmt='json', **filters):
+        """Download a dataset's equipment rows (JSON array or NDJSON) straight to a file"""
+        params = dict(filters, format=fmt)
+        response = self._make_request('GET', f'/datasets/{dataset_id}/export/', params=params, stream=True)
+        with response, open(save_path, 'wb') as f:
+            for block in response.iter_content(CHUNK_SIZE):
+                f.write(block)
+        return save_path
+
     def get_equipment_types(self):
         """Get equipment type distribution"""
-        response = self._make_request('GET', '/equipment-types/')
-        return response.json()
+        return self._get_revalidated('/equipment-types/')
+    
+    def get_chart_data(self, kind, dataset_id=None, **params):
+        """Get display-sized chart data ('histogram', 'histogram2d' or 'series') for the latest or a given dataset
+
+        e.g. get_chart_data('histogram', parameter='flowrate', bins=30, by_type=1),
+        get_chart_data('histogram2d', x='pressure', y='temperature', bins=20),
+        get_chart_data('series', parameter='temperature', points=1000)
+        """
+        prefix = f'/datasets/{dataset_id}' if dataset_id is not None else ''
+        return self._get_revalidated(f'{prefix}/charts/{kind}/', params=params)
+    
+    def compare_datasets(self, dataset_ids, limit=None):
+        """Compare each dataset with the one before it in dataset_ids: statistic and type distribution
+        deltas, plus up to limit equipment rows added, removed or changed by name"""
+        params = {'ids': ','.join(str(dataset_id) for dataset_id in dataset_ids)}
+        if limit is not None:
+            params['limit'] = limit
+        return self._get_revalidated('/compare/', params=params)
     
     def get_history(self):
         """Get upload history"""
@@ -67,10 +435,20 @@ class APIClient:
         return response.json()
     
     def get_dataset(self, dataset_id):
-        """Get specific dataset"""
+        """Get specific dataset (summary only; rows come from get_dataset_equipment)"""
         response = self._make_request('GET', f'/history/{dataset_id}/')
         return response.json()
     
+    def open_event_stream(self, last_event_id=None):
+        """Open /api/events/ as a streamed response; read it with iter_sse"""
+        headers = {'Accept': 'text/event-stream'}
+        if last_event_id is not None:
+            headers['Last-Event-ID'] = str(last_event_id)
+        response = self._make_request('GET', '/events/', headers=headers, stream=True,
+                                      timeout=(10, EVENT_READ_TIMEOUT))
+        response.encoding = 'utf-8'
+        return response
+    
     def generate_pdf(self, save_path):
         """Generate and download PDF report"""
         response = self._make_request('POST', '/generate-pdf/')
@@ -103,4 +481,54 @@ class APIWorker(QThread):
     def stop(self):
         self._is_running = False
         self.quit()
-        self.wait(1000)  # Wait up to 1 second for thread to finish
\ No newline at end of file
+        self.wait(1000)  # Wait up to 1 second for thread to finish
+
+class EventListener(QThread):
+    """Follows /api/events/ in the background, reconnecting from the last event seen"""
+    event_received = pyqtSignal(str, object)
+    connection_changed = pyqtSignal(bool)
+    
+    def __init__(self, api_client, retry_seconds=5):
+        super().__init__()
+        self.api_client = api_client
+        self.retry_seconds = retry_seconds
+        self.last_event_id = None
+        self.response = None
+        self._is_running = True
+        
+    def run(self):
+        while self._is_running:
+            try:
+                self.response = self.api_client.open_event_stream(self.last_event_id)
+                self.connection_changed.emit(True)
+                with self.response:
+                    for kind, data, event_id in iter_sse(self.response):
+                        if event_id is not None:
+                            self.last_event_id = event_id
+                        if self._is_running:
+                            self.event_received.emit(kind, data)
+                # The server ends each stream after a while; reconnect straight away
+            except Exception:
+                if not self._is_running:
+                    return
+                self.connection_changed.emit(False)
+                for _ in range(self.retry_seconds * 10):
+                    if not self._is_running:
+                        return
+                    self.msleep(100)
+            finally:
+                self.response = None
+                
+    def stop(self):
+        self._is_running = False
+        response = self.response
+        if response is not None:
+            # Closing the response doesn't interrupt a blocked read; shutting the socket down does
+            sock = getattr(getattr(response.raw, '_connection', None), 'sock', None)
+            try:
+                if sock is not None:
+                    sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            response.close()
+        self.wait(2000)
@@ -5,11 +5,13 @@ import {
   LinearScale,
   BarElement,
   ArcElement,
+  LineElement,
+  PointElement,
   Title,
   Tooltip,
   Legend,
 } from 'chart.js';
-import { Bar, Doughnut } from 'react-chartjs-2';
+import { Bar, Doughnut, Line } from 'react-chartjs-2';
 import { equipmentAPI } from '../services/api';
 import { useEquipment } from '../services/EquipmentContext';
 
@@ -18,19 +20,52 @@ ChartJS.register(
   LinearScale,
   BarElement,
   ArcElement,
+  LineElement,
+  PointElement,
   Title,
   Tooltip,
   Legend
 );
 
+const PARAMETERS = ['flowrate', 'pressure', 'temperature'];
+const PARAMETER_COLORS = {
+  flowrate: ['rgba(255, 99, 132, 0.6)', 'rgba(255, 99, 132, 1)'],
+  pressure: ['rgba(54, 162, 235, 0.6)', 'rgba(54, 162, 235, 1)'],
+  temperature: ['rgba(255, 206, 86, 0.6)', 'rgba(255, 206, 86, 1)'],
+};
+const HISTOGRAM_BINS = 30;
+const SERIES_POINTS = 500;
+
 function Charts() {
   const { state } = useEquipment();
   const [typeDistribution, setTypeDistribution] = useState({});
+  const [parameter, setParameter] = useState('flowrate');
+  const [histogram, setHistogram] = useState(null);
+  const [series, setSeries] = useState(null);
+  // The dataset picked in History (or just uploaded); the latest one until then
+  const datasetId = state.currentDataset?.id ?? null;
 
   useEffect(() => {
     fetchTypeDistribution();
   }, []);
 
+  // Binned and downsampled on the server, so the charts stay small for any dataset size
+  useEffect(() => {
+    const fetchChartData = async () => {
+      try {
+        const [hist, downsampled] = await Promise.all([
+          equipmentAPI.getChartData('histogram', { parameter, bins: HISTOGRAM_BINS }, datasetId),
+          equipmentAPI.getChartData('series', { parameter, points: SERIES_POINTS }, datasetId),
+        ]);
+        setHistogram(hist);
+        setSeries(downsampled);
+      } catch (error) {
+        console.error('Error fetching chart data:', error);
+      }
+    };
+    fetchChartData();
+  }, [parameter, datasetId, state.summary]);
+
   const fetchTypeDistribution = async () => {
     try {
       const distribution = await equipmentAPI.getEquipmentTypes();
@@ -59,29 +94,32 @@ function Charts() {
     ],
   };
 
-  const parameterComparisonData = {
-    labels: state.equipmentData.map(eq => eq.equipment_name),
+  const [fillColor, lineColor] = PARAMETER_COLORS[parameter];
+
+  const histogramData = {
+    labels: (histogram?.counts || []).map((_, i) =>
+      `${histogram.edges[i].toFixed(1)}–${histogram.edges[i + 1].toFixed(1)}`),
     datasets: [
       {
-        label: 'Flowrate',
-        data: state.equipmentData.map(eq => eq.flowrate),
-        backgroundColor: 'rgba(255, 99, 132, 0.6)',
-        borderColor: 'rgba(255, 99, 132, 1)',
-        borderWidth: 1,
-      },
-      {
-        label: 'Pressure',
-        data: state.equipmentData.map(eq => eq.pressure),
-        backgroundColor: 'rgba(54, 162, 235, 0.6)',
-        borderColor: 'rgba(54, 162, 235, 1)',
+        label: `${parameter} (count per bin)`,
+        data: histogram?.counts || [],
+        backgroundColor: fillColor,
+        borderColor: lineColor,
         borderWidth: 1,
       },
+    ],
+  };
+
+  const seriesData = {
+    labels: (series?.x_values || []).map((x) => x.toFixed(0)),
+    datasets: [
       {
-        label: 'Temperature',
-        data: state.equipmentData.map(eq => eq.temperature),
-        backgroundColor: 'rgba(255, 206, 86, 0.6)',
-        borderColor: 'rgba(255, 206, 86, 1)',
+        label: `${parameter} by record (${series?.x_values.length || 0} of ${series?.total || 0} points)`,
+        data: series?.y_values || [],
+        borderColor: lineColor,
+        backgroundColor: fillColor,
         borderWidth: 1,
+        pointRadius: 0,
       },
     ],
   };
@@ -122,13 +160,27 @@ function Charts() {
           </div>
 
           <div className="chart-container">
-            <h3>Parameter Comparison</h3>
+            <h3>
+              Parameter Distribution{' '}
+              <select value={parameter} onChange={(e) => setParameter(e.target.value)}>
+                {PARAMETERS.map((name) => (
+                  <option key={name} value={name}>{name}</option>
+                ))}
+              </select>
+            </h3>
             <div style={{ height: '400px' }}>
-              <Bar data={parameterComparisonData} options={chartOptions} />
+              <Bar data={histogramData} options={chartOptions} />
             </div>
           </div>
         </div>
 
+        <div className="chart-container" style={{ marginTop: '2rem' }}>
+          <h3 style={{ textTransform: 'capitalize' }}>{parameter} Across Records</h3>
+          <div style={{ height: '300px' }}>
+            <Line data={seriesData} options={chartOptions} />
+          </div>
+        </div>
+
         <div style={{ display: 'grid', gridTemplateColumns: 'repeat(auto-fit, minmax(300px, 1fr))', gap: '1.5rem', marginTop: '2rem' }}>
           {Object.entries(state.summary?.parameter_stats || {}).map(([parameter, stats]) => (
             <div key={parameter} className="chart-container">
@@ -2,6 +2,10 @@ import React, { useState } from 'react';
 import { equipmentAPI } from '../services/api';
 import { useEquipment } from '../services/EquipmentContext';
 
+const CSV_SUFFIXES = ['.csv', '.csv.gz', '.csv.bz2', '.csv.xz', '.csv.zst'];
+
+const isCSVFile = (file) => CSV_SUFFIXES.some((suffix) => file.name.toLowerCase().endsWith(suffix));
+
 function FileUpload() {
   const [file, setFile] = useState(null);
   const [datasetName, setDatasetName] = useState('');
@@ -11,9 +15,9 @@ function FileUpload() {
 
   const handleFileChange = (e) => {
     const selectedFile = e.target.files[0];
-    if (selectedFile && selectedFile.type === 'text/csv') {
+    if (selectedFile && (selectedFile.type === 'text/csv' || isCSVFile(selectedFile))) {
       setFile(selectedFile);
-      setDatasetName(selectedFile.name.replace('.csv', ''));
+      setDatasetName(selectedFile.name.replace(/\.csv(\.\w+)?$/i, ''));
       setMessage('');
     } else {
       setMessage('Please select a valid CSV file.');
@@ -32,8 +36,24 @@ function FileUpload() {
     setMessage('');
 
     try {
-      const result = await equipmentAPI.uploadCSV(file, datasetName);
-      setMessage('File uploaded successfully!');
+      let result = await equipmentAPI.uploadCSV(file, datasetName);
+
+      // Large uploads are processed in the background; poll until the job finishes
+      while (result.job_id && (result.state === 'queued' || result.state === 'running')) {
+        setMessage(`Processing: ${result.rows_processed.toLocaleString()} rows...`);
+        await new Promise((resolve) => setTimeout(resolve, 1000));
+        result = await equipmentAPI.getJob(result.job_id);
+      }
+      if (result.state === 'failed') {
+        throw new Error(result.error || 'Processing failed');
+      }
+      if (result.job_id) {
+        result = await equipmentAPI.getDataset(result.dataset_id);
+      }
+
+      setMessage(result.deduplicated
+        ? 'This file was already uploaded; showing the existing dataset.'
+        : 'File uploaded successfully!');
       setFile(null);
       setDatasetName('');
       
@@ -63,7 +83,7 @@ function FileUpload() {
           <input
             type="file"
             id="csvFile"
-            accept=".csv"
+            accept={CSV_SUFFIXES.join(',')}
             onChange={handleFileChange}
             className="form-control"
             disabled={uploading}
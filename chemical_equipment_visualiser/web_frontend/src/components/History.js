@@ -1,11 +1,16 @@
-import React, { useEffect, useState } from 'react';
+import React, { useEffect, useRef, useState } from 'react';
 import { equipmentAPI } from '../services/api';
 import { useEquipment } from '../services/EquipmentContext';
 
+// Rows per request when loading a dataset, each well within the request timeout
+const PAGE_SIZE = 10000;
+
 function History() {
   const { state, dispatch } = useEquipment();
   const [loading, setLoading] = useState(false);
   const [selectedDataset, setSelectedDataset] = useState(null);
+  const [comparison, setComparison] = useState(null);
+  const loadingId = useRef(null);
 
   useEffect(() => {
     fetchHistory();
@@ -24,26 +29,59 @@ function History() {
   };
 
   const loadDataset = async (datasetId) => {
+    loadingId.current = datasetId;
     try {
-      const dataset = await equipmentAPI.getDataset(datasetId);
+      // Details and the first page of rows in one request; the rest follows page by page
+      const results = await equipmentAPI.batch(
+        [{ type: 'dataset' }, { type: 'equipment_page', params: { page_size: PAGE_SIZE } }], datasetId
+      );
+      const failed = Object.values(results).find((result) => result.status !== 200);
+      if (failed) throw new Error(failed.data.error);
+      if (loadingId.current !== datasetId) return;
+      const dataset = results.dataset.data;
+      let page = results.equipment_page.data;
+      let equipment = page.results;
       setSelectedDataset(dataset);
       
       // Update current data with selected dataset
-      dispatch({ type: 'SET_EQUIPMENT_DATA', payload: dataset.equipments });
+      dispatch({ type: 'SET_EQUIPMENT_DATA', payload: equipment });
       dispatch({ type: 'SET_SUMMARY', payload: dataset.summary_stats });
       dispatch({ type: 'SET_CURRENT_DATASET', payload: dataset });
       
+      // Stop if another dataset was picked meanwhile
+      while (page.next_cursor) {
+        page = await equipmentAPI.getDatasetEquipment(datasetId, { cursor: page.next_cursor, pageSize: PAGE_SIZE });
+        if (loadingId.current !== datasetId) break;
+        equipment = equipment.concat(page.results);
+        dispatch({ type: 'SET_EQUIPMENT_DATA', payload: equipment });
+      }
+      
     } catch (error) {
       console.error('Error loading dataset:', error);
     }
   };
 
+  // Compare each listed dataset with the one uploaded before it (history is newest first)
+  const compareHistory = async () => {
+    try {
+      const ids = state.history.map((dataset) => dataset.id).reverse();
+      setComparison(await equipmentAPI.compareDatasets(ids, 20));
+    } catch (error) {
+      console.error('Error comparing datasets:', error);
+    }
+  };
+
+  const formatDelta = (delta, digits = 0) => `${delta >= 0 ? '+' : ''}${delta.toFixed(digits)}`;
+
   if (loading) return <div className="loading">Loading history...</div>;
 
   return (
     <div className="card">
       <h2>Upload History</h2>
       <p>Last 5 uploaded datasets</p>
+      {state.history.length >= 2 && (
+        <button onClick={compareHistory}>Compare Datasets</button>
+      )}
 
       {state.history.length === 0 ? (
         <div style={{ textAlign: 'center', padding: '2rem', color: '#666' }}>
@@ -97,6 +135,34 @@ function History() {
         </div>
       )}
 
+      {comparison && (
+        <div style={{ marginTop: '2rem', padding: '1rem', background: '#f8f9fa', borderRadius: '5px' }}>
+          <h3>Changes Between Uploads</h3>
+          {comparison.comparisons.map((pair) => (
+            <div key={`${pair.from}-${pair.to}`} style={{ marginBottom: '1rem' }}>
+              <h4 style={{ margin: '0.5rem 0' }}>
+                #{pair.from} &rarr; #{pair.to}: {pair.total_count.to} records ({formatDelta(pair.total_count.delta)})
+              </h4>
+              <div style={{ fontSize: '0.9rem' }}>
+                Added: <strong>{pair.equipment.added_count}</strong> | Removed: <strong>{pair.equipment.removed_count}</strong>
+                {' '}| Changed: <strong>{pair.equipment.changed_count}</strong>
+              </div>
+              <div style={{ fontSize: '0.9rem', color: '#666' }}>
+                {Object.entries(pair.type_distribution)
+                  .filter(([, count]) => count.delta !== 0)
+                  .map(([type, count]) => `${type} ${formatDelta(count.delta)}`)
+                  .join(', ')}
+              </div>
+              <div style={{ fontSize: '0.9rem', color: '#666' }}>
+                {Object.entries(pair.parameter_stats)
+                  .map(([param, stats]) => `${param} mean ${formatDelta(stats.mean.delta, 2)}`)
+                  .join(', ')}
+              </div>
+            </div>
+          ))}
+        </div>
+      )}
+
       {selectedDataset && (
         <div style={{ marginTop: '2rem', padding: '1rem', background: '#f8f9fa', borderRadius: '5px' }}>
           <h3>Current Dataset: {selectedDataset.name}</h3>
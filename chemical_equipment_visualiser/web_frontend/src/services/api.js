@@ -6,14 +6,40 @@ const api = axios.create({
   timeout: 10000,
 });
 
-// Add authentication (you'll need to set this up based on your Django auth)
-// For basic auth, you can set it like this:
-// api.defaults.auth = { username: 'admin', password: 'password' }
-
-// Alternatively, use session-based auth if you're using Django sessions
+// Authentication: log in once with equipmentAPI.login() and every request sends the API token
+// (kept in localStorage). Session auth also works when the app is served by Django.
 // The proxy in package.json will handle CORS for development
+const TOKEN_KEY = 'equipmentApiToken';
+
+const setToken = (token) => {
+  if (token) {
+    localStorage.setItem(TOKEN_KEY, token);
+    api.defaults.headers.common.Authorization = `Token ${token}`;
+  } else {
+    localStorage.removeItem(TOKEN_KEY);
+    delete api.defaults.headers.common.Authorization;
+  }
+};
+
+setToken(localStorage.getItem(TOKEN_KEY));
 
 export const equipmentAPI = {
+  // Exchange a username and password for an API token
+  login: async (username, password) => {
+    const response = await api.post('/auth/login/', { username, password });
+    setToken(response.data.token);
+    return response.data;
+  },
+
+  // Revoke the API token (shared by every client logged in as this user)
+  logout: async () => {
+    try {
+      await api.post('/auth/logout/');
+    } finally {
+      setToken(null);
+    }
+  },
+
   // Upload CSV file
   uploadCSV: async (file, name = 'Uploaded Dataset') => {
     const formData = new FormData();
@@ -28,6 +54,12 @@ export const equipmentAPI = {
     return response.data;
   },
 
+  // Get background ingestion job status
+  getJob: async (jobId) => {
+    const response = await api.get(`/jobs/${jobId}/`);
+    return response.data;
+  },
+
   // Get summary statistics
   getSummary: async () => {
     const response = await api.get('/summary/');
@@ -40,19 +72,67 @@ export const equipmentAPI = {
     return response.data;
   },
 
+  // Get one page of a dataset's equipment; pass the previous page's next_cursor to continue.
+  // filters: equipment_type, name_prefix, <flowrate|pressure|temperature>_<min|max>, sort
+  getDatasetEquipment: async (datasetId, { cursor, pageSize, filters = {} } = {}) => {
+    const params = { ...filters };
+    if (cursor) params.cursor = cursor;
+    if (pageSize) params.page_size = pageSize;
+    const response = await api.get(`/datasets/${datasetId}/equipment/`, { params });
+    return response.data;
+  },
+
+  // Get every equipment row of a dataset by following the page cursors
+  getAllDatasetEquipment: async (datasetId, filters = {}) => {
+    let rows = [];
+    let cursor = null;
+    do {
+      const page = await equipmentAPI.getDatasetEquipment(datasetId, { cursor, pageSize: 10000, filters });
+      rows = rows.concat(page.results);
+      cursor = page.next_cursor;
+    } while (cursor);
+    return rows;
+  },
+
   // Get equipment type distribution
   getEquipmentTypes: async () => {
     const response = await api.get('/equipment-types/');
     return response.data;
   },
 
+  // Get display-sized chart data for the latest dataset, or a given one.
+  // kind: 'histogram' (parameter, bins, by_type), 'histogram2d' (x, y, bins) or 'series' (parameter, points, x)
+  getChartData: async (kind, params = {}, datasetId = null) => {
+    const prefix = datasetId != null ? `/datasets/${datasetId}` : '';
+    const response = await api.get(`${prefix}/charts/${kind}/`, { params });
+    return response.data;
+  },
+
+  // Compare datasets in the given order: statistic and type deltas plus equipment added, removed or changed by name
+  compareDatasets: async (datasetIds, limit = null) => {
+    const params = { ids: datasetIds.join(',') };
+    if (limit != null) params.limit = limit;
+    const response = await api.get('/compare/', { params });
+    return response.data;
+  },
+
+  // Run several read requests in one round trip against one dataset (the latest unless datasetId).
+  // requests: [{ type, id, dataset_id, params }] with type summary, types, equipment,
+  // equipment_page, dataset or history; resolves to { id: { status, data } }
+  batch: async (requests, datasetId = null) => {
+    const payload = { requests };
+    if (datasetId != null) payload.dataset_id = datasetId;
+    const response = await api.post('/batch/', payload);
+    return response.data.results;
+  },
+
   // Get upload history
   getHistory: async () => {
     const response = await api.get('/history/');
     return response.data;
   },
 
-  // Get specific dataset
+  // Get specific dataset (summary only; rows come from getAllDatasetEquipment)
   getDataset: async (datasetId) => {
     const response = await api.get(`/history/${datasetId}/`);
     return response.data;